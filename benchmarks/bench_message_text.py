@@ -0,0 +1,108 @@
+"""Бенчмарк текста сообщения в message_handler: message.text (сборка
+разметки из entities) против исходного message.message.
+
+Старый путь обращался к message.text при проверке на пустоту, поиске
+ключевых слов, экранировании и записи в базу; Telethon собирает разметку
+при первом обращении к .text, то есть на каждом входящем сообщении.
+Новый путь берет исходный текст один раз, а форматирует только
+отправляемые уведомления.
+
+Запуск из корня репозитория:
+    python benchmarks/bench_message_text.py --messages 20000 --entities 200
+"""
+import os
+import sys
+import time
+import random
+import argparse
+from types import SimpleNamespace
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from telethon.extensions import markdown
+from telethon.tl.custom.message import Message
+from telethon.tl.types import PeerChannel, MessageEntityBold, MessageEntityItalic, MessageEntityTextUrl
+
+WORDS = ['продам', 'куплю', 'аренда', 'квартира', 'срочно', 'скидка', 'доставка', 'новости', 'канал', 'сегодня']
+
+
+def make_message(index: int, words: int, entities: int) -> Message:
+    text = ' '.join(random.choice(WORDS) for _ in range(words))
+    spans = []
+    offset = 0
+    step = max(len(text) // max(entities, 1), 2)
+    kinds = (MessageEntityBold, MessageEntityItalic)
+    while offset + 1 < len(text) and len(spans) < entities:
+        if len(spans) % 5 == 4:
+            spans.append(MessageEntityTextUrl(offset, 1, url='https://t.me/example'))
+        else:
+            spans.append(kinds[len(spans) % 2](offset, 1))
+        offset += step
+    message = Message(id=index, peer_id=PeerChannel(1000000000), message=text, entities=spans)
+    message._client = SimpleNamespace(parse_mode=markdown)
+    return message
+
+
+def escape(text: str) -> str:
+    return text.replace('_', '\\_').replace('*', '\\*').replace('`', '\\`').replace('[', '\\[')
+
+
+def old_path(message: Message, keywords, hits: float) -> int:
+    """Доступы к тексту в прежнем message_handler/publish_hit"""
+    if not message.text:
+        return 0
+    message_text = message.text.lower()
+    found = [word for word in keywords if word in message_text]
+    if found and random.random() < hits:
+        escape(message.text[:4000])
+        message.text[:4000]
+    return len(found)
+
+
+def new_path(message: Message, keywords, hits: float) -> int:
+    raw_text = message.message
+    if not raw_text:
+        return 0
+    message_text = raw_text.lower()
+    found = [word for word in keywords if word in message_text]
+    if found and random.random() < hits:
+        escape(raw_text[:4000])
+    return len(found)
+
+
+def bench(path, messages, keywords, hits: float) -> float:
+    random.seed(0)
+    start = time.perf_counter()
+    for message in messages:
+        path(message, keywords, hits)
+    return (time.perf_counter() - start) / len(messages) * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--messages', type=int, default=20000)
+    parser.add_argument('--words', type=int, default=300)
+    parser.add_argument('--entities', type=int, default=200)
+    parser.add_argument('--hit-rate', type=float, default=0.01, help="доля сообщений с уведомлением")
+    parser.add_argument('--seed', type=int, default=1)
+    args = parser.parse_args()
+
+    keywords = ['аренда квартира', 'срочно продам', 'скидка']
+
+    # Свежие сообщения для каждого пути: Telethon кэширует .text после первой сборки
+    random.seed(args.seed)
+    old_messages = [make_message(i, args.words, args.entities) for i in range(args.messages)]
+    random.seed(args.seed)
+    new_messages = [make_message(i, args.words, args.entities) for i in range(args.messages)]
+
+    old_us = bench(old_path, old_messages, keywords, args.hit_rate)
+    new_us = bench(new_path, new_messages, keywords, args.hit_rate)
+
+    print(f"Сообщений: {args.messages}, слов: {args.words}, entities: {args.entities}")
+    print(f"message.text:    {old_us:>10.2f} мкс/сообщение")
+    print(f"message.message: {new_us:>10.2f} мкс/сообщение")
+    print(f"Экономия:        {old_us - new_us:>10.2f} мкс/сообщение ({old_us / new_us:.1f}x)")
+
+
+if __name__ == '__main__':
+    main()
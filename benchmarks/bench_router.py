@@ -0,0 +1,92 @@
+"""Бенчмарк маршрутизации обновлений: сколько обновлений в секунду
+успевает отбросить/пропустить UpdateRouter при 500 чатах на клиента.
+
+Запуск из корня репозитория:
+    python benchmarks/bench_router.py --clients 10 --chats 500 --updates 200000
+"""
+import os
+import sys
+import time
+import random
+import argparse
+from types import SimpleNamespace
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from project.managers.update_router import UpdateRouter
+
+
+def make_update(chat_id: int):
+    return SimpleNamespace(message=SimpleNamespace(peer_id=SimpleNamespace(channel_id=chat_id)))
+
+
+def build_distribution(clients: int, chats: int):
+    distribution = {}
+    chat_id = 1000000000
+    for index in range(clients):
+        distribution[f"account_{index}"] = list(range(chat_id, chat_id + chats))
+        chat_id += chats
+    return distribution
+
+
+def bench_router(router: UpdateRouter, updates):
+    accepted = 0
+    start = time.perf_counter()
+    for account_id, update in updates:
+        if router.accepts(account_id, update):
+            accepted += 1
+    elapsed = time.perf_counter() - start
+    return len(updates) / elapsed, accepted
+
+
+def bench_per_client_filters(distribution, updates):
+    """Базовая линия: отдельное множество помеченных id на каждого клиента"""
+    filters = {
+        account_id: {int(f"-100{chat_id}") for chat_id in channels}
+        for account_id, channels in distribution.items()
+    }
+    accepted = 0
+    start = time.perf_counter()
+    for account_id, update in updates:
+        marked_id = int(f"-100{update.message.peer_id.channel_id}")
+        if marked_id in filters[account_id]:
+            accepted += 1
+    elapsed = time.perf_counter() - start
+    return len(updates) / elapsed, accepted
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--clients', type=int, default=10)
+    parser.add_argument('--chats', type=int, default=500)
+    parser.add_argument('--updates', type=int, default=200000)
+    parser.add_argument('--seed', type=int, default=1)
+    args = parser.parse_args()
+
+    random.seed(args.seed)
+    distribution = build_distribution(args.clients, args.chats)
+    accounts = list(distribution)
+    all_chats = [chat_id for channels in distribution.values() for chat_id in channels]
+
+    # Каждый клиент получает обновления из произвольных чатов (в том числе чужих)
+    updates = [
+        (random.choice(accounts), make_update(random.choice(all_chats)))
+        for _ in range(args.updates)
+    ]
+
+    router = UpdateRouter()
+    start = time.perf_counter()
+    router.rebuild(distribution)
+    rebuild_ms = (time.perf_counter() - start) * 1000
+
+    router_rate, router_accepted = bench_router(router, updates)
+    filter_rate, filter_accepted = bench_per_client_filters(distribution, updates)
+
+    print(f"Клиентов: {args.clients}, чатов на клиента: {args.chats}, обновлений: {args.updates}")
+    print(f"Перестроение таблицы: {rebuild_ms:.2f} мс ({len(router)} чатов)")
+    print(f"UpdateRouter:            {router_rate:>12,.0f} обн/сек (принято {router_accepted})")
+    print(f"Фильтры на клиента:      {filter_rate:>12,.0f} обн/сек (принято {filter_accepted})")
+
+
+if __name__ == '__main__':
+    main()
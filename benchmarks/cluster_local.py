@@ -0,0 +1,182 @@
+"""Локальный прогон кластера: координатор и несколько воркеров на FakeNetwork.
+
+Координатор и воркеры работают в одном процессе и общаются по TCP через
+localhost, аккаунты и каналы - FakeNetwork/FakeClientFactory, база - во
+временной папке. После выдачи аренды один воркер "падает" (его задача
+отменяется без прощания с координатором); прогон проверяет, что после
+истечения аренды его аккаунты переданы оставшимся воркерам и что
+совпадения из каналов этих аккаунтов снова доходят до координатора.
+
+Запуск из корня репозитория:
+    python benchmarks/cluster_local.py --workers 3 --accounts 9 --channels 90
+"""
+import os
+import sys
+import time
+import asyncio
+import logging
+import argparse
+import tempfile
+from types import SimpleNamespace
+from typing import Callable, Dict
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from project.config import CLUSTER_SETTINGS
+from project.database.database_manager import DatabaseManager
+from project.managers.account_manager import AccountManager
+from project.managers.cluster import ClusterCoordinator, ClusterWorker
+from project.managers.message_monitor import MessageMonitor
+from project.managers.fake_telegram import FakeNetwork, FakeClientFactory, TrafficGenerator
+
+ADMIN = 'cluster_admin'
+KEYWORDS = ['купить', 'продам', 'скидка', 'срочно', 'вакансия']
+
+
+class BotApiSink:
+    """Заглушка Bot API координатора: считает уведомления"""
+
+    def __init__(self):
+        self.sent = 0
+
+    async def send_message(self, chat_id, text, **kwargs):
+        self.sent += 1
+
+
+async def wait_for(condition: Callable[[], bool], timeout: float) -> bool:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if condition():
+            return True
+        await asyncio.sleep(0.1)
+    return condition()
+
+
+def create_monitor(data_dir: str, network: FakeNetwork, accounts: int) -> MessageMonitor:
+    db = DatabaseManager(super_admin_username=ADMIN, data_dir=data_dir)
+    account_manager = AccountManager(db.bots_folder, client_factory=FakeClientFactory(network, accounts))
+    return MessageMonitor(db, account_manager)
+
+
+async def run(args) -> bool:
+    data_dir = tempfile.mkdtemp(prefix='senko_cluster_')
+    db = DatabaseManager(super_admin_username=ADMIN, data_dir=data_dir)
+    db.save_keywords(KEYWORDS)
+    await db.save_admin_chat_id(ADMIN, 1)
+
+    network = FakeNetwork(channels=args.channels, seed=args.seed)
+    await db.add_channels_batch([
+        (channel.id, channel.title, channel.username) for channel in network.channels.values()
+    ])
+
+    settings = dict(
+        CLUSTER_SETTINGS, host='127.0.0.1', port=args.port, token='',
+        heartbeat_interval=args.heartbeat, lease_ttl=args.lease_ttl, capacity=0
+    )
+    bot_api = BotApiSink()
+    coordinator_monitor = create_monitor(data_dir, network, args.accounts)
+    coordinator_monitor.bot = SimpleNamespace(bot=bot_api)
+    coordinator = ClusterCoordinator(coordinator_monitor, settings=settings)
+    await coordinator.start()
+
+    workers: Dict[str, ClusterWorker] = {}
+    tasks: Dict[str, asyncio.Task] = {}
+    for index in range(args.workers):
+        worker_id = f"node{index}"
+        monitor = create_monitor(data_dir, network, args.accounts)
+        # Как в ClusterWorker._create_monitor: пулом прокси владеет координатор
+        monitor.proxy_policy = None
+        workers[worker_id] = ClusterWorker(worker_id, monitor=monitor, settings=settings)
+        tasks[worker_id] = asyncio.create_task(workers[worker_id].run())
+
+    def settled() -> bool:
+        # Каждый аккаунт арендован живым воркером, и воркеры держат ровно свои аккаунты
+        if len(coordinator.leases) != args.accounts:
+            return False
+        if any(owner not in workers for owner, _ in coordinator.leases.values()):
+            return False
+        return all(
+            worker._held == set(coordinator.accounts_of(worker_id))
+            for worker_id, worker in workers.items()
+        )
+
+    ok = True
+    try:
+        started = time.perf_counter()
+        if not await wait_for(settled, args.timeout):
+            print("Аренда не выдана всем аккаунтам за отведенное время")
+            return False
+        print(f"Аренда выдана за {time.perf_counter() - started:.2f} сек:")
+        for worker_id in workers:
+            print(f"  {worker_id}: {', '.join(coordinator.accounts_of(worker_id))}")
+
+        victim = sorted(workers)[0]
+        lost = set(coordinator.accounts_of(victim))
+        tasks[victim].cancel()
+        await asyncio.gather(tasks.pop(victim), return_exceptions=True)
+        del workers[victim]
+        print(f"Воркер {victim} остановлен, его аккаунты: {', '.join(sorted(lost))}")
+
+        started = time.perf_counter()
+        if not await wait_for(settled, args.lease_ttl + args.timeout):
+            print("Аккаунты упавшего воркера не переданы за отведенное время")
+            return False
+        print(f"Аренда перераспределена за {time.perf_counter() - started:.2f} сек:")
+        for worker_id in workers:
+            print(f"  {worker_id}: {', '.join(coordinator.accounts_of(worker_id))}")
+        if victim in coordinator.workers:
+            print(f"Воркер {victim} все еще числится у координатора")
+            ok = False
+
+        # Совпадения из каналов переданных аккаунтов снова доходят до координатора
+        moved = {
+            chat_id
+            for account_id in lost
+            for chat_id in coordinator.distributor.distribution.get(account_id, [])
+        }
+        def watched() -> int:
+            return sum(worker.monitor.stats['watched_channels'] for worker in workers.values())
+
+        if not await wait_for(lambda: watched() >= args.channels, args.timeout):
+            print(f"Воркеры следят только за {watched()} из {args.channels} каналов")
+            ok = False
+        generator = TrafficGenerator(network, rate=args.rate, keywords=KEYWORDS, keyword_rate=1.0, seed=args.seed)
+        # Сообщения только в каналы, которые вели аккаунты упавшего воркера
+        generator.channel_ids = sorted(moved)
+        generator.weights = [1.0] * len(generator.channel_ids)
+        await generator.run(args.duration)
+        await wait_for(lambda: not coordinator._hit_tasks, args.timeout)
+        print(f"Каналов у переданных аккаунтов: {len(moved)}, уведомлений после сбоя: {bot_api.sent}")
+        if moved and not bot_api.sent:
+            print("После передачи аренды совпадения не доходят до координатора")
+            ok = False
+        return ok
+    finally:
+        for task in tasks.values():
+            task.cancel()
+        await asyncio.gather(*tasks.values(), return_exceptions=True)
+        await coordinator.stop()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--workers', type=int, default=3)
+    parser.add_argument('--accounts', type=int, default=9)
+    parser.add_argument('--channels', type=int, default=90)
+    parser.add_argument('--port', type=int, default=18790)
+    parser.add_argument('--heartbeat', type=float, default=0.5, help='интервал heartbeat, сек')
+    parser.add_argument('--lease-ttl', type=float, default=2.0, help='срок аренды, сек')
+    parser.add_argument('--timeout', type=float, default=15.0, help='ожидание каждого этапа, сек')
+    parser.add_argument('--rate', type=float, default=200, help='сообщений в секунду после сбоя')
+    parser.add_argument('--duration', type=float, default=2.0)
+    parser.add_argument('--seed', type=int, default=1)
+    args = parser.parse_args()
+
+    logging.disable(logging.WARNING)
+    ok = asyncio.run(run(args))
+    print("OK" if ok else "FAIL")
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == '__main__':
+    main()
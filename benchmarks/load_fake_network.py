@@ -0,0 +1,122 @@
+"""Нагрузочный прогон настоящего MessageMonitor на фейковом Telegram.
+
+Аккаунты и каналы - FakeNetwork/FakeClientFactory, сообщения -
+TrafficGenerator, Bot API - заглушка с настраиваемой задержкой.
+База и ключевые слова - во временной папке. Сеть и аккаунты не нужны.
+
+Запуск из корня репозитория:
+    python benchmarks/load_fake_network.py --accounts 10 --channels 500 --rate 2000 --duration 30
+    python benchmarks/load_fake_network.py --rate 0 --duration 10   # без ограничения интенсивности
+"""
+import os
+import sys
+import time
+import asyncio
+import logging
+import argparse
+import tempfile
+from types import SimpleNamespace
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from project.database.database_manager import DatabaseManager
+from project.managers.account_manager import AccountManager
+from project.managers.message_monitor import MessageMonitor
+from project.managers.fake_telegram import FakeNetwork, FakeClientFactory, TrafficGenerator
+
+ADMIN = 'loadtest_admin'
+KEYWORDS = ['купить', 'продам', 'скидка', 'срочно', 'вакансия']
+
+
+class BotApiSink:
+    """Заглушка Bot API: считает уведомления, отвечает с задержкой latency"""
+
+    def __init__(self, latency: float):
+        self.latency = latency
+        self.sent = 0
+
+    async def send_message(self, chat_id, text, **kwargs):
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        self.sent += 1
+
+
+async def run(args) -> None:
+    data_dir = tempfile.mkdtemp(prefix='senko_load_')
+    db = DatabaseManager(super_admin_username=ADMIN, data_dir=data_dir)
+    db.save_keywords(KEYWORDS)
+    await db.save_admin_chat_id(ADMIN, 1)
+
+    network = FakeNetwork(
+        channels=args.channels, joined=not args.join,
+        flood_wait_rate=args.flood_wait_rate, disconnect_rate=args.disconnect_rate,
+        latency=args.request_latency, seed=args.seed
+    )
+    await db.add_channels_batch([
+        (channel.id, channel.title, channel.username) for channel in network.channels.values()
+    ])
+
+    account_manager = AccountManager(db.bots_folder, client_factory=FakeClientFactory(network, args.accounts))
+    monitor = MessageMonitor(db, account_manager)
+    bot_api = BotApiSink(args.send_latency)
+
+    started = time.perf_counter()
+    await monitor.initialize(SimpleNamespace(bot=bot_api))
+    if args.join and monitor.distributor:
+        # Вступление в назначенные каналы через JoinScheduler (FLOOD_WAIT обрабатывает дистрибьютор)
+        monitor.distributor.join_delay = 0
+        for account_id, channels in monitor.distributor.distribution.items():
+            for chat_id in channels:
+                monitor.distributor.join_scheduler.submit(account_id, chat_id)
+        await monitor.distributor.join_scheduler.wait()
+    init_seconds = time.perf_counter() - started
+
+    generator = TrafficGenerator(
+        network, rate=args.rate or None, keywords=KEYWORDS,
+        keyword_rate=args.keyword_rate, seed=args.seed
+    )
+    started = time.perf_counter()
+    generated = await generator.run(args.duration)
+    # Дожидаемся обработки уже доставленных обновлений
+    while any(client.pending_updates() for client in network.clients.values()):
+        await asyncio.sleep(0.05)
+    elapsed = time.perf_counter() - started
+
+    processed = monitor.stats['messages_processed']
+    latency = monitor.hit_latency.summary()['total']
+    print(f"Аккаунтов: {args.accounts}, каналов: {args.channels}, запуск монитора: {init_seconds:.2f} сек")
+    print(f"Сгенерировано:   {generated['generated']:>10} ({generated['generated'] / elapsed:,.0f} сообщ/сек), "
+          f"с ключевыми словами {generated['with_keywords']}")
+    print(f"Доставлено:      {network.stats['delivered']:>10} обновлений клиентам")
+    print(f"Обработано:      {processed:>10} ({processed / elapsed:,.0f} сообщ/сек)")
+    print(f"Уведомлений:     {bot_api.sent:>10}")
+    if latency['count']:
+        print(f"Задержка дата->уведомление: p50 {latency['p50'] * 1000:.1f} мс, "
+              f"p95 {latency['p95'] * 1000:.1f} мс, p99 {latency['p99'] * 1000:.1f} мс")
+    print(f"FLOOD_WAIT: {network.stats['flood_waits']}, обрывов: {network.stats['disconnects']}, "
+          f"вступлений: {network.stats['joins']}, ошибок обработки: {monitor.stats['errors']}")
+
+    await monitor.stop_monitoring()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--accounts', type=int, default=10)
+    parser.add_argument('--channels', type=int, default=500)
+    parser.add_argument('--rate', type=float, default=1000, help='сообщений в секунду, 0 - без ограничения')
+    parser.add_argument('--duration', type=float, default=20)
+    parser.add_argument('--keyword-rate', type=float, default=0.01)
+    parser.add_argument('--send-latency', type=float, default=0.05, help='задержка ответа Bot API, сек')
+    parser.add_argument('--request-latency', type=float, default=0.0, help='задержка ответа MTProto, сек')
+    parser.add_argument('--flood-wait-rate', type=float, default=0.0)
+    parser.add_argument('--disconnect-rate', type=float, default=0.0, help='обрывов на клиент в секунду')
+    parser.add_argument('--join', action='store_true', help='аккаунты сначала вступают в каналы')
+    parser.add_argument('--seed', type=int, default=1)
+    args = parser.parse_args()
+
+    logging.disable(logging.WARNING)
+    asyncio.run(run(args))
+
+
+if __name__ == '__main__':
+    main()
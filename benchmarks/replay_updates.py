@@ -0,0 +1,90 @@
+"""Воспроизведение записанного потока сообщений через MessageMonitor.message_handler.
+
+Запись включается переменной MONITOR_RECORD_PATH (MONITOR_RECORD_ANONYMIZE=1 -
+с анонимизацией). Здесь монитор работает на временной базе с заданными
+ключевыми словами, а Bot API заменен заглушкой с настраиваемой задержкой,
+так что видно, как пик нагрузки проходит через поиск, дедупликацию и
+очередь уведомлений.
+
+Запуск из корня репозитория:
+    python benchmarks/replay_updates.py records.jsonl.gz --speed 1
+    python benchmarks/replay_updates.py records.jsonl.gz --speed 10 --send-latency 0.2
+    python benchmarks/replay_updates.py records.jsonl.gz --speed 0 --keywords keywords.json
+"""
+import os
+import sys
+import json
+import asyncio
+import logging
+import argparse
+import tempfile
+from types import SimpleNamespace
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from project.config import KEYWORDS_FILE
+from project.database.database_manager import DatabaseManager
+from project.managers.account_manager import AccountManager
+from project.managers.message_monitor import MessageMonitor
+from project.managers.fake_telegram import FakeNetwork, FakeClientFactory
+from project.managers.update_recorder import UpdateReplayer
+
+ADMIN = 'replay_admin'
+
+
+class BotApiSink:
+    """Заглушка Bot API: считает уведомления, отвечает с задержкой latency"""
+
+    def __init__(self, latency: float):
+        self.latency = latency
+        self.sent = 0
+
+    async def send_message(self, chat_id, text, **kwargs):
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        self.sent += 1
+
+
+async def run(args) -> None:
+    with open(args.keywords, 'r', encoding='utf-8') as f:
+        keywords = json.load(f)
+
+    db = DatabaseManager(super_admin_username=ADMIN, data_dir=tempfile.mkdtemp(prefix='senko_replay_'))
+    db.save_keywords(keywords)
+    await db.save_admin_chat_id(ADMIN, 1)
+
+    account_manager = AccountManager(db.bots_folder, client_factory=FakeClientFactory(FakeNetwork(channels=0), 0))
+    monitor = MessageMonitor(db, account_manager)
+    bot_api = BotApiSink(args.send_latency)
+    monitor.bot = SimpleNamespace(bot=bot_api)
+    monitor.is_monitoring = True
+
+    result = await UpdateReplayer(monitor, args.path, speed=args.speed or None).run()
+
+    print(f"Записей: {result['records']}, ключевых слов: {len(keywords)}, скорость: "
+          + (f"{args.speed:g}x" if args.speed else "максимальная"))
+    print(f"Время:           {result['elapsed']:>10.2f} сек ({result['rate']:,.0f} сообщ/сек)")
+    print(f"Обработано:      {result['processed']:>10} (дубликатов и пустых {result['records'] - result['processed']})")
+    print(f"Найдено слов:    {result['keywords_found']:>10}, уведомлений {bot_api.sent}")
+    print(f"Макс. в работе:  {result['max_in_flight']:>10} сообщений")
+    print(f"Отставание от расписания: {result['max_schedule_lag'] * 1000:.1f} мс, ошибок: {result['errors']}")
+    latency = monitor.hit_latency.summary()
+    for stage in ('match', 'queue', 'send', 'total'):
+        if latency[stage]['count']:
+            print(f"  {stage:<6} p50 {latency[stage]['p50'] * 1000:>8.1f} мс   p99 {latency[stage]['p99'] * 1000:>8.1f} мс")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('path', help='файл записи (.jsonl.gz)')
+    parser.add_argument('--speed', type=float, default=1.0, help='множитель скорости, 0 - максимальная')
+    parser.add_argument('--keywords', default=KEYWORDS_FILE, help='JSON-список ключевых слов')
+    parser.add_argument('--send-latency', type=float, default=0.05, help='задержка ответа Bot API, сек')
+    args = parser.parse_args()
+
+    logging.disable(logging.WARNING)
+    asyncio.run(run(args))
+
+
+if __name__ == '__main__':
+    main()
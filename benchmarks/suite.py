@@ -0,0 +1,514 @@
+"""Набор бенчмарков производительности с сохраненной базовой линией.
+
+Сценарии:
+    keywords     - поиск ключевых слов (MessageMonitor.find_keywords) в зависимости
+                   от числа слов и длины текста
+    handler      - сквозная обработка сообщений монитором на фейковых клиентах
+    distributor  - распределение 100k каналов (distribute_channels) и план
+                   перераспределения (RebalancePlanner)
+    db           - вставка найденных сообщений и запросы статистики в
+                   синтетической monitor.db на 1M строк
+    startup      - импорт пакета и запуск монитора (initialize)
+    logging      - стоимость записи в лог для событийного цикла: синхронные
+                   обработчики против очереди с фоновым потоком, на одну
+                   запись и на одно обработанное сообщение
+
+Результаты пишутся в JSON и сравниваются с benchmarks/baseline.json: метрика,
+ухудшившаяся больше порога (threshold, по умолчанию default_threshold),
+считается регрессией, и процесс завершается с кодом 1. В --quick режиме
+размеры уменьшены, а сравнение идет с отдельной секцией базовой линии.
+
+Запуск из корня репозитория:
+    python benchmarks/suite.py                       # все сценарии, сравнение с базовой линией
+    python benchmarks/suite.py --quick --only keywords handler
+    python benchmarks/suite.py --output results.json
+    python benchmarks/suite.py --update-baseline      # записать текущие значения как базовые
+"""
+import os
+import sys
+import json
+import time
+import random
+import shutil
+import asyncio
+import logging
+import sqlite3
+import argparse
+import platform
+import tempfile
+import threading
+import subprocess
+from contextlib import contextmanager
+from datetime import datetime
+from types import SimpleNamespace
+from typing import Callable, Dict, List
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from project.database.database_manager import DatabaseManager
+from project.managers.account_manager import AccountManager
+from project.managers.message_monitor import MessageMonitor
+from project.managers.smart_distributor import SmartDistributor
+from project.managers.rebalance_planner import RebalancePlanner
+from project.managers.fake_telegram import FakeNetwork, FakeClientFactory, TrafficGenerator, FIRST_CHANNEL_ID
+from project.utils.logger import create_handlers, enqueue_handlers
+
+BASELINE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'baseline.json')
+DEFAULT_THRESHOLD = 0.25
+
+ADMIN = 'bench_admin'
+KEYWORDS = ['купить', 'продам', 'скидка', 'срочно', 'вакансия']
+
+# Размеры сценариев: полный прогон и быстрый (--quick)
+SIZES = {
+    'full': {
+        'keyword_counts': (10, 100, 1000),
+        'text_lengths': (200, 2000, 20000),
+        'keyword_chars': 400000,
+        'handler_accounts': 10,
+        'handler_channels': 1000,
+        'handler_messages': 20000,
+        'distributor_channels': 100000,
+        'distributor_accounts': 200,
+        'db_rows': 1000000,
+        'db_keywords': 2000,
+        'db_inserts': 500,
+        'startup_accounts': 20,
+        'startup_channels': 10000,
+        'logging_records': 20000,
+        'logging_messages': 10000,
+    },
+    'quick': {
+        'keyword_counts': (10, 100),
+        'text_lengths': (200, 2000),
+        'keyword_chars': 100000,
+        'handler_accounts': 5,
+        'handler_channels': 200,
+        'handler_messages': 3000,
+        'distributor_channels': 10000,
+        'distributor_accounts': 50,
+        'db_rows': 100000,
+        'db_keywords': 500,
+        'db_inserts': 100,
+        'startup_accounts': 5,
+        'startup_channels': 1000,
+        'logging_records': 5000,
+        'logging_messages': 3000,
+    },
+}
+
+CASES: Dict[str, Callable] = {}
+
+
+def case(name: str):
+    def register(func):
+        CASES[name] = func
+        return func
+    return register
+
+
+def metric(value: float, unit: str, better: str) -> Dict:
+    return {'value': value, 'unit': unit, 'better': better}
+
+
+def best_of(func: Callable[[], float], repeat: int) -> float:
+    """Минимальное время из repeat запусков: наименее зашумленная оценка"""
+    return min(func() for _ in range(repeat))
+
+
+def make_text(rnd: random.Random, length: int, words: List[str]) -> str:
+    parts = []
+    size = 0
+    while size < length:
+        word = rnd.choice(words)
+        parts.append(word)
+        size += len(word) + 1
+    return ' '.join(parts)[:length]
+
+
+async def start_monitor(accounts: int, channels: int, data_dir: str):
+    """Монитор на FakeNetwork со своей базой в data_dir"""
+    db = DatabaseManager(super_admin_username=ADMIN, data_dir=data_dir)
+    db.save_keywords(KEYWORDS)
+    await db.save_admin_chat_id(ADMIN, 1)
+
+    network = FakeNetwork(channels=channels, seed=1)
+    await db.add_channels_batch([
+        (channel.id, channel.title, channel.username) for channel in network.channels.values()
+    ])
+    account_manager = AccountManager(db.bots_folder, client_factory=FakeClientFactory(network, accounts))
+    monitor = MessageMonitor(db, account_manager)
+
+    async def send_message(chat_id, text, **kwargs):
+        return None
+
+    started = time.perf_counter()
+    await monitor.initialize(SimpleNamespace(bot=SimpleNamespace(send_message=send_message)))
+    return monitor, network, time.perf_counter() - started
+
+
+@case('keywords')
+def bench_keywords(sizes: Dict, workdir: str) -> Dict:
+    rnd = random.Random(1)
+    vocabulary = [''.join(rnd.choice('абвгдеёжзиклмнопрстуфхцчшщэюя') for _ in range(rnd.randint(3, 10)))
+                  for _ in range(5000)]
+    results = {}
+    for length in sizes['text_lengths']:
+        # Одинаковый объем текста на каждую длину: длинных сообщений меньше
+        texts = [make_text(rnd, length, vocabulary) for _ in range(max(10, sizes['keyword_chars'] // length))]
+        for count in sizes['keyword_counts']:
+            keywords = rnd.sample(vocabulary, count)
+
+            def run() -> float:
+                started = time.perf_counter()
+                for text in texts:
+                    MessageMonitor.find_keywords(text, keywords)
+                return time.perf_counter() - started
+
+            elapsed = best_of(run, 3)
+            results[f"keywords.k{count}.len{length}"] = metric(len(texts) / elapsed, 'msg/s', 'higher')
+    return results
+
+
+@case('handler')
+def bench_handler(sizes: Dict, workdir: str) -> Dict:
+    async def run() -> Dict:
+        monitor, network, _ = await start_monitor(
+            sizes['handler_accounts'], sizes['handler_channels'], os.path.join(workdir, 'handler')
+        )
+        generator = TrafficGenerator(network, rate=None, keywords=KEYWORDS, keyword_rate=0.01, seed=1)
+        count = sizes['handler_messages']
+
+        started = time.perf_counter()
+        for offset in range(0, count, 500):
+            generator.emit(min(500, count - offset))
+            while any(client.pending_updates() for client in network.clients.values()):
+                await asyncio.sleep(0)
+        elapsed = time.perf_counter() - started
+
+        processed = monitor.stats['messages_processed']
+        await monitor.stop_monitoring()
+        return {
+            'handler.throughput': metric(processed / elapsed, 'msg/s', 'higher'),
+            'handler.delivered_throughput': metric(network.stats['delivered'] / elapsed, 'upd/s', 'higher'),
+        }
+
+    return asyncio.run(run())
+
+
+@case('distributor')
+def bench_distributor(sizes: Dict, workdir: str) -> Dict:
+    channels = list(range(FIRST_CHANNEL_ID, FIRST_CHANNEL_ID + sizes['distributor_channels']))
+    accounts = [f"account_{index:03d}" for index in range(sizes['distributor_accounts'])]
+
+    async def run(attempt: int) -> float:
+        # Пустая база на каждую попытку: иначе распределение стартует с сохраненного
+        db = DatabaseManager(super_admin_username=ADMIN, data_dir=os.path.join(workdir, f'distributor_{attempt}'))
+        account_manager = AccountManager(db.bots_folder, client_factory=FakeClientFactory(FakeNetwork(channels=0), 0))
+        distributor = SmartDistributor(account_manager, db)
+        # Неравномерная нагрузка: небольшая часть каналов получает большую часть сообщений
+        rnd = random.Random(1)
+        now = time.monotonic()
+        for chat_id in rnd.sample(channels, len(channels) // 10):
+            for _ in range(rnd.randint(1, 20)):
+                distributor.load_tracker.record(chat_id, now)
+
+        started = time.perf_counter()
+        await distributor.distribute_channels(channels, accounts)
+        return time.perf_counter() - started
+
+    distribute_seconds = min(asyncio.run(run(attempt)) for attempt in range(3))
+
+    # Перераспределение после потери десятой части аккаунтов
+    rnd = random.Random(2)
+    current = {account_id: [] for account_id in accounts}
+    for index, chat_id in enumerate(channels):
+        current[accounts[index % len(accounts)]].append(chat_id)
+    alive = accounts[:len(accounts) - len(accounts) // 10]
+    capacities = RebalancePlanner.even_capacities(alive, len(channels), len(channels))
+    memberships = {account_id: set(rnd.sample(channels, 50)) for account_id in alive}
+
+    def plan() -> float:
+        started = time.perf_counter()
+        RebalancePlanner(current, capacities, memberships, channels).plan()
+        return time.perf_counter() - started
+
+    return {
+        'distributor.distribute': metric(distribute_seconds, 's', 'lower'),
+        'distributor.rebalance_plan': metric(best_of(plan, 3), 's', 'lower'),
+    }
+
+
+@case('db')
+def bench_db(sizes: Dict, workdir: str) -> Dict:
+    db = DatabaseManager(super_admin_username=ADMIN, data_dir=os.path.join(workdir, 'db'))
+    rnd = random.Random(1)
+    words = ['продам', 'куплю', 'аренда', 'квартира', 'срочно', 'скидка', 'доставка', 'новости']
+    keywords = [f"слово{index}" for index in range(sizes['db_keywords'])]
+    started_at = time.time()
+
+    def rows():
+        for index in range(sizes['db_rows']):
+            timestamp = datetime.utcfromtimestamp(started_at - rnd.random() * 60 * 86400)
+            yield (
+                FIRST_CHANNEL_ID + rnd.randrange(5000), 'Канал', index, rnd.randrange(10 ** 9), 'Пользователь',
+                make_text(rnd, 200, words), json.dumps([rnd.choice(keywords)], ensure_ascii=False),
+                timestamp.strftime('%Y-%m-%d %H:%M:%S')
+            )
+
+    with sqlite3.connect(db.db_path) as conn:
+        conn.executemany('''
+            INSERT INTO messages (chat_id, chat_title, message_id, sender_id, sender_name, text,
+                                  found_keywords, timestamp)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+        ''', rows())
+        # Агрегаты, которые бот ведет при каждом совпадении, в объеме, соответствующем messages
+        conn.execute('''
+            INSERT INTO keyword_stats (keyword, total_mentions, mentions_today, mentions_week,
+                                       mentions_month, first_mention_date, last_mention_date)
+            SELECT json_extract(found_keywords, '$[0]'), COUNT(*),
+                   SUM(timestamp > datetime('now', '-1 day')), SUM(timestamp > datetime('now', '-7 days')),
+                   SUM(timestamp > datetime('now', '-30 days')), MIN(timestamp), MAX(timestamp)
+            FROM messages GROUP BY 1
+        ''')
+        conn.execute('''
+            INSERT INTO keyword_channel_stats (keyword, channel_id, channel_title, mentions,
+                                               first_mention, last_mention)
+            SELECT json_extract(found_keywords, '$[0]'), chat_id, chat_title, COUNT(*),
+                   MIN(timestamp), MAX(timestamp)
+            FROM messages GROUP BY 1, 2
+        ''')
+        conn.commit()
+
+    async def inserts() -> float:
+        started = time.perf_counter()
+        for index in range(sizes['db_inserts']):
+            await db.add_found_message(
+                chat_id=FIRST_CHANNEL_ID, chat_title='Канал', message_id=index, sender_id=1,
+                sender_name='Пользователь', text=make_text(rnd, 200, words), found_keywords=[rnd.choice(KEYWORDS)]
+            )
+        return time.perf_counter() - started
+
+    insert_seconds = asyncio.run(inserts())
+
+    def monitoring_stats() -> float:
+        started = time.perf_counter()
+        db.get_monitoring_stats()
+        return time.perf_counter() - started
+
+    def keyword_stats() -> float:
+        started = time.perf_counter()
+        asyncio.run(db.get_keyword_stats())
+        return time.perf_counter() - started
+
+    return {
+        'db.insert_found_message': metric(sizes['db_inserts'] / insert_seconds, 'rows/s', 'higher'),
+        'db.monitoring_stats': metric(best_of(monitoring_stats, 3), 's', 'lower'),
+        'db.keyword_stats': metric(best_of(keyword_stats, 3), 's', 'lower'),
+    }
+
+
+@case('startup')
+def bench_startup(sizes: Dict, workdir: str) -> Dict:
+    def import_time() -> float:
+        started = time.perf_counter()
+        subprocess.run(
+            [sys.executable, '-c', 'import project.managers.message_monitor'],
+            cwd=ROOT, check=True, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+        )
+        return time.perf_counter() - started
+
+    async def initialize() -> float:
+        monitor, _, elapsed = await start_monitor(
+            sizes['startup_accounts'], sizes['startup_channels'], os.path.join(workdir, 'startup')
+        )
+        await monitor.stop_monitoring()
+        return elapsed
+
+    return {
+        'startup.import': metric(best_of(import_time, 3), 's', 'lower'),
+        'startup.monitor_initialize': metric(asyncio.run(initialize()), 's', 'lower'),
+    }
+
+
+@contextmanager
+def root_logging(handlers: List[logging.Handler]):
+    """Временная замена обработчиков корневого логгера (на время сценария logging)"""
+    root = logging.getLogger()
+    saved = root.handlers[:]
+    root.handlers = handlers
+    logging.disable(logging.NOTSET)
+    try:
+        yield
+    finally:
+        root.handlers = saved
+        logging.disable(logging.WARNING)
+
+
+class LoopRecordCounter(logging.Handler):
+    """Считает записи, сделанные в потоке событийного цикла"""
+
+    def __init__(self):
+        super().__init__()
+        self.thread_id = threading.get_ident()
+        self.count = 0
+
+    def emit(self, record: logging.LogRecord) -> None:
+        if record.thread == self.thread_id:
+            self.count += 1
+
+
+@case('logging')
+def bench_logging(sizes: Dict, workdir: str) -> Dict:
+    devnull = open(os.devnull, 'w')
+    logs_dir = os.path.join(workdir, 'logs')
+
+    def per_record(queued: bool) -> float:
+        """Время логирующего вызова для потока событийного цикла (с форматированием и записью
+        для синхронных обработчиков, только постановка в очередь - для фонового потока)"""
+        handlers = create_handlers(logs_dir, devnull)
+        queued_handler = enqueue_handlers(handlers) if queued else None
+        logger = logging.getLogger('bench.logging')
+        count = sizes['logging_records']
+        with root_logging([queued_handler] if queued else handlers):
+            started = time.perf_counter()
+            for index in range(count):
+                logger.info("Найдены ключевые слова: %s", ['купить', 'скидка'])
+                if index % 100 == 0:
+                    logger.error("Ошибка при отправке уведомления: %s", TimeoutError('timeout'))
+            elapsed = time.perf_counter() - started
+        if queued:
+            queued_handler.stop()
+        for handler in handlers:
+            handler.close()
+        return elapsed / count
+
+    async def records_per_message() -> float:
+        """Записей в потоке событийного цикла на одно обработанное сообщение (20% с ключевыми словами)"""
+        counter = LoopRecordCounter()
+        with root_logging([counter]):
+            monitor, network, _ = await start_monitor(
+                sizes['handler_accounts'], sizes['handler_channels'], os.path.join(workdir, 'logging')
+            )
+            generator = TrafficGenerator(network, rate=None, keywords=KEYWORDS, keyword_rate=0.2, seed=1)
+            counter.count = 0
+            count = sizes['logging_messages']
+            for offset in range(0, count, 500):
+                generator.emit(min(500, count - offset))
+                while any(client.pending_updates() for client in network.clients.values()):
+                    await asyncio.sleep(0)
+            records = counter.count
+            processed = monitor.stats['messages_processed']
+            await monitor.stop_monitoring()
+        return records / processed
+
+    try:
+        record_sync = best_of(lambda: per_record(False), 3)
+        record_queued = best_of(lambda: per_record(True), 3)
+        rate = asyncio.run(records_per_message())
+    finally:
+        devnull.close()
+    return {
+        'logging.record_sync': metric(record_sync * 1e6, 'us', 'lower'),
+        'logging.record_queued': metric(record_queued * 1e6, 'us', 'lower'),
+        'logging.records_per_message': metric(rate, 'rec/msg', 'lower'),
+        'logging.message_overhead_sync': metric(rate * record_sync * 1e6, 'us', 'lower'),
+        'logging.message_overhead_queued': metric(rate * record_queued * 1e6, 'us', 'lower'),
+    }
+
+
+def compare(metrics: Dict, baseline: Dict) -> List[Dict]:
+    """Сравнение с базовой линией: изменение в долях (положительное - лучше)"""
+    default_threshold = baseline.get('default_threshold', DEFAULT_THRESHOLD)
+    rows = []
+    for name, current in metrics.items():
+        base = baseline.get('metrics', {}).get(name)
+        row = {'name': name, 'value': current['value'], 'unit': current['unit'], 'baseline': None,
+               'change': None, 'status': 'new'}
+        if base and base.get('value'):
+            threshold = base.get('threshold', default_threshold)
+            ratio = current['value'] / base['value']
+            change = ratio - 1 if current['better'] == 'higher' else 1 / ratio - 1
+            row.update(baseline=base['value'], change=change, threshold=threshold)
+            if change < -threshold:
+                row['status'] = 'REGRESSION'
+            elif change > threshold:
+                row['status'] = 'improved'
+            else:
+                row['status'] = 'ok'
+        rows.append(row)
+    return rows
+
+
+def print_report(rows: List[Dict]) -> None:
+    for row in rows:
+        baseline = f"{row['baseline']:>14,.4g}" if row['baseline'] is not None else f"{'-':>14}"
+        change = f"{row['change'] * 100:>+8.1f}%" if row['change'] is not None else f"{'':>9}"
+        print(f"{row['name']:<34} {row['value']:>14,.4g} {row['unit']:<7} {baseline} {change}  {row['status']}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--quick', action='store_true', help='уменьшенные размеры')
+    parser.add_argument('--only', nargs='+', choices=sorted(CASES), help='только указанные сценарии')
+    parser.add_argument('--output', help='файл для результатов в JSON')
+    parser.add_argument('--baseline', default=BASELINE_PATH)
+    parser.add_argument('--update-baseline', action='store_true',
+                        help='записать результаты в базовую линию (пороги сохраняются)')
+    args = parser.parse_args()
+
+    logging.disable(logging.WARNING)
+    mode = 'quick' if args.quick else 'full'
+    sizes = SIZES[mode]
+    workdir = tempfile.mkdtemp(prefix='senko_bench_')
+    metrics = {}
+    try:
+        for name in args.only or CASES:
+            started = time.perf_counter()
+            metrics.update(CASES[name](sizes, workdir))
+            print(f"[{name}] {time.perf_counter() - started:.1f} сек", file=sys.stderr)
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    results = {
+        'mode': mode,
+        'created': datetime.now().isoformat(timespec='seconds'),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'metrics': metrics,
+    }
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(results, f, ensure_ascii=False, indent=2)
+
+    baselines = {}
+    if os.path.exists(args.baseline):
+        with open(args.baseline, 'r', encoding='utf-8') as f:
+            baselines = json.load(f)
+    baseline = baselines.get(mode, {})
+
+    rows = compare(metrics, baseline)
+    print_report(rows)
+
+    if args.update_baseline:
+        section = baselines.setdefault(mode, {'default_threshold': DEFAULT_THRESHOLD, 'metrics': {}})
+        section['created'] = results['created']
+        section['platform'] = results['platform']
+        for name, current in metrics.items():
+            entry = section['metrics'].setdefault(name, {})
+            entry.update(current)
+        with open(args.baseline, 'w', encoding='utf-8') as f:
+            json.dump(baselines, f, ensure_ascii=False, indent=2)
+            f.write('\n')
+        print(f"Базовая линия обновлена: {args.baseline}")
+        return
+
+    regressions = [row['name'] for row in rows if row['status'] == 'REGRESSION']
+    if regressions:
+        print(f"Регрессии: {', '.join(regressions)}")
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
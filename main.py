@@ -38,6 +38,7 @@ logging.getLogger('httpcore').setLevel(logging.WARNING)
 logging.getLogger('telethon').setLevel(logging.WARNING)
 logging.getLogger('aiohttp').setLevel(logging.WARNING)
 logging.getLogger('asyncio').setLevel(logging.WARNING)
+logging.getLogger('aiosqlite').setLevel(logging.WARNING)
 
 
 logging.basicConfig(
@@ -128,6 +129,8 @@ async def setup_application(bot):
         return await monitor_handler.show_monitor_menu(update, context)
 
     application.add_handler(CommandHandler('start', start))
+    application.add_handler(CommandHandler('profile', bot.handlers['admin'].profile_command))
+    application.add_handler(CommandHandler('loglevel', bot.handlers['admin'].loglevel_command))
     
     conversation_handler = ConversationHandler(
         entry_points=[
@@ -349,7 +352,7 @@ async def setup_application(bot):
                 ),
                 CallbackQueryHandler(
                     monitor_handler.handle_monitor_callback,
-                    pattern='^(toggle_monitoring|add_channel|list_channels|check_channels|monitor_stats|monitor_settings|manage_accounts|manage_proxies|manage_keywords|manage_admins|back_to_monitor|delete_channels_menu)$'
+                    pattern='^(toggle_monitoring|add_channel|list_channels|check_channels|monitor_stats|hit_latency|account_telemetry|monitor_settings|manage_accounts|manage_proxies|manage_keywords|manage_admins|back_to_monitor|delete_channels_menu)$'
                 ),
                 CommandHandler('menu', lambda u, c: monitor_handler.show_monitor_menu(u, c))
             ],
@@ -1,20 +1,29 @@
 import os
+import time
+import asyncio
 import sys
 from typing import Optional
-from typing import Dict, List, Optional
+from typing import Dict, List, Optional, Set
 from telegram import Update
 from telegram.ext import ContextTypes
 from .utils.logger import setup_logger, LoggerManager
+from .utils.metrics import MetricsServer
+from .utils.loop_monitor import LoopMonitor
 from .config import (
-    Config, STATES, MONITORING_SETTINGS,
+    Config, STATES, MONITORING_SETTINGS, SETTINGS,
     BOT_TOKEN, SUPER_ADMIN_USERNAME, TELETHON_SETTINGS,
-    BOTS_FOLDER
+    BOTS_FOLDER, SHARDING_SETTINGS, CLUSTER_SETTINGS, METRICS_SETTINGS,
+    LOOP_MONITOR_SETTINGS, RECORDER_SETTINGS
 )
 
 from .handlers.admin_handler import AdminHandler
 from .managers.account_manager import AccountManager
 from .managers.proxy_manager import ProxyManager
 from .managers.message_monitor import MessageMonitor
+from .managers.retention_job import RetentionJob
+from .managers.sharding import ShardCoordinator
+from .managers.cluster import ClusterCoordinator
+from .managers.update_recorder import UpdateRecorder
 from .handlers.account_handler import AccountHandler
 from .handlers.proxy_handler import ProxyHandler
 from .handlers.keyword_handler import KeywordHandler
@@ -68,6 +77,38 @@ class TelegramMonitorBot:
                 db_manager=self.db_manager,
                 account_manager=self.account_manager
             )
+            self.retention_job = RetentionJob(self.db_manager)
+            self.loop_monitor = LoopMonitor(
+                interval=LOOP_MONITOR_SETTINGS['interval'],
+                stall_threshold=LOOP_MONITOR_SETTINGS['stall_threshold']
+            )
+            self.loop_monitor.subscribe(self._on_loop_stall)
+            self._last_stall_alert = 0.0
+            self._alert_tasks: Set[asyncio.Task] = set()
+            self.metrics_server = None
+            if METRICS_SETTINGS['port']:
+                self.metrics_server = MetricsServer(host=METRICS_SETTINGS['host'], port=METRICS_SETTINGS['port'])
+            if RECORDER_SETTINGS['path']:
+                self.message_monitor.recorder = UpdateRecorder(
+                    RECORDER_SETTINGS['path'],
+                    anonymize=RECORDER_SETTINGS['anonymize'],
+                    keywords_source=self.db_manager.load_keywords,
+                    salt=RECORDER_SETTINGS['salt'].encode() or None,
+                    flush_interval=RECORDER_SETTINGS['flush_interval']
+                )
+
+            # Многопроцессный режим: клиенты работают в процессах-воркерах,
+            # здесь остаются интерфейс бота, база и отправка уведомлений
+            self.shard_coordinator = None
+            if SHARDING_SETTINGS['shards'] > 1:
+                self.message_monitor.owned_accounts = set()
+                self.shard_coordinator = ShardCoordinator(self.message_monitor)
+
+            # Кластер: воркеры на других машинах арендуют аккаунты у этого процесса
+            self.cluster_coordinator = None
+            if CLUSTER_SETTINGS['role'] == 'coordinator':
+                self.message_monitor.owned_accounts = set()
+                self.cluster_coordinator = ClusterCoordinator(self.message_monitor)
             
             self.logger.info("Менеджеры инициализированы")
 
@@ -95,13 +136,28 @@ class TelegramMonitorBot:
     async def start(self):
         try:
             try:
-                await self.proxy_manager.check_all_proxies()
+                await self.proxy_manager.health.refresh()
+                self.proxy_manager.health.start()
                 self.logger.info("Прокси проверены")
             except Exception as e:
                 self.logger.error(f"Ошибка при проверке прокси: {e}")
 
+            if self.message_monitor.recorder:
+                self.message_monitor.recorder.start()
             await self.message_monitor.initialize(self)
             self.logger.info("Монитор сообщений инициализирован")
+
+            if self.shard_coordinator:
+                await self.shard_coordinator.start()
+                self.logger.info(f"Запущено процессов-воркеров: {self.shard_coordinator.shards}")
+            if self.cluster_coordinator:
+                await self.cluster_coordinator.start()
+
+            self.retention_job.start()
+            self.loop_monitor.start()
+            if self.metrics_server:
+                await self.metrics_server.start()
+            self.settings_watch_task = asyncio.create_task(SETTINGS.watch())
             
             
         except Exception as e:
@@ -110,8 +166,24 @@ class TelegramMonitorBot:
 
     async def stop(self):
         try:
+            if self.shard_coordinator:
+                await self.shard_coordinator.stop()
+            if self.cluster_coordinator:
+                await self.cluster_coordinator.stop()
             await self.message_monitor.stop_monitoring()
             self.logger.info("Мониторинг остановлен")
+            if self.message_monitor.recorder:
+                await self.message_monitor.recorder.stop()
+
+            await self.proxy_manager.health.stop()
+            await self.retention_job.stop()
+            await self.loop_monitor.stop()
+            if self._alert_tasks:
+                await asyncio.gather(*list(self._alert_tasks), return_exceptions=True)
+            if self.metrics_server:
+                await self.metrics_server.stop()
+            if getattr(self, 'settings_watch_task', None):
+                self.settings_watch_task.cancel()
             
             await self.account_manager.disconnect_all()
             self.logger.info("Аккаунты отключены")
@@ -124,12 +196,32 @@ class TelegramMonitorBot:
     def get_handlers(self) -> Dict:
         return self.handlers
 
+    def _on_loop_stall(self, stall: Dict) -> None:
+        """Алерт админам о долгом зависании цикла (не чаще alert_cooldown)"""
+        if stall['duration'] < LOOP_MONITOR_SETTINGS['alert_threshold']:
+            return
+        now = time.monotonic()
+        if now - self._last_stall_alert < LOOP_MONITOR_SETTINGS['alert_cooldown']:
+            return
+        self._last_stall_alert = now
+        text = (
+            "⚠️ *Зависание событийного цикла*\n\n"
+            f"Длительность: `{stall['duration']:.2f}` сек\n"
+            f"Функция: `{stall['function']}`\n"
+            f"Корутина: `{stall['coroutine'] or '—'}`"
+        )
+        task = asyncio.create_task(self.message_monitor.notify_admins(text))
+        self._alert_tasks.add(task)
+        task.add_done_callback(self._alert_tasks.discard)
+
     async def show_help(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         help_text = (
             "*Справка по использованию бота*\n\n"
             "Доступные команды:\n"
             "/start - Главное меню\n"
-            "/help - Эта справка\n\n"
+            "/help - Эта справка\n"
+            "/profile - Профилирование процесса (для администраторов)\n"
+            "/loglevel - Уровни логирования на ходу (для администраторов)\n\n"
             "Возможности бота:\n"
             "• Мониторинг каналов\n"
             "• Управление аккаунтами\n"
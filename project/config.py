@@ -1,9 +1,11 @@
 import os
 import json
+import time
+import asyncio
 import logging
 import logging.config
 from pathlib import Path
-from typing import Dict, List
+from typing import Any, Callable, Dict, List, Optional, Tuple
 
 logger = logging.getLogger(__name__)
 
@@ -87,6 +89,71 @@ PROXY_SETTINGS = {
     'check_interval': 300,
     'max_simultaneous_checks': 10,
     'banned_timeout': 3600,
+    'rtt_sample_interval': 60,
+    'swap_rtt_p95': 3.0,
+    'swap_min_samples': 10,
+    'swap_cooldown': 1800,
+}
+
+# Контроль событийного цикла: частота пульса, порог зависания и алерта (секунды)
+LOOP_MONITOR_SETTINGS = {
+    'interval': 0.1,
+    'stall_threshold': 0.25,
+    'alert_threshold': 2.0,
+    'alert_cooldown': 300,
+}
+
+# Профилирование по команде /profile из бота
+PROFILER_SETTINGS = {
+    'default_seconds': 30,
+    'max_seconds': 300,
+    'sample_interval': 0.005,
+}
+
+# Ограничение частоты записей в лог: корзина токенов на каждое место вызова
+LOG_THROTTLE_SETTINGS = {
+    'rate': float(os.getenv('MONITOR_LOG_RATE', '5')),  # записей в секунду с одного места, 0 - без ограничения
+    'burst': int(os.getenv('MONITOR_LOG_BURST', '20')),
+    'summary_interval': 60,  # как часто писать сводку о подавленных записях, сек
+    'max_level': 'WARNING',  # ERROR и выше не ограничиваются
+    'default_override_minutes': 15,  # /loglevel без срока: уровень возвращается через 15 минут
+    'max_override_minutes': 120,
+}
+
+# Локальный эндпоинт метрик Prometheus (порт 0 - выключен)
+METRICS_SETTINGS = {
+    'host': os.getenv('MONITOR_METRICS_HOST', '127.0.0.1'),
+    'port': int(os.getenv('MONITOR_METRICS_PORT', '0')),
+}
+
+# Запись входящего потока сообщений для воспроизведения (пустой путь - выключено)
+RECORDER_SETTINGS = {
+    'path': os.getenv('MONITOR_RECORD_PATH', ''),
+    'anonymize': os.getenv('MONITOR_RECORD_ANONYMIZE', '') == '1',
+    # Соль хэшей анонимизации; без нее соль создается в <path>.salt и используется при дописывании
+    'salt': os.getenv('MONITOR_RECORD_SALT', ''),
+    'flush_interval': 1.0,
+}
+
+# Многопроцессный режим: число процессов-воркеров (0 или 1 - все в одном процессе)
+SHARDING_SETTINGS = {
+    'shards': int(os.getenv('MONITOR_SHARDS', '0')),
+    'stats_interval': 30,
+    'stop_timeout': 30,
+    'resolve_timeout': 60,  # разрешение ссылки воркером по запросу координатора
+}
+
+# Кластер из нескольких машин: роль процесса (coordinator / worker / пусто)
+CLUSTER_SETTINGS = {
+    'role': os.getenv('MONITOR_CLUSTER_ROLE', ''),
+    'host': os.getenv('MONITOR_CLUSTER_HOST', '127.0.0.1'),
+    'port': int(os.getenv('MONITOR_CLUSTER_PORT', '8765')),
+    'token': os.getenv('MONITOR_CLUSTER_TOKEN', ''),
+    'heartbeat_interval': 5,
+    'lease_ttl': 20,
+    'capacity': int(os.getenv('MONITOR_WORKER_CAPACITY', '0')),  # 0 - без ограничения
+    'hit_buffer': 1000,
+    'resolve_timeout': 60,  # разрешение ссылки воркером по запросу координатора
 }
 
 # Лимиты
@@ -229,7 +296,8 @@ LOGGING_CONFIG = {
     'loggers': {
         '': {
             'handlers': ['console', 'file'],
-            'level': 'DEBUG',
+            # DEBUG включается на ходу командой /loglevel
+            'level': os.getenv('MONITOR_LOG_LEVEL', 'INFO'),
             'propagate': True
         }
     }
@@ -238,8 +306,8 @@ LOGGING_CONFIG = {
 
 logging.config.dictConfig(LOGGING_CONFIG)
 
-def load_settings() -> Dict:
-    """Загрузка настроек из файла"""
+def _read_settings_file() -> Dict:
+    """Чтение настроек из файла"""
     try:
         if os.path.exists(SETTINGS_FILE):
             with open(SETTINGS_FILE, 'r', encoding='utf-8') as f:
@@ -252,16 +320,140 @@ def load_settings() -> Dict:
         logger.error(f"Ошибка при загрузке настроек: {e}")
         return DEFAULT_MONITORING_SETTINGS.copy()
 
+class SettingsService:
+    """Настройки мониторинга в памяти.
+
+    Файл читается один раз и перечитывается только при изменении его mtime
+    (проверка не чаще раза в check_period секунд) или после save_settings().
+    Значения доступны как типизированные атрибуты (settings.join_channel_delay);
+    подписчики получают словарь изменений {ключ: (старое, новое)}.
+    """
+
+    check_interval: int
+    max_message_length: int
+    max_channels_per_client: int
+    max_keywords: int
+    notification_chunk_size: int
+    retry_interval: int
+    cleanup_interval: int
+    data_retention_days: int
+    auto_restart: bool
+    restart_delay: int
+    max_errors_before_restart: int
+    message_processing_timeout: int
+    join_timeout: int
+    flood_wait_threshold: int
+    join_channel_delay: int
+
+    def __init__(self, path: str = SETTINGS_FILE, check_period: float = 1.0):
+        self._path = path
+        self._check_period = check_period
+        self._mtime: Optional[float] = self._file_mtime()
+        self._values: Dict[str, Any] = {
+            key: self._coerce(key, value) for key, value in _read_settings_file().items()
+        }
+        self._checked_at = time.monotonic()
+        self._listeners: List[Callable[[Dict[str, Tuple[Any, Any]]], None]] = []
+
+    def subscribe(self, callback: Callable[[Dict[str, Tuple[Any, Any]]], None]) -> None:
+        """Подписка на изменение настроек: callback(изменения)"""
+        if callback not in self._listeners:
+            self._listeners.append(callback)
+
+    def unsubscribe(self, callback: Callable[[Dict[str, Tuple[Any, Any]]], None]) -> None:
+        if callback in self._listeners:
+            self._listeners.remove(callback)
+
+    def _file_mtime(self) -> Optional[float]:
+        try:
+            return os.stat(self._path).st_mtime
+        except OSError:
+            return None
+
+    @staticmethod
+    def _coerce(key: str, value: Any) -> Any:
+        default = DEFAULT_MONITORING_SETTINGS.get(key)
+        if default is None or isinstance(value, type(default)):
+            return value
+        try:
+            return type(default)(value)
+        except (TypeError, ValueError):
+            return default
+
+    def reload(self, force: bool = False) -> Dict[str, Tuple[Any, Any]]:
+        """Перечитать файл, если он изменился; возвращает изменения"""
+        self._checked_at = time.monotonic()
+        mtime = self._file_mtime()
+        if not force and mtime == self._mtime:
+            return {}
+        self._mtime = mtime
+
+        values = {key: self._coerce(key, value) for key, value in _read_settings_file().items()}
+        changes = {
+            key: (self._values.get(key), value)
+            for key, value in values.items()
+            if self._values.get(key) != value
+        }
+        self._values = values
+        if changes:
+            logger.info(f"Настройки обновлены: {', '.join(changes)}")
+            for callback in list(self._listeners):
+                try:
+                    callback(changes)
+                except Exception as e:
+                    logger.error(f"Ошибка в подписчике настроек: {e}")
+        return changes
+
+    def _maybe_reload(self) -> None:
+        if time.monotonic() - self._checked_at >= self._check_period:
+            self.reload()
+
+    def __getattr__(self, key: str) -> Any:
+        if key.startswith('_'):
+            raise AttributeError(key)
+        self._maybe_reload()
+        try:
+            return self._values[key]
+        except KeyError:
+            raise AttributeError(key) from None
+
+    def __getitem__(self, key: str) -> Any:
+        self._maybe_reload()
+        return self._values[key]
+
+    def get(self, key: str, default: Any = None) -> Any:
+        self._maybe_reload()
+        return self._values.get(key, default)
+
+    def as_dict(self) -> Dict:
+        self._maybe_reload()
+        return self._values.copy()
+
+    async def watch(self, interval: float = 5.0) -> None:
+        """Фоновое отслеживание изменений файла, чтобы подписчики узнавали
+        о правке settings.json, даже если настройки никто не читает"""
+        while True:
+            await asyncio.sleep(interval)
+            self.reload()
+
+
 def save_settings(settings: Dict) -> bool:
-    """Сохранение настроек в файл"""
+    """Сохранение настроек в файл с немедленным применением"""
     try:
         with open(SETTINGS_FILE, 'w', encoding='utf-8') as f:
             json.dump(settings, f, indent=2, ensure_ascii=False)
+        SETTINGS.reload(force=True)
         return True
     except Exception as e:
         logger.error(f"Ошибка при сохранении настроек: {e}")
         return False
 
+SETTINGS = SettingsService()
+
+def load_settings() -> Dict:
+    """Копия текущих настроек (без чтения файла, если он не менялся)"""
+    return SETTINGS.as_dict()
+
 # Загружаем актуальные настройки
 MONITORING_SETTINGS = load_settings()
 
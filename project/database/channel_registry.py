@@ -0,0 +1,59 @@
+from typing import Dict, Iterable, Optional, Set, Tuple
+
+
+class ChannelRegistry:
+    """Реестр активных каналов в памяти: множество id и индекс username -> id.
+
+    Позволяет проверять, добавлен ли канал, и находить канал по username
+    без обращения к базе. Поддерживается методами DatabaseManager, которые
+    добавляют и удаляют каналы.
+    """
+
+    def __init__(self):
+        self._ids: Set[int] = set()
+        self._usernames: Dict[str, int] = {}
+        self._names_by_id: Dict[int, str] = {}
+
+    @staticmethod
+    def normalize_username(username: Optional[str]) -> Optional[str]:
+        if not username:
+            return None
+        return username.lstrip('@').lower()
+
+    def load(self, rows: Iterable[Tuple[int, Optional[str]]]) -> None:
+        """Полная загрузка из строк (chat_id, username)"""
+        self._ids = set()
+        self._usernames = {}
+        self._names_by_id = {}
+        for chat_id, username in rows:
+            self.add(chat_id, username)
+
+    def add(self, chat_id: int, username: Optional[str] = None) -> None:
+        chat_id = int(chat_id)
+        self._ids.add(chat_id)
+        username = self.normalize_username(username)
+        if username:
+            self._usernames[username] = chat_id
+            self._names_by_id[chat_id] = username
+
+    def remove(self, chat_id: int) -> None:
+        chat_id = int(chat_id)
+        self._ids.discard(chat_id)
+        username = self._names_by_id.pop(chat_id, None)
+        if username and self._usernames.get(username) == chat_id:
+            del self._usernames[username]
+
+    def get_id(self, username: str) -> Optional[int]:
+        return self._usernames.get(self.normalize_username(username))
+
+    def __contains__(self, chat_id) -> bool:
+        try:
+            return int(chat_id) in self._ids
+        except (TypeError, ValueError):
+            return False
+
+    def __len__(self) -> int:
+        return len(self._ids)
+
+    def ids(self) -> Set[int]:
+        return set(self._ids)
@@ -2,12 +2,13 @@ import os
 import json
 import sqlite3
 import logging
-from typing import List, Dict, Optional, Tuple, Any
+from typing import List, Dict, Optional, Set, Tuple, Any
 from telegram import Update
 from telegram.ext import ContextTypes
 from datetime import datetime, timedelta
 import aiosqlite
 from ..config import SUPER_ADMIN_USERNAME
+from .channel_registry import ChannelRegistry
 from project.config import (
     ACCOUNTS_FILE,
     PROXY_FILE,
@@ -19,21 +20,27 @@ from project.config import (
 logger = logging.getLogger(__name__)
 
 class DatabaseManager:
-    def __init__(self, super_admin_username: str = None):
-        """Инициализация менеджера базы данных"""
-        self.db_path = os.path.join(BASE_DIR, 'monitor.db')
-        self.accounts_file = ACCOUNTS_FILE
-        self.proxy_file = PROXY_FILE
-        self.keywords_file = KEYWORDS_FILE
-        self.bots_folder = BOTS_FOLDER
+    def __init__(self, super_admin_username: str = None, data_dir: Optional[str] = None):
+        """Инициализация менеджера базы данных
+
+        data_dir - отдельная папка для базы и файлов данных (нагрузочные прогоны);
+        по умолчанию используются пути из config"""
+        base_dir = data_dir or BASE_DIR
+        self.db_path = os.path.join(base_dir, 'monitor.db')
+        self.accounts_file = os.path.join(data_dir, 'accounts.json') if data_dir else ACCOUNTS_FILE
+        self.proxy_file = os.path.join(data_dir, 'proxy.txt') if data_dir else PROXY_FILE
+        self.keywords_file = os.path.join(data_dir, 'keywords.json') if data_dir else KEYWORDS_FILE
+        self.bots_folder = os.path.join(data_dir, 'bots') if data_dir else BOTS_FOLDER
         self._connection = None
         self.logger = logging.getLogger(__name__)
         self.super_admin_username = super_admin_username or SUPER_ADMIN_USERNAME
+        self.channels = ChannelRegistry()
 
-        os.makedirs(BASE_DIR, exist_ok=True)
+        os.makedirs(base_dir, exist_ok=True)
         os.makedirs(self.bots_folder, exist_ok=True)
 
         self.init_db()
+        self.load_channel_registry()
 
     def is_connected(self) -> bool:
         """Проверка подключения к базе данных"""
@@ -123,10 +130,16 @@ class DatabaseManager:
                         account_id TEXT,
                         is_member BOOLEAN,
                         join_date DATETIME DEFAULT CURRENT_TIMESTAMP,
+                        checked_at REAL,
                         PRIMARY KEY (chat_id, account_id)
                     )
                 ''')
 
+                # Миграция: время последней проверки членства
+                cur.execute('PRAGMA table_info(channel_memberships)')
+                if 'checked_at' not in [row[1] for row in cur.fetchall()]:
+                    cur.execute('ALTER TABLE channel_memberships ADD COLUMN checked_at REAL')
+
                 # Таблица для детальной статистики по каналам
                 cur.execute('''
                     CREATE TABLE IF NOT EXISTS keyword_channel_stats (
@@ -140,6 +153,34 @@ class DatabaseManager:
                     )
                 ''')
 
+                # Кэш разрешения ссылок (username / invite hash -> канал) по аккаунтам
+                cur.execute('''
+                    CREATE TABLE IF NOT EXISTS resolved_links (
+                        link_key TEXT NOT NULL,
+                        account_id TEXT NOT NULL,
+                        chat_id INTEGER NOT NULL,
+                        access_hash INTEGER NOT NULL,
+                        title TEXT,
+                        username TEXT,
+                        resolved_at REAL NOT NULL,
+                        PRIMARY KEY (link_key, account_id)
+                    )
+                ''')
+
+                # Дневные сводки задержек совпадений по этапам (секунды)
+                cur.execute('''
+                    CREATE TABLE IF NOT EXISTS hit_latency_daily (
+                        day TEXT NOT NULL,
+                        stage TEXT NOT NULL,
+                        count INTEGER NOT NULL,
+                        p50 REAL,
+                        p95 REAL,
+                        p99 REAL,
+                        max REAL,
+                        PRIMARY KEY (day, stage)
+                    )
+                ''')
+
                 # Таблица для хранения распределения каналов
                 cur.execute('''
                     CREATE TABLE IF NOT EXISTS channel_distribution (
@@ -164,6 +205,18 @@ class DatabaseManager:
             self.logger.error(f"Ошибка при инициализации базы данных: {e}")
             raise
 
+    def load_channel_registry(self) -> None:
+        """Загрузка реестра активных каналов в память"""
+        try:
+            with sqlite3.connect(self.db_path) as conn:
+                rows = conn.execute(
+                    'SELECT chat_id, username FROM channels WHERE is_active = 1'
+                ).fetchall()
+            self.channels.load(rows)
+            self.logger.info(f"Загружен реестр каналов: {len(self.channels)} каналов")
+        except Exception as e:
+            self.logger.error(f"Ошибка при загрузке реестра каналов: {e}")
+
     async def save_super_admin_chat_id(self, chat_id: int) -> bool:
         """Сохранение chat_id супер-админа"""
         try:
@@ -473,21 +526,26 @@ class DatabaseManager:
             self.logger.error(f"Ошибка при получении топ ключевых слов: {e}")
             return []
 
-    async def save_distribution(self, distribution: Dict[str, List[int]]) -> bool:
-        """Сохранение распределения каналов по аккаунтам"""
+    async def save_distribution(self, distribution: Dict[str, List[int]],
+                                accounts: Optional[Set[str]] = None) -> bool:
+        """Сохранение распределения каналов по аккаунтам.
+
+        accounts - аккаунты, распределением которых владеет вызывающий
+        (процесс-воркер); строки других аккаунтов не удаляются.
+        """
         try:
             async with aiosqlite.connect(self.db_path) as db:
                 # Очищаем старое распределение
-                await db.execute('DELETE FROM channel_distribution')
-                
+                await self.clear_distribution(db, accounts)
+
                 # Сохраняем новое распределение
                 for account_id, channel_ids in distribution.items():
                     for chat_id in channel_ids:
                         await db.execute('''
-                            INSERT INTO channel_distribution (chat_id, account_id)
+                            INSERT OR REPLACE INTO channel_distribution (chat_id, account_id)
                             VALUES (?, ?)
                         ''', (chat_id, account_id))
-                
+
                 await db.commit()
                 return True
                 
@@ -495,6 +553,18 @@ class DatabaseManager:
             self.logger.error(f"Ошибка при сохранении распределения: {e}")
             return False
 
+    @staticmethod
+    async def clear_distribution(db, accounts: Optional[Set[str]] = None) -> None:
+        """Удаление распределения (всего или только указанных аккаунтов) в открытом соединении"""
+        if accounts is None:
+            await db.execute('DELETE FROM channel_distribution')
+        elif accounts:
+            placeholders = ','.join('?' * len(accounts))
+            await db.execute(
+                f'DELETE FROM channel_distribution WHERE account_id IN ({placeholders})',
+                tuple(accounts)
+            )
+
     async def load_distribution(self) -> Dict[str, List[int]]:
         """Загрузка распределения каналов по аккаунтам"""
         try:
@@ -548,6 +618,132 @@ class DatabaseManager:
             self.logger.error(f"Ошибка при обновлении привязки канала: {e}")
             return False
 
+    async def load_memberships(self) -> Dict[str, Dict[int, Tuple[bool, float]]]:
+        """Загрузка членства: аккаунт -> {канал: (состоит ли, время проверки)}"""
+        try:
+            memberships = {}
+            async with aiosqlite.connect(self.db_path) as db:
+                async with db.execute('''
+                    SELECT account_id, chat_id, is_member, COALESCE(checked_at, 0)
+                    FROM channel_memberships
+                ''') as cursor:
+                    async for row in cursor:
+                        account_id, chat_id, is_member, checked_at = row
+                        memberships.setdefault(account_id, {})[chat_id] = (bool(is_member), checked_at)
+
+            return memberships
+
+        except Exception as e:
+            self.logger.error(f"Ошибка при загрузке членства в каналах: {e}")
+            return {}
+
+    async def save_memberships(self, records: List[Tuple[int, str, bool, float]]) -> bool:
+        """Пакетное сохранение членства: (chat_id, account_id, is_member, checked_at)"""
+        try:
+            async with aiosqlite.connect(self.db_path) as db:
+                await db.executemany('''
+                    INSERT INTO channel_memberships (chat_id, account_id, is_member, checked_at)
+                    VALUES (?, ?, ?, ?)
+                    ON CONFLICT(chat_id, account_id) DO UPDATE SET
+                        is_member = excluded.is_member,
+                        checked_at = excluded.checked_at
+                ''', [
+                    (chat_id, account_id, int(is_member), checked_at)
+                    for chat_id, account_id, is_member, checked_at in records
+                ])
+                await db.commit()
+                return True
+
+        except Exception as e:
+            self.logger.error(f"Ошибка при сохранении членства в каналах: {e}")
+            return False
+
+    async def load_resolved_links(self) -> Dict[Tuple[str, str], Tuple[int, int, str, Optional[str], float]]:
+        """Загрузка кэша ссылок: (ключ, аккаунт) -> (chat_id, access_hash, title, username, resolved_at)"""
+        try:
+            links = {}
+            async with aiosqlite.connect(self.db_path) as db:
+                async with db.execute('''
+                    SELECT link_key, account_id, chat_id, access_hash, title, username, resolved_at
+                    FROM resolved_links
+                ''') as cursor:
+                    async for row in cursor:
+                        links[(row[0], row[1])] = tuple(row[2:])
+
+            return links
+
+        except Exception as e:
+            self.logger.error(f"Ошибка при загрузке кэша ссылок: {e}")
+            return {}
+
+    async def save_resolved_link(self, link_key: str, account_id: str, chat_id: int, access_hash: int,
+                                 title: str, username: Optional[str], resolved_at: float) -> bool:
+        try:
+            async with aiosqlite.connect(self.db_path) as db:
+                await db.execute('''
+                    INSERT OR REPLACE INTO resolved_links
+                    (link_key, account_id, chat_id, access_hash, title, username, resolved_at)
+                    VALUES (?, ?, ?, ?, ?, ?, ?)
+                ''', (link_key, account_id, chat_id, access_hash, title, username, resolved_at))
+                await db.commit()
+                return True
+
+        except Exception as e:
+            self.logger.error(f"Ошибка при сохранении ссылки в кэш: {e}")
+            return False
+
+    async def delete_resolved_link(self, link_key: str, account_id: str) -> bool:
+        try:
+            async with aiosqlite.connect(self.db_path) as db:
+                await db.execute(
+                    'DELETE FROM resolved_links WHERE link_key = ? AND account_id = ?',
+                    (link_key, account_id)
+                )
+                await db.commit()
+                return True
+
+        except Exception as e:
+            self.logger.error(f"Ошибка при удалении ссылки из кэша: {e}")
+            return False
+
+    async def save_hit_latency_summary(self, day: str, summary: Dict[str, Dict]) -> bool:
+        """Сохранение дневной сводки задержек: {этап: {count, p50, p95, p99, max}}"""
+        try:
+            async with aiosqlite.connect(self.db_path) as db:
+                for stage, values in summary.items():
+                    await db.execute('''
+                        INSERT OR REPLACE INTO hit_latency_daily
+                        (day, stage, count, p50, p95, p99, max)
+                        VALUES (?, ?, ?, ?, ?, ?, ?)
+                    ''', (day, stage, values['count'], values['p50'], values['p95'], values['p99'], values['max']))
+                await db.commit()
+                return True
+
+        except Exception as e:
+            self.logger.error(f"Ошибка при сохранении сводки задержек: {e}")
+            return False
+
+    async def load_hit_latency_summaries(self, days: int = 7) -> Dict[str, Dict[str, Dict]]:
+        """Дневные сводки задержек за последние дни: {день: {этап: {...}}}"""
+        try:
+            summaries = {}
+            async with aiosqlite.connect(self.db_path) as db:
+                async with db.execute('''
+                    SELECT day, stage, count, p50, p95, p99, max
+                    FROM hit_latency_daily
+                    WHERE day >= date('now', ?)
+                    ORDER BY day DESC
+                ''', (f'-{days} days',)) as cursor:
+                    async for row in cursor:
+                        summaries.setdefault(row[0], {})[row[1]] = {
+                            'count': row[2], 'p50': row[3], 'p95': row[4], 'p99': row[5], 'max': row[6]
+                        }
+            return summaries
+
+        except Exception as e:
+            self.logger.error(f"Ошибка при загрузке сводок задержек: {e}")
+            return {}
+
     def load_keywords(self) -> List[str]:
         try:
             if os.path.exists(self.keywords_file):
@@ -605,149 +801,54 @@ class DatabaseManager:
             logger.error(f"Ошибка при добавлении сообщения: {e}")
             return False
 
-    async def add_multiple_channels(self, channel_links: List[str]) -> Tuple[int, List[str]]:
-        """
-        Массовое добавление каналов с распределением по аккаунтам
-        
-        Args:
-            channel_links: Список ссылок на каналы
-            
-        Returns:
-            Tuple[int, List[str]]: (количество добавленных каналов, список ошибок)
-        """
-        added = 0
-        errors = []
-        new_channels = []
-        
-        # Проверяем наличие клиентов
-        if not self.monitoring_clients:
-            return 0, ["Нет доступных клиентов для добавления каналов"]
-            
-        client = next(iter(self.monitoring_clients.values()))
-        
-        # Обрабатываем каждую ссылку
-        for link in channel_links:
-            try:
-                # Обработка ссылки
-                if link.startswith('https://t.me/'):
-                    if '+' in link:
-                        # Приватная ссылка остается как есть
-                        chat_link = link
-                    else:
-                        username = link.split('/')[-1]
-                        chat_link = f"@{username}"
-                elif not link.startswith('@'):
-                    chat_link = f"@{link}"
-                else:
-                    chat_link = link
-                    
-                self.logger.info(f"Пытаемся добавить чат: {chat_link}")
-                
-                # Получаем информацию о канале
-                try:
-                    entity = await client.get_entity(chat_link)
-                    self.logger.info(f"Получена информация о чате: {entity.title}")
-                    
-                    if not isinstance(entity, (Channel, PeerChannel)):
-                        errors.append(f"{chat_link}: Это не канал или группа")
-                        continue
-                        
-                    # Проверяем, не добавлен ли уже канал
-                    channels = await self.db.load_channels()
-                    if any(int(channel['chat_id']) == entity.id for channel in channels):
-                        errors.append(f"{chat_link}: Канал уже добавлен")
-                        continue
-                        
-                    new_channels.append({
-                        'id': entity.id,
-                        'title': entity.title,
-                        'username': entity.username,
-                        'link': chat_link
-                    })
-                    added += 1
-                    
-                except Exception as e:
-                    errors.append(f"{chat_link}: Не удалось получить информацию о канале: {str(e)}")
-                    continue
-                    
-            except Exception as e:
-                errors.append(f"{chat_link}: {str(e)}")
-                continue
-                
-        if added > 0:
-            try:
-                # Сохраняем новые каналы в базу
-                for channel in new_channels:
-                    success = await self.db.add_channel(
-                        chat_id=channel['id'],
-                        title=channel['title'],
-                        username=channel['username']
-                    )
-                    if not success:
-                        self.logger.error(f"Не удалось сохранить канал {channel['title']} в базу")
-                
-                # Получаем все каналы для распределения
-                all_channels = await self.db.load_channels()
-                available_accounts = list(self.monitoring_clients.keys())
-                
-                # Запускаем перераспределение
-                new_distribution = await self.distributor.distribute_channels(
-                    [int(channel['chat_id']) for channel in all_channels],
-                    available_accounts
-                )
-                
-                # Применяем новое распределение
-                if new_distribution:
-                    await self.distributor.apply_distribution(new_distribution)
-                    
-                    # Для каждого аккаунта обрабатываем его новые каналы
-                    for account_id, channels in new_distribution.items():
-                        client = self.monitoring_clients.get(account_id)
-                        if client:
-                            # Вступаем в новые каналы
-                            for chat_id in channels:
-                                try:
-                                    await self.distributor.safe_join_channel(client, chat_id)
-                                    await asyncio.sleep(self.distributor.join_delay)
-                                except Exception as e:
-                                    errors.append(f"Ошибка при вступлении в канал {chat_id} с аккаунта {account_id}: {str(e)}")
-                                    
-                            # Обновляем обработчики для клиента
-                            handlers_to_remove = []
-                            for handler in client.list_event_handlers():
-                                if handler[0] == self.message_handler:
-                                    handlers_to_remove.append(handler)
-                            
-                            for handler in handlers_to_remove:
-                                client.remove_event_handler(handler[0])
-                                
-                            client.add_event_handler(
-                                self.message_handler,
-                                events.NewMessage(chats=channels)
-                            )
-                            
-                            self.logger.info(f"Обновлены каналы для аккаунта {account_id}: {len(channels)} каналов")
-            
-            except Exception as e:
-                errors.append(f"Ошибка при распределении каналов: {str(e)}")
-                
-        return added, errors
-        
     async def add_channel(self, chat_id: int, title: str, username: str = None) -> bool:
         """Добавление канала в базу данных"""
         try:
             async with aiosqlite.connect(self.db_path) as db:
                 await db.execute('''
-                    INSERT OR IGNORE INTO channels 
-                    (chat_id, title, username, is_active) 
+                    INSERT INTO channels
+                    (chat_id, title, username, is_active)
                     VALUES (?, ?, ?, 1)
+                    ON CONFLICT(chat_id) DO UPDATE SET
+                        title = excluded.title,
+                        username = excluded.username,
+                        is_active = 1
                 ''', (chat_id, title, username))
                 await db.commit()
-                return True
+            self.channels.add(chat_id, username)
+            return True
         except Exception as e:
             self.logger.error(f"Ошибка при добавлении канала: {e}")
             return False
 
+    async def add_channels_batch(self, channels: List[Tuple[int, str, Optional[str]]],
+                                 batch_size: int = 200) -> int:
+        """Пакетное добавление каналов (chat_id, title, username) одним соединением.
+
+        Ранее удаленные каналы снова становятся активными.
+        """
+        added = 0
+        try:
+            async with aiosqlite.connect(self.db_path) as db:
+                for i in range(0, len(channels), batch_size):
+                    batch = channels[i:i + batch_size]
+                    await db.executemany('''
+                        INSERT INTO channels (chat_id, title, username, is_active)
+                        VALUES (?, ?, ?, 1)
+                        ON CONFLICT(chat_id) DO UPDATE SET
+                            title = excluded.title,
+                            username = excluded.username,
+                            is_active = 1
+                    ''', batch)
+                    await db.commit()
+                    for chat_id, _, username in batch:
+                        self.channels.add(chat_id, username)
+                    added += len(batch)
+            return added
+        except Exception as e:
+            self.logger.error(f"Ошибка при пакетном добавлении каналов: {e}")
+            return added
+
     async def load_channels(self) -> List[Dict]:
         """Асинхронная загрузка списка каналов"""
         try:
@@ -786,6 +887,7 @@ class DatabaseManager:
                     (chat_id,)
                 )
                 await db.commit()
+            self.channels.remove(chat_id)
             return True
         except Exception as e:
             logger.error(f"Ошибка при удалении канала: {e}")
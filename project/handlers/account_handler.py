@@ -80,16 +80,16 @@ class AccountHandler:
                        with open(json_path, 'r', encoding='utf-8') as f:
                            config = json.load(f)
 
-                       # Проверяем прокси
+                       # Статус прокси из кэша фоновых проверок (None - еще не проверен)
                        proxy_valid = False
                        try:
                            with open(proxy_path, 'r', encoding='utf-8') as f:
                                proxy_config = json.load(f)
-                               proxy_valid = await self.account_manager.proxy_manager.check_proxy(proxy_config)
+                               proxy_valid = self.account_manager.proxy_manager.health.status(proxy_config)
                        except:
                            proxy_valid = False
-                           
-                       if not proxy_valid:
+
+                       if proxy_valid is False:
                            has_invalid_proxies = True
 
                        # Проверяем аккаунт
@@ -107,7 +107,7 @@ class AccountHandler:
                        
                        # Формируем строку статуса
                        status = "🟢 Онлайн" if is_valid else "🔴 Оффлайн"
-                       proxy_status = "✅" if proxy_valid else "❌"
+                       proxy_status = "⏳" if proxy_valid is None else ("✅" if proxy_valid else "❌")
                        
                        # Получаем имя и информацию
                        name = (f"{config.get('first_name', '')} "
@@ -128,6 +128,7 @@ class AccountHandler:
                message += "🔴 - аккаунт не работает\n"
                message += "✅ - прокси работает\n"
                message += "❌ - прокси не работает\n"
+               message += "⏳ - прокси проверяется\n"
 
            keyboard = [
                [InlineKeyboardButton("🔄 Обновить", callback_data='list_accounts')]
@@ -379,20 +380,7 @@ class AccountHandler:
                         new_proxy = await self.account_manager.proxy_manager.reserve_proxy()
                         
                         if new_proxy:
-                            # Форматируем строку прокси для удаления
-                            proxy_str = f"{new_proxy['addr']}:{new_proxy['port']}:{new_proxy['username']}:{new_proxy['password']}"
-                            
-                            # Читаем текущий список прокси
-                            with open(self.account_manager.proxy_manager.proxy_file, 'r') as f:
-                                proxies = f.readlines()
-                            
-                            # Удаляем использованную прокси из списка
-                            with open(self.account_manager.proxy_manager.proxy_file, 'w') as f:
-                                for proxy in proxies:
-                                    if proxy.strip() != proxy_str:
-                                        f.write(proxy)
-                                        
-                            # Сохраняем новую прокси для аккаунта
+                            # Сохраняем новую прокси для аккаунта (из пула она изъята при резервировании)
                             with open(proxy_path, 'w', encoding='utf-8') as f:
                                 json.dump(new_proxy, f, indent=4)
                                 
@@ -415,15 +403,8 @@ class AccountHandler:
                                     
                                     # Инициализируем мониторинг для нового клиента
                                     try:
-                                        # Получаем распределенные каналы для этого аккаунта
-                                        channels = self.message_monitor.distributor.distribution.get(phone, [])
-                                        
-                                        # Добавляем обработчик сообщений для каналов
-                                        if channels:
-                                            new_client.add_event_handler(
-                                                self.message_monitor.message_handler,
-                                                events.NewMessage(chats=channels)
-                                            )
+                                        # Каналы аккаунта берутся из общей таблицы маршрутизации
+                                        self.message_monitor.register_client_handler(phone, new_client)
                                         
                                         # Обновляем статистику активных клиентов
                                         self.message_monitor.stats['active_clients'] = len(
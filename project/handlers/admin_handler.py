@@ -1,7 +1,12 @@
+import io
 import logging
+import threading
+from datetime import datetime
 from telegram import Update, InlineKeyboardButton, InlineKeyboardMarkup
 from telegram.ext import ContextTypes
-from ..config import STATES
+from ..config import STATES, PROFILER_SETTINGS, LOG_THROTTLE_SETTINGS
+from ..utils.profiler import SamplingProfiler, MemorySnapshots, profile_loop
+from ..utils.log_throttle import THROTTLE, LEVELS
 import asyncio
 
 logger = logging.getLogger(__name__)
@@ -11,6 +16,8 @@ class AdminHandler:
         self.db = db_manager
         self.logger = logging.getLogger(__name__)
         self.monitor_handler = None
+        self.memory_snapshots = MemorySnapshots()
+        self._profile_task = None
 
     def set_monitor_handler(self, monitor_handler):
         self.monitor_handler = monitor_handler
@@ -290,6 +297,157 @@ class AdminHandler:
             await query.answer("❌ Произошла ошибка при удалении администратора")
             return STATES['MANAGING_ADMINS']
 
+    async def profile_command(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
+        """/profile [cpu|cprofile] [сек] - профиль CPU, /profile mem [stop] - снимок памяти"""
+        try:
+            if not await self.db.is_admin(update.effective_user.username):
+                await update.message.reply_text("❌ У вас нет доступа к этой команде")
+                return
+
+            args = context.args or []
+            mode = args[0].lower() if args else 'cpu'
+
+            if mode == 'mem':
+                if len(args) > 1 and args[1].lower() == 'stop':
+                    self.memory_snapshots.stop()
+                    await update.message.reply_text("✅ Отслеживание памяти остановлено")
+                    return
+                first = self.memory_snapshots.previous is None
+                documents = await asyncio.get_running_loop().run_in_executor(None, self.memory_snapshots.take)
+                await self._send_documents(
+                    update.message,
+                    documents,
+                    "📸 Первый снимок памяти. Следующий /profile mem покажет разницу с ним"
+                    if first else "📸 Снимок памяти и разница с предыдущим"
+                )
+                return
+
+            if mode not in ('cpu', 'cprofile'):
+                await update.message.reply_text(
+                    "Использование:\n"
+                    "/profile cpu [сек] - сэмплирующий профиль (свернутые стеки для flame graph)\n"
+                    "/profile cprofile [сек] - cProfile потока цикла\n"
+                    "/profile mem - снимок памяти tracemalloc и разница с предыдущим\n"
+                    "/profile mem stop - остановить отслеживание памяти"
+                )
+                return
+
+            if self._profile_task and not self._profile_task.done():
+                await update.message.reply_text("⏳ Профилирование уже выполняется")
+                return
+
+            try:
+                seconds = int(args[1]) if len(args) > 1 else PROFILER_SETTINGS['default_seconds']
+            except ValueError:
+                seconds = PROFILER_SETTINGS['default_seconds']
+            seconds = max(1, min(seconds, PROFILER_SETTINGS['max_seconds']))
+
+            await update.message.reply_text(f"⏱ Профилирование ({mode}) запущено на {seconds} сек")
+            # Отдельная задача: обработка остальных обновлений не ждет окончания профиля
+            self._profile_task = asyncio.create_task(self._run_profile(update.message, mode, seconds))
+
+        except Exception as e:
+            self.logger.error(f"Ошибка при обработке /profile: {e}")
+            await update.message.reply_text("❌ Произошла ошибка при профилировании")
+
+    async def _run_profile(self, message, mode: str, seconds: int):
+        try:
+            if mode == 'cprofile':
+                documents = await profile_loop(seconds)
+            else:
+                profiler = SamplingProfiler(threading.get_ident(), PROFILER_SETTINGS['sample_interval'])
+                documents = await profiler.run_for(seconds)
+            await self._send_documents(message, documents, f"✅ Профиль ({mode}) за {seconds} сек")
+        except Exception as e:
+            self.logger.error(f"Ошибка при профилировании: {e}")
+            await message.reply_text("❌ Произошла ошибка при профилировании")
+
+    async def loglevel_command(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
+        """/loglevel <логгер> <уровень> [минуты] - временный уровень логгера, /loglevel [логгер] reset - сброс"""
+        try:
+            if not await self.db.is_admin(update.effective_user.username):
+                await update.message.reply_text("❌ У вас нет доступа к этой команде")
+                return
+
+            args = context.args or []
+            if not args:
+                await update.message.reply_text(self._format_log_levels())
+                return
+
+            if args[0].lower() == 'reset':
+                LEVELS.reset_all()
+                await update.message.reply_text("✅ Уровни всех логгеров восстановлены")
+                return
+
+            name = '' if args[0] == 'root' else args[0]
+            if len(args) < 2:
+                await update.message.reply_text("❌ Укажите уровень: DEBUG, INFO, WARNING, ERROR или reset")
+                return
+
+            if args[1].lower() == 'reset':
+                if LEVELS.reset(name):
+                    await update.message.reply_text(f"✅ Уровень логгера {args[0]} восстановлен")
+                else:
+                    await update.message.reply_text(f"ℹ️ Уровень логгера {args[0]} не менялся")
+                return
+
+            level = logging.getLevelName(args[1].upper())
+            if not isinstance(level, int):
+                await update.message.reply_text("❌ Неизвестный уровень: DEBUG, INFO, WARNING, ERROR, CRITICAL")
+                return
+
+            try:
+                minutes = int(args[2]) if len(args) > 2 else LOG_THROTTLE_SETTINGS['default_override_minutes']
+            except ValueError:
+                minutes = LOG_THROTTLE_SETTINGS['default_override_minutes']
+            minutes = max(1, min(minutes, LOG_THROTTLE_SETTINGS['max_override_minutes']))
+
+            LEVELS.set_level(name, level, minutes * 60)
+            self.logger.warning(
+                f"Уровень логгера {args[0]} изменен на {args[1].upper()} на {minutes} мин "
+                f"(@{update.effective_user.username})"
+            )
+            await update.message.reply_text(
+                f"✅ Логгер {args[0]}: {args[1].upper()} на {minutes} мин, ограничение частоты для него отключено"
+            )
+
+        except Exception as e:
+            self.logger.error(f"Ошибка при обработке /loglevel: {e}")
+            await update.message.reply_text("❌ Произошла ошибка при изменении уровня логирования")
+
+    def _format_log_levels(self) -> str:
+        lines = ["📝 Логирование\n"]
+        overrides = LEVELS.get_overrides()
+        if overrides:
+            for name, item in overrides.items():
+                until = datetime.fromtimestamp(item['until']).strftime('%H:%M:%S') if item['until'] else "до сброса"
+                lines.append(f"• {name or 'root'}: {item['level']} (до {until})")
+        else:
+            lines.append("Уровни логгеров не изменены")
+
+        stats = THROTTLE.get_stats()
+        lines.append(
+            f"\nОграничение частоты: {THROTTLE.rate:g} записей/сек с одного места, запас {THROTTLE.burst}; "
+            f"мест вызова: {stats['callsites']}, подавлено с последней сводки: {stats['suppressed_pending']}"
+        )
+        lines.append(
+            "\nИспользование:\n"
+            "/loglevel <логгер> <уровень> [минуты] - например, "
+            "/loglevel project.managers.message_monitor DEBUG 10\n"
+            "/loglevel <логгер> reset - вернуть уровень логгера\n"
+            "/loglevel reset - вернуть все уровни\n"
+            "Корневой логгер - root"
+        )
+        return "\n".join(lines)
+
+    async def _send_documents(self, message, documents, caption: str):
+        for index, (filename, data) in enumerate(documents):
+            await message.reply_document(
+                document=io.BytesIO(data),
+                filename=filename,
+                caption=caption if index == 0 else None
+            )
+
     def get_handlers(self):
         """Получить все обработчики для регистрации"""
         return [
@@ -297,5 +455,7 @@ class AdminHandler:
             self.handle_admin_callback,
             self.add_admin,
             self.list_admins,
-            self.remove_admin
+            self.remove_admin,
+            self.profile_command,
+            self.loglevel_command
         ]
\ No newline at end of file
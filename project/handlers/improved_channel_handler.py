@@ -1,10 +1,17 @@
 import logging
 import asyncio
-from telethon import events
 from typing import List, Dict, Tuple, Any
-from telethon.tl.types import Channel, PeerChannel, Chat, InputPeerChannel
-from telethon.tl.functions.channels import JoinChannelRequest
+from telethon.errors import FloodWaitError
+from telethon.tl.types import InputPeerChannel
 from telethon.tl.functions.messages import ImportChatInviteRequest
+from ..managers.rebalance_planner import RebalancePlanner
+from ..managers.resolution_cache import ResolvedChannel
+from ..utils.helpers import RateLimiter, ThrottledProgress
+
+# Не более 1 запроса get_entity за 3 секунды на клиента
+RESOLVE_RATE_LIMIT = (1, 3.0)
+# Минимальный интервал между обновлениями статуса, секунд
+PROGRESS_INTERVAL = 3.0
 
 class ImprovedChannelHandler:
     def __init__(self, message_monitor, db_manager):
@@ -13,125 +20,126 @@ class ImprovedChannelHandler:
         self.logger = logging.getLogger(__name__)
         
     async def process_channel_addition(self, channel_links: List[str], progress_callback) -> Tuple[int, List[str]]:
-        added = 0
+        """Пакетное добавление каналов.
+
+        Этапы: разбор и дедупликация ссылок, параллельное получение сущностей
+        через все клиенты (с ограничением частоты на клиента), пакетная запись
+        в базу, перераспределение и передача вступлений в JoinScheduler.
+        """
         errors = []
-        total = len(channel_links)
-        new_channels = []
+        progress = ThrottledProgress(progress_callback, PROGRESS_INTERVAL)
 
         try:
-            if not self.monitor.monitoring_clients:
+            if not self.monitor.monitoring_clients and not self.monitor.remote_resolver:
                 return 0, ["❌ Нет доступных клиентов для добавления каналов"]
 
-            # Получаем текущее распределение    
-            distribution_before = await self.monitor.distributor.load_distribution()
+            # Получаем текущее распределение (у координатора без клиентов - из базы)
+            distributor = self.monitor.distributor
+            if distributor:
+                distribution_before = await distributor.load_distribution()
+            else:
+                distribution_before = await self.db.load_distribution()
             stats_before = self._get_distribution_stats(distribution_before)
-            
-            # Проверяем валидность каналов через один клиент
-            check_client = next(iter(self.monitor.monitoring_clients.values()))
 
-            for i, link in enumerate(channel_links, 1):
-                try:
-                    status = f"🔄 *Проверка канала {i}/{total}*\n\n"
-                    await progress_callback(status)
+            # Этап 1: разбор и дедупликация (проверка по реестру каналов в памяти)
+            registry = self.db.channels
+            links = []
+            seen = set()
+            for link in channel_links:
+                chat_link = self._process_channel_link(link.strip())
+                # Хэш приглашения чувствителен к регистру, username - нет
+                key = chat_link.lower() if chat_link.startswith('@') else chat_link
+                if key in seen:
+                    continue
+                seen.add(key)
+                if key.startswith('@') and registry.get_id(key) is not None:
+                    errors.append(f"{link}: Канал уже добавлен")
+                    continue
+                links.append((link, chat_link))
 
-                    chat_link = self._process_channel_link(link)
-                    entity = await check_client.get_entity(chat_link)
+            total = len(links)
+            await progress.update(
+                f"🔄 *Проверка каналов*\n\n"
+                f"📋 Уникальных ссылок: `{total}` из `{len(channel_links)}`",
+                force=True
+            )
 
-                    if not isinstance(entity, (Channel, PeerChannel)):
-                        errors.append(f"{link}: Это не канал или группа")
-                        continue
+            # Этап 2: параллельное получение сущностей
+            if self.monitor.monitoring_clients:
+                resolved = await self._resolve_links(links, errors, progress)
+            else:
+                resolved = await self._resolve_links_remote(links, errors, progress)
 
-                    if await self._is_channel_exists(entity.id):
-                        errors.append(f"{link}: Канал уже добавлен")
-                        continue
+            new_channels = {}
+            cached_links = {}  # канал -> ссылка, взятая из кэша без запроса к Telegram
+            for link, entity in resolved:
+                if entity.id in registry or entity.id in new_channels:
+                    errors.append(f"{link}: Канал уже добавлен")
+                    continue
+                new_channels[entity.id] = entity
+                if entity.cached:
+                    cached_links[entity.id] = self._process_channel_link(link.strip())
 
-                    # Сохраняем канал в базу
-                    await self.db.add_channel(
-                        chat_id=entity.id,
-                        title=entity.title,
-                        username=entity.username
-                    )
-                    
-                    new_channels.append({
-                        'id': entity.id,
-                        'title': entity.title,
-                        'entity': entity
-                    })
-                    added += 1
+            async def on_joined(account_id: str, chat_id: int, joined: bool) -> None:
+                chat_link = cached_links.pop(chat_id, None)
+                if not joined and chat_link:
+                    await self._refresh_cached_link(account_id, chat_id, chat_link)
 
-                except Exception as e:
-                    errors.append(f"{link}: {str(e)}")
-                    continue
+            # Этап 3: пакетная запись в базу
+            added = 0
+            if new_channels:
+                added = await self.db.add_channels_batch([
+                    (entity.id, entity.title, entity.username) for entity in new_channels.values()
+                ])
+
+            await progress.flush()
 
             if added > 0:
-                await progress_callback(
+                await progress.update(
                     "⚡️ *Распределение каналов*\n\n"
-                    "🔄 Расчет оптимального распределения..."
+                    "🔄 Расчет оптимального распределения...",
+                    force=True
                 )
 
-                # Получаем все каналы и выполняем распределение
-                all_channels = await self.db.load_channels()
-                channel_ids = [int(channel['chat_id']) for channel in all_channels]
+                # Этап 4: распределение и передача вступлений планировщику
+                channel_ids = list(registry.ids())
+                if distributor:
+                    capacities = RebalancePlanner.even_capacities(
+                        list(self.monitor.monitoring_clients.keys()),
+                        len(channel_ids),
+                        distributor.max_channels_per_account
+                    )
+                    plan = await distributor.plan_rebalance(channel_ids, capacities)
+                    plan = await distributor.apply_plan(plan, background=True, on_joined=on_joined)
+                    joins = plan['joins']
+                    distribution_after = plan['distribution']
+                else:
+                    # Координатор: каналы распределяют и вступают в них воркеры
+                    if self.monitor.channels_changed:
+                        await self.monitor.channels_changed()
+                    joins = "на воркерах"
+                    distribution_after = distribution_before
+                self.monitor.stats['watched_channels'] = len(channel_ids)
+
+                stats_after = self._get_distribution_stats(distribution_after)
                 
-                new_distribution = await self.monitor.distributor.distribute_channels(
-                    channel_ids,
-                    list(self.monitor.monitoring_clients.keys())
+                result = (
+                    "📊 *Результаты добавления каналов*\n\n"
+                    f"✅ Успешно добавлено: `{added}`\n"
+                    f"❌ Ошибок: `{len(errors)}`\n"
+                    f"📋 Всего обработано: `{len(channel_links)}`\n"
+                    f"🚪 Вступлений в очереди: `{joins}`\n\n"
+                    "*Распределение до:*\n" +
+                    self._format_distribution_stats(stats_before) +
+                    "\n*Распределение после:*\n" +
+                    self._format_distribution_stats(stats_after)
                 )
 
-                if new_distribution:
-                    await self.monitor.distributor.apply_distribution(new_distribution)
-
-                    # Теперь вступаем в каналы
-                    for account_id, channels in new_distribution.items():
-                        client = self.monitor.monitoring_clients.get(account_id)
-                        if client:
-                            for new_channel in new_channels:
-                                if new_channel['id'] in channels:
-                                    await progress_callback(
-                                        f"🔄 Вступаем в канал {new_channel['title']} через аккаунт {account_id}..."
-                                    )
-                                    
-                                    # Добавляем задержку перед вступлением
-                                    for sec in range(30, 0, -1):
-                                        if sec % 5 == 0:
-                                            await progress_callback(
-                                                f"⏳ Ожидание перед вступлением: {sec} сек"
-                                            )
-                                        await asyncio.sleep(1)
-                                    
-                                    try:
-                                        await self.safe_join_channel(client, new_channel['id'])
-                                        await asyncio.sleep(5)
-                                    except Exception as e:
-                                        self.logger.error(f"Ошибка при вступлении в канал {new_channel['id']}: {e}")
-
-                            # Обновляем обработчики
-                            for handler in client.list_event_handlers():
-                                client.remove_event_handler(handler[0])
-
-                            client.add_event_handler(
-                                self.monitor.message_handler,
-                                events.NewMessage(chats=channels)
-                            )
-
-                    stats_after = self._get_distribution_stats(new_distribution)
-                    
-                    result = (
-                        "📊 *Результаты добавления каналов*\n\n"
-                        f"✅ Успешно добавлено: `{added}`\n"
-                        f"❌ Ошибок: `{len(errors)}`\n"
-                        f"📋 Всего обработано: `{total}`\n\n"
-                        "*Распределение до:*\n" +
-                        self._format_distribution_stats(stats_before) +
-                        "\n*Распределение после:*\n" +
-                        self._format_distribution_stats(stats_after)
-                    )
-
-                    if errors:
-                        result += "\n\n❌ *Ошибки при добавлении:*\n"
-                        result += "\n".join(f"• {error}" for error in errors)
+                if errors:
+                    result += "\n\n❌ *Ошибки при добавлении:*\n"
+                    result += "\n".join(f"• {error}" for error in errors)
 
-                    await progress_callback(result)
+                await progress.update(result, force=True)
 
             return added, errors
 
@@ -139,6 +147,94 @@ class ImprovedChannelHandler:
             self.logger.error(f"Ошибка при добавлении каналов: {e}")
             return 0, [f"Критическая ошибка: {str(e)}"]
 
+    async def _resolve_links(self, links: List[Tuple[str, str]], errors: List[str],
+                             progress: ThrottledProgress) -> List[Tuple[str, Any]]:
+        """Получение сущностей каналов: сначала кэш ссылок, остальное - один воркер
+        на клиента с общей очередью"""
+        cache = self.monitor.resolution_cache
+        resolved = []
+        queue = asyncio.Queue()
+        for link, chat_link in links:
+            cached = await cache.lookup(chat_link)
+            if cached:
+                resolved.append((link, cached))
+            else:
+                queue.put_nowait((link, chat_link))
+
+        done = 0
+        total = len(links)
+
+        async def worker(account_id: str, client):
+            nonlocal done
+            limiter = RateLimiter(*RESOLVE_RATE_LIMIT)
+            while True:
+                try:
+                    link, chat_link = queue.get_nowait()
+                except asyncio.QueueEmpty:
+                    return
+
+                await limiter.acquire()
+                try:
+                    entity = await cache.resolve(account_id, client, chat_link, force=True)
+                    resolved.append((link, entity))
+                except FloodWaitError as e:
+                    # Ссылку обработает другой клиент, этот пережидает ограничение
+                    queue.put_nowait((link, chat_link))
+                    self.logger.warning(f"Флуд-контроль у {account_id}, ожидание {e.seconds} сек")
+                    await asyncio.sleep(e.seconds)
+                    continue
+                except Exception as e:
+                    errors.append(f"{link}: {e}")
+
+                done += 1
+                await progress.update(
+                    f"🔄 *Проверка каналов {done}/{total}*\n\n"
+                    f"✅ Найдено: `{len(resolved)}`\n"
+                    f"❌ Ошибок: `{len(errors)}`"
+                )
+
+        await asyncio.gather(*[
+            worker(account_id, client)
+            for account_id, client in list(self.monitor.monitoring_clients.items())
+        ])
+        return resolved
+
+    async def _refresh_cached_link(self, account_id: str, chat_id: int, chat_link: str) -> None:
+        """Вступление в канал из кэша ссылок не удалось: запись могла устареть.
+        Ссылка разрешается заново, и при том же канале вступление повторяется."""
+        cache = self.monitor.resolution_cache
+        try:
+            await cache.invalidate_link(chat_link)
+            client = self.monitor.monitoring_clients.get(account_id)
+            if not client:
+                return
+            entity = await cache.resolve(account_id, client, chat_link, force=True)
+            if entity.id != chat_id:
+                self.logger.warning(f"Ссылка {chat_link} теперь ведет на другой канал ({entity.id}), канал {chat_id} пропущен")
+                return
+            self.monitor.distributor.join_scheduler.submit(account_id, chat_id)
+        except Exception as e:
+            self.logger.error(f"Не удалось заново разрешить ссылку {chat_link}: {e}")
+
+    async def _resolve_links_remote(self, links: List[Tuple[str, str]], errors: List[str],
+                                    progress: ThrottledProgress) -> List[Tuple[str, Any]]:
+        """Получение сущностей каналов через воркеры (координатор без своих клиентов)"""
+        limiter = RateLimiter(*RESOLVE_RATE_LIMIT)
+        resolved = []
+        for done, (link, chat_link) in enumerate(links, 1):
+            await limiter.acquire()
+            try:
+                channel = await self.monitor.remote_resolver(chat_link)
+                resolved.append((link, ResolvedChannel(channel['id'], 0, channel['title'], channel['username'])))
+            except Exception as e:
+                errors.append(f"{link}: {e}")
+            await progress.update(
+                f"🔄 *Проверка каналов {done}/{len(links)}*\n\n"
+                f"✅ Найдено: `{len(resolved)}`\n"
+                f"❌ Ошибок: `{len(errors)}`"
+            )
+        return resolved
+
     def _process_channel_link(self, link: str) -> str:
         if link.startswith('https://t.me/'):
             if '+' in link:
@@ -149,64 +245,6 @@ class ImprovedChannelHandler:
             return f"@{link}"
         return link
 
-    async def _is_channel_exists(self, chat_id: int) -> bool:
-        channels = await self.db.load_channels()
-        return any(int(channel['chat_id']) == chat_id for channel in channels)
-
-    async def safe_join_channel(self, client, chat_id: int) -> bool:
-        """Безопасное вступление в канал или группу"""
-        try:
-            try:
-                # Сначала пробуем получить сущность через username
-                entity = None
-                channels = await self.db.load_channels()
-                for channel in channels:
-                    if int(channel['chat_id']) == chat_id and channel.get('username'):
-                        try:
-                            entity = await client.get_entity(f"@{channel['username']}")
-                            break
-                        except:
-                            pass
-
-                # Если не получилось через username, пробуем напрямую через ID
-                if not entity:
-                    entity = await client.get_entity(chat_id)
-
-                # Пытаемся вступить
-                if isinstance(entity, (Channel, Chat)):
-                    try:
-                        await client(JoinChannelRequest(entity))
-                        self.logger.info(f"Успешно присоединились к чату: {entity.title}")
-                        await asyncio.sleep(2)
-                        return True
-                    except Exception as e:
-                        self.logger.error(f"Ошибка при вступлении в чат {entity.title}: {e}")
-                        return False
-                else:
-                    self.logger.error(f"Неподдерживаемый тип чата: {type(entity)}")
-                    return False
-
-            except ValueError as e:
-                # Если не удалось получить сущность, пробуем через диалоги
-                try:
-                    dialogs = await client.get_dialogs()
-                    for dialog in dialogs:
-                        if dialog.entity.id == chat_id:
-                            entity = dialog.entity
-                            await client(JoinChannelRequest(entity))
-                            self.logger.info(f"Успешно присоединились к чату через диалоги: {entity.title}")
-                            await asyncio.sleep(2)
-                            return True
-                    self.logger.error(f"Не удалось найти чат {chat_id} в диалогах")
-                    return False
-                except Exception as e:
-                    self.logger.error(f"Ошибка при поиске в диалогах: {e}")
-                    return False
-
-        except Exception as e:
-            self.logger.error(f"Ошибка при получении информации о чате {chat_id}: {e}")
-            return False
-
     def _get_distribution_stats(self, distribution: Dict[str, List[int]]) -> Dict[str, Any]:
         stats = {
             'total_channels': sum(len(channels) for channels in distribution.values()),
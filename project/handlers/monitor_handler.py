@@ -1,12 +1,13 @@
 import logging
 import asyncio
-from project.config import STATES, load_settings, MESSAGE_TEMPLATES, MONITORING_SETTINGS
+from project.config import STATES, load_settings, save_settings, MESSAGE_TEMPLATES, MONITORING_SETTINGS
 from typing import List, Dict, Optional, Tuple, Any
 from telegram import Update, InlineKeyboardButton, InlineKeyboardMarkup, error as telegram_error
 from telegram.ext import ContextTypes
 from telegram import ReplyKeyboardMarkup, KeyboardButton
 from datetime import datetime
 from project.managers.message_monitor import MessageMonitor
+from project.managers.hit_latency import STAGE_TITLES
 from telegram import error as telegram_error
 from .improved_channel_handler import ImprovedChannelHandler
 
@@ -149,6 +150,12 @@ class MonitorHandler:
                 return await self.list_channels(update, context)
             elif query.data == 'check_channels':
                 return await self.check_channels(query, context)
+            elif query.data == 'monitor_stats':
+                return await self.show_detailed_stats(query, context)
+            elif query.data == 'hit_latency':
+                return await self.show_hit_latency(query, context)
+            elif query.data == 'account_telemetry':
+                return await self.show_account_telemetry(query, context)
             elif query.data == 'confirm_delete':
                 return await self.delete_all_channels(update, context)
             elif query.data == 'cancel_delete':
@@ -662,7 +669,6 @@ class MonitorHandler:
 
     async def edit_notifications(self, query: Update, context: ContextTypes.DEFAULT_TYPE):
         try:
-            from ..config import load_settings
             settings = load_settings()
             
             keyboard = [
@@ -1324,6 +1330,8 @@ class MonitorHandler:
 
             keyboard = [
                 [InlineKeyboardButton("🔄 Обновить", callback_data='monitor_stats')],
+                [InlineKeyboardButton("⏱ Задержки уведомлений", callback_data='hit_latency')],
+                [InlineKeyboardButton("📶 Задержки аккаунтов", callback_data='account_telemetry')],
                 [InlineKeyboardButton("« Назад", callback_data='back_to_monitor')]
             ]
             
@@ -1340,6 +1348,87 @@ class MonitorHandler:
             await query.edit_message_text("❌ Произошла ошибка при загрузке статистики")
             return STATES['MONITORING']
 
+    async def show_hit_latency(self, query: Update, context: ContextTypes.DEFAULT_TYPE):
+        """Показать, на каких этапах теряется время между сообщением и уведомлением"""
+        try:
+            def seconds(value):
+                return f"{value:.2f}" if value is not None else "—"
+
+            summary = self.monitor.hit_latency.summary()
+            lines = ["⏱ *Задержки уведомлений*", "", "_Последние совпадения, сек (p50 / p95 / p99):_"]
+            for stage, title in STAGE_TITLES.items():
+                values = summary[stage]
+                if not values['count']:
+                    continue
+                lines.append(
+                    f"• {title}: `{seconds(values['p50'])} / {seconds(values['p95'])} / "
+                    f"{seconds(values['p99'])}` ({values['count']})"
+                )
+            if not summary['total']['count'] and not summary['match']['count']:
+                lines.append("Пока нет данных")
+
+            daily = await self.monitor.db.load_hit_latency_summaries(days=7)
+            if daily:
+                lines.extend(["", "_Итого по дням (p50 / p95 / p99):_"])
+                for day, stages in daily.items():
+                    total = stages.get('total')
+                    if total:
+                        lines.append(
+                            f"• {day}: `{seconds(total['p50'])} / {seconds(total['p95'])} / "
+                            f"{seconds(total['p99'])}` ({total['count']})"
+                        )
+
+            keyboard = [
+                [InlineKeyboardButton("🔄 Обновить", callback_data='hit_latency')],
+                [InlineKeyboardButton("« Назад", callback_data='monitor_stats')]
+            ]
+
+            await query.edit_message_text(
+                "\n".join(lines),
+                reply_markup=InlineKeyboardMarkup(keyboard),
+                parse_mode='Markdown'
+            )
+            return STATES['MONITORING']
+
+        except Exception as e:
+            logger.error(f"Ошибка при отображении задержек: {e}")
+            await query.edit_message_text("❌ Произошла ошибка при загрузке задержек")
+            return STATES['MONITORING']
+
+    async def show_account_telemetry(self, query: Update, context: ContextTypes.DEFAULT_TYPE):
+        """Показать время ответа, задержку обновлений и переподключения по аккаунтам"""
+        try:
+            def seconds(value):
+                return f"{value:.2f}" if value is not None else "—"
+
+            snapshot = self.monitor.telemetry.snapshot()
+            lines = ["📶 *Задержки аккаунтов*", "", "_Ответ RPC и доставка обновлений, сек (p50 / p95):_"]
+            for account_id, values in snapshot.items():
+                lines.append(
+                    f"• `{account_id}`: RPC `{seconds(values['rtt_p50'])} / {seconds(values['rtt_p95'])}`, "
+                    f"обновления `{seconds(values['lag_p50'])} / {seconds(values['lag_p95'])}`, "
+                    f"переподключений {values['reconnects']}"
+                )
+            if not snapshot:
+                lines.append("Пока нет данных")
+
+            keyboard = [
+                [InlineKeyboardButton("🔄 Обновить", callback_data='account_telemetry')],
+                [InlineKeyboardButton("« Назад", callback_data='monitor_stats')]
+            ]
+
+            await query.edit_message_text(
+                "\n".join(lines),
+                reply_markup=InlineKeyboardMarkup(keyboard),
+                parse_mode='Markdown'
+            )
+            return STATES['MONITORING']
+
+        except Exception as e:
+            logger.error(f"Ошибка при отображении задержек аккаунтов: {e}")
+            await query.edit_message_text("❌ Произошла ошибка при загрузке задержек аккаунтов")
+            return STATES['MONITORING']
+
     async def show_settings(self, query: Update, context: ContextTypes.DEFAULT_TYPE):
         """Показать настройки мониторинга"""
         try:
@@ -1398,6 +1487,8 @@ class MonitorHandler:
             self.list_channels,               # Список каналов
             self.check_channels,              # Проверка каналов
             self.show_detailed_stats,         # Подробная статистика
+            self.show_hit_latency,            # Задержки уведомлений
+            self.show_account_telemetry,      # Задержки аккаунтов
             self.show_settings,               # Настройки
             self.remove_channel,              # Удаление канала
             self.toggle_monitoring,           # Включение/выключение мониторинга
@@ -88,8 +88,7 @@ class ProxyHandler:
                return await self.check_proxies(query, context)
                    
            elif query.data == 'delete_all_proxies':
-               with open(self.proxy_manager.proxy_file, 'w', encoding='utf-8') as f:
-                   f.write('')
+               self.proxy_manager.clear_proxies()
                await query.message.edit_text(
                    "✅ Все прокси успешно удалены",
                    reply_markup=InlineKeyboardMarkup([[
@@ -301,7 +300,7 @@ class ProxyHandler:
        """Проверка всех прокси"""
        try:
            message = await query.message.edit_text("🔄 Проверка прокси...")
-           results = await self.proxy_manager.check_all_proxies()
+           results = await self.proxy_manager.check_all_proxies(force=True)
            
            working = sum(1 for _, is_working in results if is_working)
            total = len(results)
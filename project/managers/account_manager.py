@@ -9,16 +9,20 @@ from telethon.tl.types import InputPeerEmpty
 from typing import Tuple, Optional, List, Dict
 from datetime import datetime
 from ..config import BOTS_FOLDER
+from .telegram_client import TelegramClientLike, ClientFactory
 
 logger = logging.getLogger(__name__)
 
 class AccountManager:
-    def __init__(self, bots_folder: str, proxy_manager=None):
-        if not proxy_manager:
+    def __init__(self, bots_folder: str, proxy_manager=None, client_factory: Optional[ClientFactory] = None):
+        if not proxy_manager and not client_factory:
             raise ValueError("ProxyManager должен быть предоставлен")
             
         self.bots_folder = bots_folder
         self.proxy_manager = proxy_manager
+        # Внешняя фабрика (например, FakeClientFactory) заменяет аккаунты из папки и TelegramClient
+        self.client_factory = client_factory
+        self.connect_delay = client_factory.connect_delay if client_factory else 1
         self.logger = logging.getLogger(__name__)
         self.locks = {}  # Словарь для блокировок
         self.monitoring_clients = {}  # Словарь для клиентов
@@ -43,7 +47,7 @@ class AccountManager:
             try:
                 with open(json_path, 'r', encoding='utf-8') as f:
                     config = json.load(f)
-                    self.logger.info(f"JSON конфигурация загружена: {json.dumps(config, indent=2)}")
+                    self.logger.debug(f"JSON конфигурация загружена: {json.dumps(config)}")
             except json.JSONDecodeError as e:
                 self.logger.error(f"Ошибка парсинга JSON: {e}")
                 return False, "Неверный формат JSON файла"
@@ -119,19 +123,9 @@ class AccountManager:
                 with open(os.path.join(account_folder, "proxy.json"), 'w', encoding='utf-8') as f:
                     json.dump(proxy, f, indent=4, ensure_ascii=False)
 
-                # Форматируем строку прокси для удаления
-                proxy_string = f"{proxy['addr']}:{proxy['port']}:{proxy['username']}:{proxy['password']}"
-                
-                # Удаляем использованную прокси из файла прокси
-                with open(self.proxy_manager.proxy_file, 'r') as f:
-                    proxies = f.readlines()
-                
-                with open(self.proxy_manager.proxy_file, 'w') as f:
-                    for p in proxies:
-                        if p.strip() != proxy_string:
-                            f.write(p)
-
-                self.logger.info(f"Аккаунт {phone} успешно импортирован, прокси {proxy_string} удалена из списка")
+                # Прокси уже изъят из пула при резервировании
+                used_proxy = None
+                self.logger.info(f"Аккаунт {phone} успешно импортирован, прокси {proxy['addr']}:{proxy['port']}")
                 return True, f"Аккаунт {phone} успешно импортирован"
 
             except Exception as e:
@@ -139,14 +133,19 @@ class AccountManager:
                 return False, f"Ошибка при проверке аккаунта: {str(e)}"
 
         finally:
+            if used_proxy:
+                # Импорт не удался - прокси возвращается в пул
+                await self.proxy_manager.return_proxy(used_proxy)
             if client:
                 try:
                     await client.disconnect()
                 except:
                     pass
 
-    async def create_client(self, phone: str) -> Optional[TelegramClient]:
+    async def create_client(self, phone: str) -> Optional[TelegramClientLike]:
         """Создание клиента Telegram"""
+        if self.client_factory:
+            return await self.client_factory.create_client(phone)
         try:
             account_folder = os.path.join(self.bots_folder, phone)
             self.logger.info(f"Проверка файлов для аккаунта {phone} в папке {account_folder}")
@@ -172,14 +171,14 @@ class AccountManager:
                 safe_config = config.copy()
                 if 'app_hash' in safe_config:
                     safe_config['app_hash'] = safe_config['app_hash'][:8] + '...'
-                self.logger.info(f"📱 Конфигурация аккаунта {phone}: {json.dumps(safe_config, indent=2, ensure_ascii=False)}")
+                self.logger.debug(f"📱 Конфигурация аккаунта {phone}: {json.dumps(safe_config, ensure_ascii=False)}")
 
             with open(proxy_file, 'r', encoding='utf-8') as f:
                 proxy = json.load(f)
                 safe_proxy = proxy.copy()
                 if 'password' in safe_proxy:
                     safe_proxy['password'] = '***'
-                self.logger.info(f"🔒 Прокси для {phone}: {json.dumps(safe_proxy, indent=2, ensure_ascii=False)}")
+                self.logger.debug(f"🔒 Прокси для {phone}: {json.dumps(safe_proxy, ensure_ascii=False)}")
 
             # Проверяем api_id и api_hash
             api_id = config.get('app_id') or config.get('api_id')
@@ -304,6 +303,8 @@ class AccountManager:
 
     def get_accounts(self) -> List[str]:
         """Получение списка аккаунтов"""
+        if self.client_factory:
+            return self.client_factory.get_accounts()
         try:
             accounts = []
             for item in os.listdir(self.bots_folder):
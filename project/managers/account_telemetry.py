@@ -0,0 +1,150 @@
+import time
+import random
+import logging
+from collections import deque
+from typing import Deque, Dict, List, Optional
+from telethon.tl.functions import PingRequest
+from ..config import PROXY_SETTINGS
+from ..utils.metrics import REGISTRY
+
+logger = logging.getLogger(__name__)
+
+# Границы корзин гистограмм, секунд
+LATENCY_BUCKETS = (0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+ACCOUNT_RTT = REGISTRY.histogram(
+    'monitor_account_rtt_seconds', 'Время ответа RPC аккаунта через прокси', ['account'], LATENCY_BUCKETS
+)
+UPDATE_LAG = REGISTRY.histogram(
+    'monitor_update_lag_seconds', 'Задержка доставки обновлений (дата сообщения -> получение)', ['account'],
+    LATENCY_BUCKETS + (30.0, 60.0)
+)
+
+
+class LatencyWindow:
+    """Скользящее окно последних замеров задержки"""
+
+    def __init__(self, size: int = 200):
+        self.samples: Deque[float] = deque(maxlen=size)
+
+    def add(self, value: float) -> None:
+        self.samples.append(value)
+
+    def __len__(self) -> int:
+        return len(self.samples)
+
+    def percentile(self, p: float) -> Optional[float]:
+        if not self.samples:
+            return None
+        ordered = sorted(self.samples)
+        index = min(len(ordered) - 1, int(round(p / 100 * (len(ordered) - 1))))
+        return ordered[index]
+
+
+class AccountTelemetry:
+    """Телеметрия аккаунтов: время ответа RPC через прокси, задержка
+    доставки обновлений (дата сообщения -> получение) и переподключения.
+
+    Окна последних замеров нужны для p95 и смены прокси; все замеры также
+    попадают в гистограммы monitor_account_rtt_seconds и
+    monitor_update_lag_seconds с меткой account."""
+
+    def __init__(self, window: int = 200):
+        self.window = window
+        self.rtt: Dict[str, LatencyWindow] = {}
+        self.lag: Dict[str, LatencyWindow] = {}
+        self.reconnects: Dict[str, int] = {}
+
+    def _window(self, store: Dict[str, LatencyWindow], account_id: str) -> LatencyWindow:
+        if account_id not in store:
+            store[account_id] = LatencyWindow(self.window)
+        return store[account_id]
+
+    def record_rtt(self, account_id: str, seconds: float) -> None:
+        self._window(self.rtt, account_id).add(seconds)
+        ACCOUNT_RTT.labels(account_id).observe(seconds)
+
+    def record_lag(self, account_id: str, message_date) -> None:
+        """Задержка обновления по дате сообщения (datetime с часовым поясом)"""
+        if account_id and message_date:
+            lag = max(0.0, time.time() - message_date.timestamp())
+            self._window(self.lag, account_id).add(lag)
+            UPDATE_LAG.labels(account_id).observe(lag)
+
+    def record_reconnect(self, account_id: str) -> None:
+        self.reconnects[account_id] = self.reconnects.get(account_id, 0) + 1
+
+    def p95_rtt(self, account_id: str) -> Optional[float]:
+        window = self.rtt.get(account_id)
+        return window.percentile(95) if window else None
+
+    def reset(self, account_id: str) -> None:
+        """Сброс замеров задержки (после смены прокси они не относятся к новому)"""
+        self.rtt.pop(account_id, None)
+        self.lag.pop(account_id, None)
+
+    def forget(self, account_id: str) -> None:
+        self.reset(account_id)
+        self.reconnects.pop(account_id, None)
+        ACCOUNT_RTT.remove(account_id)
+        UPDATE_LAG.remove(account_id)
+
+    async def sample_rtt(self, account_id: str, client) -> Optional[float]:
+        """Замер времени ответа одного легкого RPC-запроса"""
+        try:
+            started = time.monotonic()
+            await client(PingRequest(ping_id=random.getrandbits(63)))
+            rtt = time.monotonic() - started
+            self.record_rtt(account_id, rtt)
+            return rtt
+        except Exception as e:
+            logger.warning(f"Не удалось измерить задержку аккаунта {account_id}: {e}")
+            return None
+
+    def snapshot(self) -> Dict[str, Dict]:
+        accounts = set(self.rtt) | set(self.lag) | set(self.reconnects)
+        result = {}
+        for account_id in sorted(accounts):
+            rtt = self.rtt.get(account_id)
+            lag = self.lag.get(account_id)
+            result[account_id] = {
+                'rtt_p50': rtt.percentile(50) if rtt else None,
+                'rtt_p95': rtt.percentile(95) if rtt else None,
+                'lag_p50': lag.percentile(50) if lag else None,
+                'lag_p95': lag.percentile(95) if lag else None,
+                'reconnects': self.reconnects.get(account_id, 0),
+            }
+        return result
+
+
+class ProxySwapPolicy:
+    """Смена прокси аккаунта, у которого p95 времени ответа выше порога.
+
+    Решение принимается по достаточному числу замеров и не чаще, чем раз
+    в cooldown секунд на аккаунт; саму смену выполняет MessageMonitor.
+    """
+
+    def __init__(self, telemetry: AccountTelemetry, threshold: float = None,
+                 min_samples: int = None, cooldown: float = None):
+        self.telemetry = telemetry
+        self.threshold = threshold or PROXY_SETTINGS['swap_rtt_p95']
+        self.min_samples = min_samples or PROXY_SETTINGS['swap_min_samples']
+        self.cooldown = cooldown or PROXY_SETTINGS['swap_cooldown']
+        self._last_swap: Dict[str, float] = {}
+
+    def candidates(self, account_ids: List[str], now: Optional[float] = None) -> List[str]:
+        now = now or time.time()
+        result = []
+        for account_id in account_ids:
+            window = self.telemetry.rtt.get(account_id)
+            if not window or len(window) < self.min_samples:
+                continue
+            if now - self._last_swap.get(account_id, 0) < self.cooldown:
+                continue
+            if window.percentile(95) > self.threshold:
+                result.append(account_id)
+        return result
+
+    def mark_swapped(self, account_id: str, now: Optional[float] = None) -> None:
+        self._last_swap[account_id] = now or time.time()
+        self.telemetry.reset(account_id)
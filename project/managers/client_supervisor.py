@@ -0,0 +1,196 @@
+import asyncio
+import random
+import logging
+from typing import Callable, List, Optional, Awaitable
+from telethon.errors import FloodWaitError
+from ..utils.metrics import REGISTRY
+
+logger = logging.getLogger(__name__)
+
+FLOOD_WAIT_SECONDS = REGISTRY.counter(
+    'monitor_flood_wait_seconds_total', 'Суммарное ожидание FLOOD_WAIT', ['account', 'source']
+)
+
+
+class ClientState:
+    CONNECTING = 'connecting'
+    READY = 'ready'
+    COOLING = 'cooling'
+    FAILED = 'failed'
+
+
+class ClientSupervisor:
+    """Супервизор одного клиента: подключение, проверка состояния и переподключение с backoff"""
+
+    def __init__(self, account_id: str, account_manager, client=None,
+                 base_delay: float = 5, max_delay: float = 300,
+                 max_attempts: int = 6, check_interval: float = 30):
+        self.account_id = account_id
+        self.account_manager = account_manager
+        self.client = client
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.max_attempts = max_attempts
+        self.check_interval = check_interval
+        self.state = ClientState.READY if client else ClientState.CONNECTING
+        self.attempt = 0
+        self.last_error: Optional[str] = None
+        self.last_exception: Optional[Exception] = None  # для FloodWaitError нужен сам объект (seconds)
+        self.reconnects = 0
+        self._broken = False
+        self.logger = logging.getLogger(__name__)
+        self._listeners: List[Callable[..., Awaitable[None]]] = []
+        self._wake = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+
+    def subscribe(self, callback: Callable[..., Awaitable[None]]) -> None:
+        """Подписка на смену состояния: callback(account_id, old_state, new_state, client)"""
+        if callback not in self._listeners:
+            self._listeners.append(callback)
+
+    def unsubscribe(self, callback: Callable[..., Awaitable[None]]) -> None:
+        if callback in self._listeners:
+            self._listeners.remove(callback)
+
+    def start(self) -> None:
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except (asyncio.CancelledError, Exception):
+                pass
+            self._task = None
+        await self._disconnect()
+
+    @property
+    def is_ready(self) -> bool:
+        return self.state == ClientState.READY
+
+    def _record_error(self, error: Exception) -> None:
+        self.last_error = str(error)
+        self.last_exception = error
+
+    def report_failure(self, error: Exception) -> None:
+        """Сообщить об ошибке клиента; переподключение начнется сразу, без ожидания общей проверки"""
+        self._record_error(error)
+        if self.state == ClientState.READY:
+            self.logger.warning(f"Получена ошибка клиента {self.account_id}: {error}")
+            self._broken = True
+        self._wake.set()
+
+    def backoff_delay(self, attempt: int) -> float:
+        """Экспоненциальная задержка с джиттером"""
+        delay = min(self.max_delay, self.base_delay * (2 ** attempt))
+        return random.uniform(delay / 2, delay)
+
+    async def _set_state(self, new_state: str) -> None:
+        old_state = self.state
+        if old_state == new_state:
+            return
+        self.state = new_state
+        self.logger.info(f"Клиент {self.account_id}: {old_state} -> {new_state}")
+        for callback in list(self._listeners):
+            try:
+                await callback(self.account_id, old_state, new_state, self.client)
+            except Exception as e:
+                self.logger.error(f"Ошибка в подписчике супервизора {self.account_id}: {e}")
+
+    async def _disconnect(self) -> None:
+        client = self.client
+        self.client = None
+        if client:
+            try:
+                await client.disconnect()
+            except Exception:
+                pass
+
+    async def _check_health(self) -> bool:
+        client = self.client
+        if not client or self._broken:
+            return False
+        try:
+            if not client.is_connected():
+                return False
+            return await client.is_user_authorized()
+        except Exception as e:
+            self._record_error(e)
+            return False
+
+    async def _connect(self) -> bool:
+        await self._set_state(ClientState.CONNECTING)
+        await self._disconnect()
+        self._broken = False
+        self.last_exception = None
+        try:
+            client = await self.account_manager.create_client(self.account_id)
+        except Exception as e:
+            self._record_error(e)
+            client = None
+        if not client:
+            return False
+        self.client = client
+        self.attempt = 0
+        await self._set_state(ClientState.READY)
+        return True
+
+    def _cooldown_for_error(self) -> float:
+        error = self.last_exception
+        if isinstance(error, FloodWaitError):
+            FLOOD_WAIT_SECONDS.labels(self.account_id, 'reconnect').inc(error.seconds)
+            return float(error.seconds)
+        return self.backoff_delay(self.attempt)
+
+    async def _wait(self, timeout: float) -> None:
+        try:
+            await asyncio.wait_for(self._wake.wait(), timeout)
+        except asyncio.TimeoutError:
+            pass
+        self._wake.clear()
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                if self.state == ClientState.READY:
+                    await self._wait(self.check_interval)
+                    if await self._check_health():
+                        continue
+                    self.reconnects += 1
+                    self.logger.warning(f"Клиент {self.account_id} неработоспособен: {self.last_error}")
+
+                if self.state == ClientState.FAILED:
+                    # Аккаунт выведен из работы; ждем явного сигнала или редкой повторной попытки
+                    await self._wait(self.max_delay)
+                    self.attempt = 0
+
+                if await self._connect():
+                    continue
+
+                self.attempt += 1
+                if self.attempt >= self.max_attempts:
+                    self.logger.error(
+                        f"Не удалось восстановить клиент {self.account_id} "
+                        f"после {self.attempt} попыток: {self.last_error}"
+                    )
+                    await self._set_state(ClientState.FAILED)
+                    continue
+
+                delay = self._cooldown_for_error()
+                self.logger.info(
+                    f"Повторное подключение {self.account_id} через {delay:.1f} сек "
+                    f"(попытка {self.attempt}/{self.max_attempts})"
+                )
+                await self._set_state(ClientState.COOLING)
+                await asyncio.sleep(delay)
+
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                # Супервизор не завершается: клиент будет проверен и переподключен после паузы
+                self._record_error(e)
+                self._broken = True
+                self.logger.error(f"Ошибка в супервизоре клиента {self.account_id}: {e}")
+                await asyncio.sleep(self.backoff_delay(self.attempt))
@@ -0,0 +1,576 @@
+"""Режим кластера: координатор и воркеры мониторинга на нескольких машинах.
+
+Протокол - JSON-строки поверх TCP, по одному объекту на строку.
+
+Воркер -> координатор:
+    hello      {worker, token, capacity, held}  - регистрация (held - аккаунты,
+                                                  которые воркер уже держит)
+    heartbeat  {stats, held}                    - продление аренды
+    hit        {hit}                            - найденное совпадение
+    resolved   {id, channel | error}            - ответ на resolve
+Координатор -> воркер:
+    welcome    {heartbeat_interval, lease_ttl}
+    error      {error}                          - отказ в регистрации
+    lease      {accounts, ttl}                  - полный список арендованных
+                                                  воркером аккаунтов; аккаунты,
+                                                  которых нет в списке, отозваны
+    assign     {distribution}                   - каналы аккаунтов воркера
+    resolve    {id, link}                       - разрешить ссылку на канал
+                                                  (у координатора нет клиентов)
+
+Аренда действует lease_ttl секунд и продлевается каждым heartbeat. Если
+воркер пропал, координатор по истечении аренды передает его аккаунты
+другим воркерам; воркер, потерявший связь с координатором, сам отключает
+аккаунты после истечения своей аренды. Отозванный у живого воркера
+аккаунт выдается другому только после того, как прежний владелец
+перестал указывать его в held, так что одна сессия не работает на двух
+узлах одновременно.
+
+Запуск воркера:
+    MONITOR_CLUSTER_HOST=... python -m project.managers.cluster --worker-id node1
+"""
+import json
+import math
+import time
+import asyncio
+import logging
+import argparse
+from collections import deque
+from typing import Dict, List, Optional, Set, Tuple
+from ..config import BOTS_FOLDER, CLUSTER_SETTINGS
+
+logger = logging.getLogger(__name__)
+
+# Назначение каналов для тысяч каналов не помещается в стандартный лимит строки asyncio
+STREAM_LIMIT = 4 * 1024 * 1024
+
+
+def encode(message: Dict) -> bytes:
+    return json.dumps(message, ensure_ascii=False).encode() + b'\n'
+
+
+async def read_message(reader: asyncio.StreamReader) -> Optional[Dict]:
+    """Следующее сообщение или None, если соединение закрыто"""
+    line = await reader.readline()
+    if not line:
+        return None
+    return json.loads(line)
+
+
+class WorkerSession:
+    """Подключение воркера на стороне координатора"""
+
+    def __init__(self, worker_id: str, writer: asyncio.StreamWriter, capacity: int = 0):
+        self.worker_id = worker_id
+        self.writer = writer
+        self.capacity = capacity
+        self.last_seen = time.monotonic()
+
+    async def send(self, message: Dict) -> None:
+        self.writer.write(encode(message))
+        await self.writer.drain()
+
+    def close(self) -> None:
+        self.writer.close()
+
+
+class ClusterCoordinator:
+    """Координатор кластера в процессе бота.
+
+    Выдает воркерам аренду аккаунтов из общего пула, распределяет каналы
+    между арендованными аккаунтами через SmartDistributor и рассылает
+    воркерам их части распределения; совпадения от воркеров публикуются
+    через MessageMonitor.publish_hit.
+    """
+
+    def __init__(self, message_monitor, distributor=None, settings: Dict = CLUSTER_SETTINGS):
+        self.monitor = message_monitor
+        self.distributor = distributor
+        self.settings = settings
+        self.logger = logger
+        self.workers: Dict[str, WorkerSession] = {}
+        self.leases: Dict[str, Tuple[str, float]] = {}  # account_id -> (worker_id, истекает)
+        self.draining: Dict[str, Tuple[str, float]] = {}  # отозванные, но еще не освобожденные
+        self._channels: Set[int] = set()
+        self._server: Optional[asyncio.AbstractServer] = None
+        self._reaper: Optional[asyncio.Task] = None
+        self._lock = asyncio.Lock()
+        self._owns_distributor = False
+        self._hit_tasks: Set[asyncio.Task] = set()
+        self._requests: Dict[int, asyncio.Future] = {}
+        self._next_request = 0
+        # Каналы добавляются в процессе бота без клиентов: ссылку разрешает воркер,
+        # новое распределение рассылается воркерам сразу после изменения списка каналов
+        self.monitor.remote_resolver = self.resolve
+        self.monitor.channels_changed = self.reload
+
+    async def start(self) -> None:
+        if self.distributor is None:
+            # Отдельный дистрибьютор без клиентов: координатор только планирует
+            from .smart_distributor import SmartDistributor
+            self.distributor = SmartDistributor(
+                self.monitor.account_manager, self.monitor.db,
+                self.monitor.load_tracker, self.monitor.membership_cache
+            )
+            await self.distributor.initialize()
+            self._owns_distributor = True
+        self.distributor.subscribe(self._on_distribution_changed)
+
+        self._server = await asyncio.start_server(
+            self._handle_connection, self.settings['host'], self.settings['port'], limit=STREAM_LIMIT
+        )
+        self._reaper = asyncio.create_task(self._reap_loop())
+        self.logger.info(f"Координатор кластера слушает {self.settings['host']}:{self.settings['port']}")
+
+    async def stop(self) -> None:
+        if self._reaper:
+            self._reaper.cancel()
+            try:
+                await self._reaper
+            except asyncio.CancelledError:
+                pass
+            self._reaper = None
+        if self._server:
+            self._server.close()
+            await self._server.wait_closed()
+            self._server = None
+        for session in list(self.workers.values()):
+            session.close()
+        self.workers.clear()
+        if self._hit_tasks:
+            await asyncio.gather(*list(self._hit_tasks), return_exceptions=True)
+        self.monitor.remote_stats.clear()
+        if self._owns_distributor:
+            self.distributor.close()
+            self.distributor = None
+            self._owns_distributor = False
+
+    def accounts_of(self, worker_id: str) -> List[str]:
+        return sorted(
+            account_id for account_id, (owner, _) in self.leases.items() if owner == worker_id
+        )
+
+    async def _handle_connection(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        session = None
+        try:
+            hello = await asyncio.wait_for(read_message(reader), self.settings['lease_ttl'])
+            if not hello or hello.get('type') != 'hello' or not hello.get('worker'):
+                writer.close()
+                return
+            if self.settings['token'] and hello.get('token') != self.settings['token']:
+                writer.write(encode({'type': 'error', 'error': 'неверный токен'}))
+                await writer.drain()
+                writer.close()
+                return
+
+            session = WorkerSession(hello['worker'], writer, int(hello.get('capacity') or 0))
+            previous = self.workers.get(session.worker_id)
+            if previous:
+                previous.close()
+            self.workers[session.worker_id] = session
+            await session.send({
+                'type': 'welcome',
+                'heartbeat_interval': self.settings['heartbeat_interval'],
+                'lease_ttl': self.settings['lease_ttl']
+            })
+            self.logger.info(f"Подключен воркер {session.worker_id}")
+
+            async with self._lock:
+                self._reclaim(session.worker_id, hello.get('held') or [])
+                await self._rebalance(force=True)
+
+            while True:
+                message = await read_message(reader)
+                if message is None:
+                    break
+                await self._dispatch(session, message)
+
+        except (asyncio.TimeoutError, ConnectionError, json.JSONDecodeError) as e:
+            self.logger.warning(f"Соединение с воркером прервано: {e}")
+        except Exception as e:
+            self.logger.error(f"Ошибка в соединении с воркером: {e}")
+        finally:
+            if session and self.workers.get(session.worker_id) is session:
+                # Аренда не снимается сразу: воркер может переподключиться до ее истечения
+                self.logger.warning(f"Воркер {session.worker_id} отключился")
+            writer.close()
+
+    def _reclaim(self, worker_id: str, held: List[str]) -> None:
+        """Возврат воркеру аккаунтов, которые он уже держит, если они свободны"""
+        expires = time.monotonic() + self.settings['lease_ttl']
+        for account_id in held:
+            owner = self.leases.get(account_id) or self.draining.get(account_id)
+            if owner is None or owner[0] == worker_id:
+                self.draining.pop(account_id, None)
+                self.leases[account_id] = (worker_id, expires)
+
+    async def _dispatch(self, session: WorkerSession, message: Dict) -> None:
+        kind = message.get('type')
+        session.last_seen = time.monotonic()
+        if kind == 'heartbeat':
+            expires = session.last_seen + self.settings['lease_ttl']
+            for account_id in self.accounts_of(session.worker_id):
+                self.leases[account_id] = (session.worker_id, expires)
+            self.monitor.remote_stats[session.worker_id] = message.get('stats') or {}
+            held = set(message.get('held') or [])
+            for account_id, (worker_id, _) in list(self.draining.items()):
+                if worker_id == session.worker_id and account_id not in held:
+                    del self.draining[account_id]
+            await session.send({
+                'type': 'lease',
+                'accounts': self.accounts_of(session.worker_id),
+                'ttl': self.settings['lease_ttl']
+            })
+        elif kind == 'hit':
+            # Отправка уведомления не задерживает чтение сообщений воркера
+            task = asyncio.create_task(self.monitor.publish_hit(message['hit']))
+            self._hit_tasks.add(task)
+            task.add_done_callback(self._hit_tasks.discard)
+        elif kind == 'resolved':
+            future = self._requests.get(message.get('id'))
+            if future and not future.done():
+                if 'error' in message:
+                    future.set_exception(ValueError(message['error']))
+                else:
+                    future.set_result(message['channel'])
+
+    async def resolve(self, chat_link: str) -> Dict:
+        """Разрешение ссылки одним из воркеров с арендованными аккаунтами: {'id', 'title', 'username'}"""
+        workers = [worker_id for worker_id in sorted(self.workers) if self.accounts_of(worker_id)]
+        if not workers:
+            raise ValueError("Нет подключенных воркеров с аккаунтами")
+
+        self._next_request += 1
+        request_id = self._next_request
+        future = asyncio.get_running_loop().create_future()
+        self._requests[request_id] = future
+        try:
+            session = self.workers[workers[request_id % len(workers)]]
+            await session.send({'type': 'resolve', 'id': request_id, 'link': chat_link})
+            return await asyncio.wait_for(future, self.settings['resolve_timeout'])
+        finally:
+            self._requests.pop(request_id, None)
+
+    async def reload(self) -> None:
+        """Перераспределение после добавления или удаления каналов"""
+        async with self._lock:
+            await self._rebalance()
+
+    async def _reap_loop(self) -> None:
+        while True:
+            await asyncio.sleep(self.settings['heartbeat_interval'])
+            try:
+                async with self._lock:
+                    await self._rebalance()
+            except Exception as e:
+                self.logger.error(f"Ошибка при проверке аренды аккаунтов: {e}")
+
+    def _grant_leases(self) -> bool:
+        """Снятие просроченной аренды, выравнивание и выдача свободных аккаунтов.
+
+        Возвращает True, если аренда изменилась.
+        """
+        now = time.monotonic()
+        changed = False
+
+        for worker_id, session in list(self.workers.items()):
+            if now - session.last_seen > self.settings['lease_ttl']:
+                self.logger.warning(f"Воркер {worker_id} не отвечает, его аккаунты будут переданы")
+                session.close()
+                del self.workers[worker_id]
+                self.monitor.remote_stats.pop(worker_id, None)
+
+        for account_id, (_, until) in list(self.draining.items()):
+            if until < now:
+                del self.draining[account_id]
+
+        accounts = set(self.monitor.account_manager.get_accounts())
+        for account_id, (worker_id, expires) in list(self.leases.items()):
+            if account_id not in accounts or worker_id not in self.workers or expires < now:
+                del self.leases[account_id]
+                # Аренда на воркере истекает чуть позже, чем здесь: ждем еще один интервал
+                self.draining[account_id] = (worker_id, now + self.settings['heartbeat_interval'])
+                changed = True
+
+        if not self.workers:
+            return changed
+
+        # Равная доля на воркер; излишек отзывается и выдается после освобождения
+        share = math.ceil(len(accounts) / len(self.workers))
+        limits = {
+            worker_id: min(share, session.capacity) if session.capacity else share
+            for worker_id, session in self.workers.items()
+        }
+        for worker_id, limit in limits.items():
+            for account_id in self.accounts_of(worker_id)[limit:]:
+                del self.leases[account_id]
+                self.draining[account_id] = (worker_id, now + self.settings['lease_ttl'])
+                changed = True
+                self.logger.info(f"Аккаунт {account_id} отозван у воркера {worker_id}")
+
+        loads = {worker_id: len(self.accounts_of(worker_id)) for worker_id in self.workers}
+        for account_id in sorted(accounts - set(self.leases) - set(self.draining)):
+            candidates = [
+                worker_id for worker_id in self.workers
+                if loads[worker_id] < limits[worker_id]
+            ]
+            if not candidates:
+                break
+            worker_id = min(candidates, key=lambda x: (loads[x], x))
+            self.leases[account_id] = (worker_id, now + self.settings['lease_ttl'])
+            loads[worker_id] += 1
+            changed = True
+            self.logger.info(f"Аккаунт {account_id} передан воркеру {worker_id}")
+
+        return changed
+
+    async def _rebalance(self, force: bool = False) -> None:
+        leases_changed = self._grant_leases()
+        channels = {int(channel['chat_id']) for channel in await self.monitor.load_watched_channels()}
+        if not force and not leases_changed and channels == self._channels:
+            return
+        self._channels = channels
+
+        for session in list(self.workers.values()):
+            await self._send(session, {
+                'type': 'lease',
+                'accounts': self.accounts_of(session.worker_id),
+                'ttl': self.settings['lease_ttl']
+            })
+
+        leased = sorted(self.leases)
+        if leased and channels:
+            distribution = await self.distributor.distribute_channels(sorted(channels), leased)
+            await self.distributor.apply_distribution(distribution)
+        await self._push_assignments()
+
+    async def _on_distribution_changed(self, distribution: Dict[str, List[int]]) -> None:
+        await self._push_assignments()
+
+    async def _push_assignments(self) -> None:
+        distribution = self.distributor.distribution
+        for session in list(self.workers.values()):
+            await self._send(session, {
+                'type': 'assign',
+                'distribution': {
+                    account_id: distribution.get(account_id, [])
+                    for account_id in self.accounts_of(session.worker_id)
+                }
+            })
+
+    async def _send(self, session: WorkerSession, message: Dict) -> None:
+        try:
+            await session.send(message)
+        except Exception as e:
+            self.logger.warning(f"Не удалось отправить сообщение воркеру {session.worker_id}: {e}")
+
+
+class ClusterWorker:
+    """Воркер кластера: MessageMonitor для арендованных у координатора аккаунтов"""
+
+    def __init__(self, worker_id: str, monitor=None, settings: Dict = CLUSTER_SETTINGS):
+        self.worker_id = worker_id
+        self.monitor = monitor
+        self.settings = settings
+        self.logger = logger
+        self.lease_expires = 0.0
+        self._held: Set[str] = set()
+        self._assignment: Dict[str, List[int]] = {}
+        self._hits = deque(maxlen=settings['hit_buffer'])  # совпадения на время потери связи
+        self._writer: Optional[asyncio.StreamWriter] = None
+        self._lease_lock = asyncio.Lock()
+        self._pending_lease: Optional[Set[str]] = None
+        self._tasks: Set[asyncio.Task] = set()
+        self._heartbeat_interval = settings['heartbeat_interval']
+
+    def _create_monitor(self):
+        from ..database.database_manager import DatabaseManager
+        from .proxy_manager import ProxyManager
+        from .account_manager import AccountManager
+        from .message_monitor import MessageMonitor
+
+        account_manager = AccountManager(bots_folder=BOTS_FOLDER, proxy_manager=ProxyManager(read_only=True))
+        monitor = MessageMonitor(DatabaseManager(), account_manager)
+        # Пул прокси и распределение принадлежат координатору
+        monitor.proxy_policy = None
+        return monitor
+
+    async def run(self) -> None:
+        if self.monitor is None:
+            self.monitor = self._create_monitor()
+        self.monitor.owned_accounts = set()
+        self.monitor.hit_sink = self._send_hit
+        # Распределение каналов принадлежит координатору: без локальной перебалансировки
+        self.monitor.manages_distribution = False
+
+        expiry_task = asyncio.create_task(self._expiry_loop())
+        backoff = 1
+        try:
+            while True:
+                try:
+                    await self._session()
+                    backoff = 1
+                except (ConnectionError, OSError, asyncio.IncompleteReadError) as e:
+                    self.logger.warning(f"Нет связи с координатором: {e}")
+                except Exception as e:
+                    self.logger.error(f"Ошибка в сессии с координатором: {e}")
+                self._writer = None
+                await asyncio.sleep(backoff)
+                backoff = min(backoff * 2, self.settings['lease_ttl'])
+        finally:
+            expiry_task.cancel()
+            for task in list(self._tasks):
+                task.cancel()
+            await self.monitor.stop_monitoring()
+
+    async def _session(self) -> None:
+        reader, writer = await asyncio.open_connection(
+            self.settings['host'], self.settings['port'], limit=STREAM_LIMIT
+        )
+        try:
+            writer.write(encode({
+                'type': 'hello',
+                'worker': self.worker_id,
+                'token': self.settings['token'],
+                'capacity': self.settings['capacity'],
+                'held': sorted(self._held)
+            }))
+            await writer.drain()
+
+            welcome = await read_message(reader)
+            if not welcome or welcome.get('type') != 'welcome':
+                raise ConnectionError((welcome or {}).get('error', 'координатор отклонил подключение'))
+            self._heartbeat_interval = welcome.get('heartbeat_interval', self._heartbeat_interval)
+            self._writer = writer
+            self.logger.info(f"Воркер {self.worker_id} подключен к координатору")
+
+            while self._hits:
+                await self._send({'type': 'hit', 'hit': self._hits.popleft()})
+
+            heartbeat_task = asyncio.create_task(self._heartbeat_loop())
+            try:
+                while True:
+                    message = await read_message(reader)
+                    if message is None:
+                        raise ConnectionError("координатор закрыл соединение")
+                    await self._dispatch(message)
+            finally:
+                heartbeat_task.cancel()
+        finally:
+            writer.close()
+
+    async def _send(self, message: Dict) -> None:
+        self._writer.write(encode(message))
+        await self._writer.drain()
+
+    async def _send_hit(self, hit: Dict) -> None:
+        if self._writer is None:
+            self._hits.append(hit)
+            return
+        try:
+            await self._send({'type': 'hit', 'hit': hit})
+        except Exception:
+            self._hits.append(hit)
+
+    async def _heartbeat_loop(self) -> None:
+        while True:
+            stats = self.monitor.get_stats()
+            await self._send({
+                'type': 'heartbeat',
+                'stats': {
+                    key: stats.get(key, 0)
+                    for key in ('messages_processed', 'keywords_found', 'errors', 'active_clients')
+                },
+                'held': sorted(self._held)
+            })
+            await asyncio.sleep(self._heartbeat_interval)
+
+    async def _dispatch(self, message: Dict) -> None:
+        kind = message.get('type')
+        if kind == 'lease':
+            self.lease_expires = time.monotonic() + message['ttl']
+            # Подключение аккаунтов долгое: heartbeat и прием сообщений не ждут его.
+            # Применяется только последняя аренда, устаревшие промежуточные пропускаются
+            self._pending_lease = set(message['accounts'])
+            self._spawn_task(self._apply_pending_lease())
+        elif kind == 'assign':
+            self._assignment = message['distribution']
+            await self._apply_assignment()
+        elif kind == 'resolve':
+            self._spawn_task(self._resolve(message))
+
+    def _spawn_task(self, coro) -> None:
+        task = asyncio.create_task(coro)
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _resolve(self, message: Dict) -> None:
+        try:
+            channel = await self.monitor.resolve_link(message['link'])
+            reply = {'type': 'resolved', 'id': message['id'], 'channel': channel}
+        except Exception as e:
+            reply = {'type': 'resolved', 'id': message['id'], 'error': str(e)}
+        try:
+            await self._send(reply)
+        except Exception as e:
+            self.logger.warning(f"Не удалось отправить ответ координатору: {e}")
+
+    async def _apply_assignment(self) -> None:
+        await self.monitor.apply_assignment({
+            account_id: channels
+            for account_id, channels in self._assignment.items()
+            if account_id in self._held
+        })
+
+    async def _apply_pending_lease(self) -> None:
+        async with self._lease_lock:
+            accounts, self._pending_lease = self._pending_lease, None
+            if accounts is not None:
+                await self._apply_lease_locked(accounts)
+
+    async def _apply_lease(self, accounts: Set[str]) -> None:
+        async with self._lease_lock:
+            await self._apply_lease_locked(accounts)
+
+    async def _apply_lease_locked(self, accounts: Set[str]) -> None:
+        try:
+            for account_id in self._held - accounts:
+                await self.monitor.release_account(account_id)
+                self._held.discard(account_id)
+
+            added = accounts - self._held
+            if added:
+                self._held |= added
+                self.monitor.owned_accounts.update(added)
+                await self.monitor.initialize_clients()
+                if not self.monitor.is_monitoring:
+                    await self.monitor.start_monitoring()
+                self.logger.info(f"Получена аренда аккаунтов: {', '.join(sorted(added))}")
+                await self._apply_assignment()
+        except Exception as e:
+            self.logger.error(f"Ошибка при применении аренды: {e}")
+
+    async def _expiry_loop(self) -> None:
+        """Отключение аккаунтов, если аренду не удалось продлить вовремя"""
+        while True:
+            await asyncio.sleep(1)
+            if self._held and time.monotonic() > self.lease_expires:
+                self.logger.warning("Аренда аккаунтов истекла, аккаунты отключаются")
+                await self._apply_lease(set())
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Воркер кластера мониторинга")
+    parser.add_argument('--worker-id', required=True)
+    parser.add_argument('--host', default=CLUSTER_SETTINGS['host'])
+    parser.add_argument('--port', type=int, default=CLUSTER_SETTINGS['port'])
+    parser.add_argument('--capacity', type=int, default=CLUSTER_SETTINGS['capacity'])
+    args = parser.parse_args()
+
+    logging.basicConfig(format='%(asctime)s - %(levelname)s - %(message)s', level=logging.INFO)
+    settings = dict(CLUSTER_SETTINGS, host=args.host, port=args.port, capacity=args.capacity)
+    asyncio.run(ClusterWorker(args.worker_id, settings=settings).run())
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,454 @@
+"""Фейковый Telegram для нагрузочных прогонов монитора без сети и аккаунтов.
+
+FakeNetwork - общий мир: каналы, отправители, членство аккаунтов и
+внедрение отказов (FLOOD_WAIT, закрытые каналы, обрывы соединения).
+FakeTelegramClient реализует TelegramClientLike: get_entity,
+JoinChannelRequest/GetFullChannelRequest и доставку обновлений
+UpdateNewChannelMessage зарегистрированным обработчикам (как Telethon,
+каждое обновление в своей задаче). Обновления - настоящие объекты Telethon,
+поэтому MessageMonitor обрабатывает их тем же кодом, что и в бою.
+TrafficGenerator создает поток сообщений с заданной интенсивностью,
+перекосом по каналам и долей сообщений с ключевыми словами.
+
+    network = FakeNetwork(channels=500, seed=1)
+    account_manager = AccountManager(bots_folder, proxy_manager,
+                                     client_factory=FakeClientFactory(network, accounts=10))
+    await TrafficGenerator(network, rate=2000, keywords=['купить']).run(60)
+"""
+import time
+import random
+import asyncio
+import logging
+from types import SimpleNamespace
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, List, Optional, Sequence, Set, Tuple
+from telethon import events, utils
+from telethon.errors import FloodWaitError, ChannelPrivateError
+from telethon.tl.types import Channel, User, Message, PeerChannel, PeerUser, UpdateNewChannelMessage, ChatPhotoEmpty
+from telethon.tl.functions.channels import JoinChannelRequest, GetFullChannelRequest, LeaveChannelRequest
+
+logger = logging.getLogger(__name__)
+
+FIRST_CHANNEL_ID = 1000000000
+FIRST_USER_ID = 500000000
+
+# Слоги для текста сообщений по умолчанию
+SYLLABLES = ('ка', 'ро', 'ми', 'на', 'то', 'ле', 'ви', 'за', 'по', 'ст', 'ра', 'ни', 'ко', 'де', 'лу')
+
+
+def _default_vocabulary(size: int, rnd: random.Random) -> List[str]:
+    return [''.join(rnd.choice(SYLLABLES) for _ in range(rnd.randint(1, 4))) for _ in range(size)]
+
+
+def _channel_id(value) -> int:
+    """id канала из int (в том числе помеченного -100...), InputChannel, PeerChannel или Channel"""
+    if isinstance(value, int):
+        return utils.resolve_id(value)[0] if value < 0 else value
+    for attr in ('channel_id', 'id'):
+        if hasattr(value, attr):
+            return getattr(value, attr)
+    raise ValueError(f"Неподдерживаемая ссылка на канал: {value!r}")
+
+
+class FakeNetwork:
+    """Общее состояние фейковых клиентов и настройки отказов"""
+
+    def __init__(self, channels: int = 100, senders: int = 200, joined: bool = True,
+                 flood_wait_rate: float = 0.0, flood_wait_seconds: Tuple[int, int] = (1, 5),
+                 private_rate: float = 0.0, disconnect_rate: float = 0.0,
+                 latency: float = 0.0, seed: Optional[int] = None):
+        """joined - все аккаунты изначально состоят во всех каналах;
+        flood_wait_rate - доля запросов с FLOOD_WAIT;
+        private_rate - доля закрытых каналов (вступление - ChannelPrivateError);
+        disconnect_rate - вероятность обрыва соединения клиента за секунду;
+        latency - задержка ответа на запрос, сек"""
+        self.random = random.Random(seed)
+        self.joined = joined
+        self.flood_wait_rate = flood_wait_rate
+        self.flood_wait_seconds = flood_wait_seconds
+        self.disconnect_rate = disconnect_rate
+        self.latency = latency
+        self.logger = logger
+
+        self.channels: Dict[int, Channel] = {}
+        self.by_username: Dict[str, int] = {}
+        self.private: Set[int] = set()
+        self.members: Dict[int, Set[str]] = {}  # chat_id -> аккаунты, вступившие явно
+        self.left: Dict[int, Set[str]] = {}     # chat_id -> аккаунты, покинувшие канал
+        self.clients: Dict[str, 'FakeTelegramClient'] = {}  # подключенные клиенты по аккаунту
+        for index in range(channels):
+            self.add_channel(FIRST_CHANNEL_ID + index, private=self.random.random() < private_rate)
+        self.senders: List[User] = [
+            User(id=FIRST_USER_ID + index, access_hash=self.random.getrandbits(63),
+                 first_name=f"Пользователь {index}", username=f"fake_user_{index}")
+            for index in range(senders)
+        ]
+        self._senders_by_id: Dict[int, User] = {sender.id: sender for sender in self.senders}
+        self._message_ids: Dict[int, int] = {}
+        self._pts: Dict[int, int] = {}
+        self.stats = {
+            'published': 0,
+            'delivered': 0,
+            'requests': 0,
+            'joins': 0,
+            'flood_waits': 0,
+            'disconnects': 0,
+        }
+
+    def add_channel(self, chat_id: int, title: Optional[str] = None, username: Optional[str] = None,
+                    private: bool = False) -> Channel:
+        username = username or f"fake_channel_{chat_id - FIRST_CHANNEL_ID}"
+        channel = Channel(
+            id=chat_id, title=title or f"Канал {chat_id - FIRST_CHANNEL_ID}", photo=ChatPhotoEmpty(),
+            date=datetime.now(timezone.utc), broadcast=True,
+            access_hash=self.random.getrandbits(63), username=username
+        )
+        self.channels[chat_id] = channel
+        self.by_username[username.lower()] = chat_id
+        if private:
+            self.private.add(chat_id)
+        return channel
+
+    # Членство
+
+    def is_member(self, account_id: str, chat_id: int) -> bool:
+        if account_id in self.left.get(chat_id, ()):
+            return False
+        return (self.joined and chat_id not in self.private) or account_id in self.members.get(chat_id, ())
+
+    def join(self, account_id: str, chat_id: int) -> None:
+        if chat_id not in self.channels:
+            raise ValueError(f"Канал {chat_id} не найден")
+        if chat_id in self.private:
+            raise ChannelPrivateError(request=None)
+        self.members.setdefault(chat_id, set()).add(account_id)
+        self.left.get(chat_id, set()).discard(account_id)
+        self.stats['joins'] += 1
+
+    def leave(self, account_id: str, chat_id: int) -> None:
+        self.members.get(chat_id, set()).discard(account_id)
+        self.left.setdefault(chat_id, set()).add(account_id)
+
+    # Клиенты и отказы
+
+    def attach(self, client: 'FakeTelegramClient') -> None:
+        self.clients[client.account_id] = client
+
+    def detach(self, client: 'FakeTelegramClient') -> None:
+        if self.clients.get(client.account_id) is client:
+            del self.clients[client.account_id]
+
+    def maybe_flood_wait(self, request) -> None:
+        if self.flood_wait_rate and self.random.random() < self.flood_wait_rate:
+            self.stats['flood_waits'] += 1
+            raise FloodWaitError(request=request, capture=self.random.randint(*self.flood_wait_seconds))
+
+    def inject_disconnects(self, elapsed: float) -> None:
+        """Обрывы соединений за прошедшие elapsed секунд"""
+        if not self.disconnect_rate:
+            return
+        probability = min(1.0, self.disconnect_rate * elapsed)
+        for client in list(self.clients.values()):
+            if self.random.random() < probability:
+                self.stats['disconnects'] += 1
+                client.drop()
+
+    # Сообщения
+
+    def sender(self, user_id: int) -> User:
+        """Отправитель по id; неизвестные создаются при первом обращении (воспроизведение записей)"""
+        sender = self._senders_by_id.get(user_id)
+        if sender is None:
+            sender = User(id=user_id, access_hash=0, first_name=f"Пользователь {user_id}")
+            self._senders_by_id[user_id] = sender
+        return sender
+
+    def make_update(self, chat_id: int, text: str, sender: Optional[User] = None,
+                    message_id: Optional[int] = None, date: Optional[datetime] = None) -> UpdateNewChannelMessage:
+        """Обновление UpdateNewChannelMessage с сущностями канала и отправителя"""
+        if chat_id not in self.channels:
+            self.add_channel(chat_id)
+        sender = sender or self.random.choice(self.senders)
+        if message_id is None:
+            message_id = self._message_ids.get(chat_id, 0) + 1
+        self._message_ids[chat_id] = max(message_id, self._message_ids.get(chat_id, 0))
+        pts = self._pts.get(chat_id, 0) + 1
+        self._pts[chat_id] = pts
+
+        message = Message(
+            id=message_id, peer_id=PeerChannel(chat_id), date=date or datetime.now(timezone.utc),
+            message=text, from_id=PeerUser(sender.id)
+        )
+        update = UpdateNewChannelMessage(message=message, pts=pts, pts_count=1)
+        # Как у Telethon: сущности из того же ответа сервера, ключ - помеченный id
+        channel = self.channels[chat_id]
+        update._entities = {utils.get_peer_id(channel): channel, sender.id: sender}
+        return update
+
+    def publish(self, chat_id: int, text: str, sender: Optional[User] = None) -> UpdateNewChannelMessage:
+        """Новое сообщение в канале: обновление получают подключенные клиенты-участники"""
+        update = self.make_update(chat_id, text, sender)
+        self.stats['published'] += 1
+        for client in list(self.clients.values()):
+            if self.is_member(client.account_id, chat_id):
+                client.deliver(update)
+                self.stats['delivered'] += 1
+        return update
+
+
+class FakeTelegramClient:
+    """Клиент FakeNetwork с интерфейсом TelegramClientLike"""
+
+    def __init__(self, network: FakeNetwork, account_id: str, sequential_updates: bool = False):
+        self.network = network
+        self.account_id = account_id
+        self.sequential_updates = sequential_updates
+        self.logger = logger
+        self._connected = False
+        self._handlers: List[Tuple[Callable, Any]] = []
+        self._tasks: Set[asyncio.Task] = set()
+        self._queue: Optional[asyncio.Queue] = None
+        self._dispatcher: Optional[asyncio.Task] = None
+
+        user_id = FIRST_USER_ID // 2 + abs(hash(account_id)) % FIRST_USER_ID
+        self._self_id = user_id
+        self._me = User(id=user_id, is_self=True, access_hash=0, first_name=account_id,
+                        username=f"fake_{account_id}", phone=account_id)
+        # Events._set_client ищет входные сущности в этом кэше; пустой - берутся из update._entities
+        self._mb_entity_cache: Dict[int, Any] = {}
+
+    def __repr__(self) -> str:
+        return f"<FakeTelegramClient {self.account_id} connected={self._connected}>"
+
+    def is_connected(self) -> bool:
+        return self._connected
+
+    async def connect(self) -> None:
+        self._connected = True
+        self.network.attach(self)
+        if self.sequential_updates and (self._dispatcher is None or self._dispatcher.done()):
+            self._queue = asyncio.Queue()
+            self._dispatcher = asyncio.create_task(self._dispatch_queue())
+
+    async def disconnect(self) -> None:
+        self.drop()
+        if self._dispatcher:
+            self._dispatcher.cancel()
+            self._dispatcher = None
+
+    def drop(self) -> None:
+        """Обрыв соединения: обновления перестают приходить, запросы падают"""
+        self._connected = False
+        self.network.detach(self)
+
+    def _check_connected(self) -> None:
+        if not self._connected:
+            raise ConnectionError('Cannot send requests while disconnected')
+
+    async def _request_latency(self) -> None:
+        self.network.stats['requests'] += 1
+        if self.network.latency:
+            await asyncio.sleep(self.network.latency)
+
+    async def is_user_authorized(self) -> bool:
+        self._check_connected()
+        return True
+
+    async def get_me(self) -> User:
+        self._check_connected()
+        await self._request_latency()
+        return self._me
+
+    async def get_entity(self, entity) -> Channel:
+        self._check_connected()
+        await self._request_latency()
+        if isinstance(entity, str):
+            name = entity.strip().rstrip('/').split('/')[-1].lstrip('@').lower()
+            if name.lstrip('-').isdigit():
+                entity = int(name)
+            elif name in self.network.by_username:
+                return self.network.channels[self.network.by_username[name]]
+            else:
+                raise ValueError(f'No user has "{name}" as username')
+        chat_id = _channel_id(entity)
+        if chat_id not in self.network.channels:
+            raise ValueError(f'Could not find the input entity for PeerChannel(channel_id={chat_id})')
+        return self.network.channels[chat_id]
+
+    async def __call__(self, request):
+        self._check_connected()
+        await self._request_latency()
+        self.network.maybe_flood_wait(request)
+
+        if isinstance(request, JoinChannelRequest):
+            self.network.join(self.account_id, _channel_id(request.channel))
+            return SimpleNamespace(updates=[], chats=[self.network.channels[_channel_id(request.channel)]])
+        if isinstance(request, LeaveChannelRequest):
+            self.network.leave(self.account_id, _channel_id(request.channel))
+            return SimpleNamespace(updates=[], chats=[])
+        if isinstance(request, GetFullChannelRequest):
+            chat_id = _channel_id(request.channel)
+            if chat_id not in self.network.channels:
+                raise ValueError(f'Could not find the input entity for PeerChannel(channel_id={chat_id})')
+            is_member = self.network.is_member(self.account_id, chat_id)
+            if chat_id in self.network.private and not is_member:
+                raise ChannelPrivateError(request=request)
+            return SimpleNamespace(
+                full_chat=SimpleNamespace(id=chat_id, can_view_messages=is_member, participants_count=1000),
+                chats=[self.network.channels[chat_id]]
+            )
+        raise NotImplementedError(f"FakeTelegramClient не поддерживает {type(request).__name__}")
+
+    # Обработчики обновлений
+
+    def add_event_handler(self, callback: Callable, event=None) -> None:
+        builder = event or events.Raw()
+        if isinstance(builder, type):
+            builder = builder()
+        self._handlers.append((callback, builder))
+
+    def remove_event_handler(self, callback: Callable, event=None) -> int:
+        before = len(self._handlers)
+        self._handlers = [
+            (handler, builder) for handler, builder in self._handlers
+            if handler is not callback or (event is not None and not isinstance(builder, event))
+        ]
+        return before - len(self._handlers)
+
+    def list_event_handlers(self) -> List[Tuple[Callable, Any]]:
+        return list(self._handlers)
+
+    def deliver(self, update) -> None:
+        if not self._connected:
+            return
+        if self.sequential_updates:
+            self._queue.put_nowait(update)
+        else:
+            task = asyncio.create_task(self._dispatch_update(update))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+
+    def pending_updates(self) -> int:
+        return len(self._tasks) + (self._queue.qsize() if self._queue else 0)
+
+    async def _dispatch_queue(self) -> None:
+        while True:
+            update = await self._queue.get()
+            await self._dispatch_update(update)
+
+    async def _dispatch_update(self, update) -> None:
+        for callback, builder in list(self._handlers):
+            try:
+                if not builder.resolved:
+                    await builder.resolve(self)
+                event = builder.build(update, None, self._self_id)
+                if event is None:
+                    continue
+                if not isinstance(builder, events.Raw):
+                    event._entities = update._entities
+                    event._set_client(self)
+                if not builder.filter(event):
+                    continue
+                await callback(event)
+            except Exception as e:
+                self.logger.error(f"Ошибка в обработчике фейкового клиента {self.account_id}: {e}")
+
+
+class FakeClientFactory:
+    """Фабрика клиентов FakeNetwork для AccountManager (см. ClientFactory)"""
+
+    def __init__(self, network: FakeNetwork, accounts: int = 10, connect_delay: float = 0,
+                 sequential_updates: bool = False):
+        self.network = network
+        self.accounts = [f"fake_{index:03d}" for index in range(accounts)]
+        self.connect_delay = connect_delay
+        self.sequential_updates = sequential_updates
+
+    def get_accounts(self) -> List[str]:
+        return list(self.accounts)
+
+    async def create_client(self, account_id: str) -> Optional[FakeTelegramClient]:
+        if account_id not in self.accounts:
+            return None
+        client = FakeTelegramClient(self.network, account_id, self.sequential_updates)
+        await client.connect()
+        return client
+
+
+class TrafficGenerator:
+    """Поток сообщений в каналы FakeNetwork.
+
+    rate - сообщений в секунду по всем каналам (None - без ограничения,
+    с уступкой циклу между пачками); skew - показатель распределения Ципфа
+    по каналам (0 - равномерно); keyword_rate - доля сообщений, в которые
+    подставляется одно из keywords.
+    """
+
+    def __init__(self, network: FakeNetwork, rate: Optional[float] = 100.0,
+                 keywords: Sequence[str] = (), keyword_rate: float = 0.01,
+                 words: Optional[Sequence[str]] = None, min_words: int = 5, max_words: int = 60,
+                 skew: float = 1.0, batch: int = 100, tick: float = 0.01, seed: Optional[int] = None):
+        self.network = network
+        self.rate = rate
+        self.keywords = list(keywords)
+        self.keyword_rate = keyword_rate
+        self.random = random.Random(seed)
+        self.words = list(words) if words else _default_vocabulary(2000, self.random)
+        self.min_words = min_words
+        self.max_words = max_words
+        self.batch = batch
+        self.tick = tick
+        self.logger = logger
+
+        self.channel_ids = list(network.channels)
+        self.random.shuffle(self.channel_ids)
+        self.weights = [1 / (rank ** skew) for rank in range(1, len(self.channel_ids) + 1)]
+        self.stats = {'generated': 0, 'with_keywords': 0}
+        self._stop = asyncio.Event()
+
+    def make_text(self) -> Tuple[str, bool]:
+        words = self.random.choices(self.words, k=self.random.randint(self.min_words, self.max_words))
+        has_keyword = bool(self.keywords) and self.random.random() < self.keyword_rate
+        if has_keyword:
+            words.insert(self.random.randrange(len(words) + 1), self.random.choice(self.keywords))
+        return ' '.join(words), has_keyword
+
+    def emit(self, count: int) -> None:
+        for chat_id in self.random.choices(self.channel_ids, self.weights, k=count):
+            text, has_keyword = self.make_text()
+            self.network.publish(chat_id, text)
+            self.stats['generated'] += 1
+            if has_keyword:
+                self.stats['with_keywords'] += 1
+
+    def stop(self) -> None:
+        self._stop.set()
+
+    async def run(self, duration: Optional[float] = None) -> Dict[str, int]:
+        """Генерация сообщений duration секунд (None - до stop())"""
+        self._stop.clear()
+        started = last = time.monotonic()
+        owed = 0.0
+        while not self._stop.is_set():
+            now = time.monotonic()
+            if duration is not None and now - started >= duration:
+                break
+            elapsed, last = now - last, now
+            self.network.inject_disconnects(elapsed)
+
+            if self.rate is None:
+                self.emit(self.batch)
+                await asyncio.sleep(0)
+                continue
+
+            owed += self.rate * elapsed
+            count = int(owed)
+            if count:
+                owed -= count
+                self.emit(count)
+            await asyncio.sleep(self.tick)
+
+        self.logger.info(
+            f"Генератор трафика: {self.stats['generated']} сообщений за {time.monotonic() - started:.1f} сек"
+        )
+        return dict(self.stats)
@@ -0,0 +1,126 @@
+import time
+import random
+import asyncio
+import logging
+from datetime import date
+from typing import Dict, List, Optional
+from .account_telemetry import LatencyWindow
+
+logger = logging.getLogger(__name__)
+
+# Этапы пути совпадения: (название, начальная отметка, конечная отметка).
+# Отметки - время Unix, которое проставляют message_handler и publish_hit
+STAGES = (
+    ('delivery', 'date', 'received'),     # дата сообщения -> получение обновления
+    ('match', 'received', 'matched'),     # получение -> ключевые слова найдены
+    ('prepare', 'matched', 'enqueued'),   # отправитель, ссылка -> передача на отправку
+    ('queue', 'enqueued', 'sending'),     # ожидание отправки (список админов, другой процесс)
+    ('send', 'sending', 'acked'),         # send_message -> ответ Bot API
+    ('total', 'date', 'acked'),           # дата сообщения -> уведомление доставлено
+)
+
+STAGE_TITLES = {
+    'delivery': 'Доставка обновления',
+    'match': 'Поиск ключевых слов',
+    'prepare': 'Подготовка уведомления',
+    'queue': 'Ожидание отправки',
+    'send': 'Отправка в Bot API',
+    'total': 'Итого',
+}
+
+# Сколько замеров дня хранить для дневных перцентилей (случайная выборка сверх лимита)
+DAILY_SAMPLE_LIMIT = 10000
+SAVE_INTERVAL = 600
+
+
+class HitLatencyTracker:
+    """Задержки совпадений по этапам: скользящие окна для экрана бота
+    и дневные сводки (p50/p95/p99) в таблице hit_latency_daily"""
+
+    def __init__(self, db_manager, window: int = 1000):
+        self.db = db_manager
+        self.logger = logger
+        self.windows: Dict[str, LatencyWindow] = {name: LatencyWindow(window) for name, _, _ in STAGES}
+        self._day = date.today().isoformat()
+        self._daily: Dict[str, List[float]] = {name: [] for name, _, _ in STAGES}
+        self._daily_seen: Dict[str, int] = {name: 0 for name, _, _ in STAGES}
+        self._saved_at = time.monotonic()
+        self._save_task: Optional[asyncio.Task] = None
+
+    @staticmethod
+    def mark(timing: Dict[str, float], stage: str) -> None:
+        timing[stage] = time.time()
+
+    def record(self, timing: Dict[str, float]) -> None:
+        """Учет отметок одного совпадения; этапы без обеих отметок пропускаются"""
+        today = date.today().isoformat()
+        if today != self._day:
+            self._schedule_save(self._day, self._take_daily())
+            self._day = today
+
+        for name, start, end in STAGES:
+            if start in timing and end in timing:
+                value = max(0.0, timing[end] - timing[start])
+                self.windows[name].add(value)
+                self._add_daily(name, value)
+
+        if time.monotonic() - self._saved_at >= SAVE_INTERVAL:
+            self._schedule_save(self._day, self.daily_summary())
+
+    def _add_daily(self, name: str, value: float) -> None:
+        self._daily_seen[name] += 1
+        samples = self._daily[name]
+        if len(samples) < DAILY_SAMPLE_LIMIT:
+            samples.append(value)
+        else:
+            # Равномерная выборка по всем замерам дня
+            index = random.randrange(self._daily_seen[name])
+            if index < DAILY_SAMPLE_LIMIT:
+                samples[index] = value
+
+    @staticmethod
+    def _percentiles(window: LatencyWindow) -> Dict[str, Optional[float]]:
+        return {
+            'p50': window.percentile(50),
+            'p95': window.percentile(95),
+            'p99': window.percentile(99),
+        }
+
+    def summary(self) -> Dict[str, Dict]:
+        """Перцентили по последним совпадениям: {этап: {count, p50, p95, p99}}"""
+        return {
+            name: dict(count=len(window), **self._percentiles(window))
+            for name, window in self.windows.items()
+        }
+
+    def daily_summary(self) -> Dict[str, Dict]:
+        result = {}
+        for name, samples in self._daily.items():
+            if not samples:
+                continue
+            window = LatencyWindow(len(samples))
+            for value in samples:
+                window.add(value)
+            result[name] = dict(count=self._daily_seen[name], max=max(samples), **self._percentiles(window))
+        return result
+
+    def _take_daily(self) -> Dict[str, Dict]:
+        summary = self.daily_summary()
+        self._daily = {name: [] for name in self._daily}
+        self._daily_seen = {name: 0 for name in self._daily_seen}
+        return summary
+
+    def _schedule_save(self, day: str, summary: Dict[str, Dict]) -> None:
+        self._saved_at = time.monotonic()
+        if summary:
+            self._save_task = asyncio.create_task(self._save(day, summary))
+
+    async def _save(self, day: str, summary: Dict[str, Dict]) -> None:
+        try:
+            await self.db.save_hit_latency_summary(day, summary)
+        except Exception as e:
+            self.logger.error(f"Ошибка при сохранении сводки задержек: {e}")
+
+    async def flush(self) -> None:
+        """Сохранение сводки текущего дня (при остановке)"""
+        await self._save(self._day, self.daily_summary())
@@ -0,0 +1,86 @@
+import asyncio
+import logging
+from typing import Awaitable, Callable, Dict, Optional
+
+# on_done(account_id, chat_id, joined) - вызывается после попытки вступления
+JoinCallback = Callable[[str, int, bool], Awaitable[None]]
+
+
+class JoinScheduler:
+    """Фоновая очередь вступлений в каналы.
+
+    У каждого аккаунта своя очередь и свой воркер: аккаунты вступают
+    параллельно, а внутри аккаунта вступления идут последовательно с
+    задержкой join_delay (FLOOD_WAIT обрабатывает safe_join_channel).
+    Необязательный on_done получает результат вступления, например чтобы
+    перенести канал на аккаунт только после успешного вступления.
+    """
+
+    def __init__(self, distributor, join_delay: Optional[float] = None):
+        self.distributor = distributor
+        self.join_delay = join_delay
+        self.logger = logging.getLogger(__name__)
+        self._queues: Dict[str, asyncio.Queue] = {}
+        self._workers: Dict[str, asyncio.Task] = {}
+        self.stats = {
+            'queued': 0,
+            'joined': 0,
+            'failed': 0
+        }
+
+    def submit(self, account_id: str, chat_id: int, on_done: Optional[JoinCallback] = None) -> None:
+        queue = self._queues.setdefault(account_id, asyncio.Queue())
+        queue.put_nowait((chat_id, on_done))
+        self.stats['queued'] += 1
+
+        worker = self._workers.get(account_id)
+        if worker is None or worker.done():
+            self._workers[account_id] = asyncio.create_task(self._worker(account_id, queue))
+
+    def pending(self) -> int:
+        return sum(queue.qsize() for queue in self._queues.values())
+
+    async def wait(self) -> None:
+        """Ожидание обработки всех поставленных вступлений"""
+        for queue in list(self._queues.values()):
+            await queue.join()
+
+    async def stop(self) -> None:
+        for worker in self._workers.values():
+            worker.cancel()
+        self._workers.clear()
+
+    async def _worker(self, account_id: str, queue: asyncio.Queue) -> None:
+        while True:
+            chat_id, on_done = await queue.get()
+            try:
+                joined = await self._join(account_id, chat_id)
+                if on_done:
+                    try:
+                        await on_done(account_id, chat_id, joined)
+                    except Exception as e:
+                        self.logger.error(f"Ошибка при обработке вступления {account_id} в канал {chat_id}: {e}")
+            finally:
+                queue.task_done()
+
+    async def _join(self, account_id: str, chat_id: int) -> bool:
+        try:
+            if self.distributor.memberships.get(account_id, chat_id):
+                self.stats['joined'] += 1
+                return True
+
+            client = self.distributor.get_client(account_id)
+            joined = bool(client) and await self.distributor.safe_join_channel(client, chat_id, account_id)
+            if joined:
+                self.stats['joined'] += 1
+            else:
+                self.stats['failed'] += 1
+                self.logger.error(f"Аккаунт {account_id} не смог вступить в канал {chat_id}")
+            await asyncio.sleep(self.join_delay if self.join_delay is not None else self.distributor.join_delay)
+            return joined
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            self.stats['failed'] += 1
+            self.logger.error(f"Ошибка при вступлении {account_id} в канал {chat_id}: {e}")
+            return False
@@ -0,0 +1,44 @@
+import math
+import time
+from typing import Dict, Iterable, Optional, Tuple
+
+
+class ChannelLoadTracker:
+    """Оценка интенсивности сообщений по каналам (сообщений в минуту).
+
+    Используется экспоненциально затухающее среднее по времени: каждое
+    сообщение добавляет 1/tau к оценке, а между сообщениями оценка
+    затухает с постоянной времени tau. Для запросов оценка доводится
+    до текущего момента, поэтому затихшие каналы постепенно "остывают".
+    """
+
+    def __init__(self, tau: float = 600.0):
+        self.tau = tau
+        self._rates: Dict[int, Tuple[float, float]] = {}  # chat_id -> (сообщений/сек, время обновления)
+
+    def record(self, chat_id: int, now: Optional[float] = None) -> None:
+        now = time.monotonic() if now is None else now
+        rate, updated = self._rates.get(chat_id, (0.0, now))
+        rate *= math.exp(-(now - updated) / self.tau)
+        self._rates[chat_id] = (rate + 1.0 / self.tau, now)
+
+    def rate(self, chat_id: int, now: Optional[float] = None) -> float:
+        """Текущая оценка сообщений в минуту для канала"""
+        state = self._rates.get(chat_id)
+        if not state:
+            return 0.0
+        now = time.monotonic() if now is None else now
+        rate, updated = state
+        return rate * math.exp(-(now - updated) / self.tau) * 60
+
+    def rates(self, chat_ids: Iterable[int]) -> Dict[int, float]:
+        now = time.monotonic()
+        return {chat_id: self.rate(chat_id, now) for chat_id in chat_ids}
+
+    def load(self, chat_ids: Iterable[int]) -> float:
+        """Суммарная нагрузка набора каналов, сообщений в минуту"""
+        now = time.monotonic()
+        return sum(self.rate(chat_id, now) for chat_id in chat_ids)
+
+    def forget(self, chat_id: int) -> None:
+        self._rates.pop(chat_id, None)
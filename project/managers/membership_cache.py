@@ -0,0 +1,84 @@
+import time
+import logging
+from typing import Dict, Optional, Set, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+class MembershipCache:
+    """Кэш членства аккаунтов в каналах поверх таблицы channel_memberships.
+
+    Источники данных: результаты вступления/проверок и обновления, которые
+    аккаунт реально получает из канала. Запись старше ttl считается
+    неизвестной и требует повторной проверки через RPC.
+    Изменения копятся в памяти и сохраняются пакетно через flush().
+    """
+
+    def __init__(self, db_manager, ttl: float = 6 * 3600):
+        self.db = db_manager
+        self.ttl = ttl
+        self._entries: Dict[str, Dict[int, Tuple[bool, float]]] = {}
+        self._dirty: Set[Tuple[str, int]] = set()
+        self.logger = logging.getLogger(__name__)
+
+    async def load(self) -> None:
+        try:
+            self._entries = await self.db.load_memberships()
+            self.logger.info(
+                f"Загружен кэш членства: {sum(len(chats) for chats in self._entries.values())} записей"
+            )
+        except Exception as e:
+            self.logger.error(f"Ошибка при загрузке кэша членства: {e}")
+
+    def get(self, account_id: str, chat_id: int) -> Optional[bool]:
+        """Известное членство или None, если данных нет или они устарели"""
+        entry = self._entries.get(account_id, {}).get(chat_id)
+        if not entry or time.time() - entry[1] > self.ttl:
+            return None
+        return entry[0]
+
+    def _put(self, account_id: str, chat_id: int, is_member: bool) -> None:
+        self._entries.setdefault(account_id, {})[chat_id] = (is_member, time.time())
+        self._dirty.add((account_id, chat_id))
+
+    async def set(self, account_id: str, chat_id: int, is_member: bool) -> None:
+        """Результат вступления или проверки; сохраняется сразу"""
+        self._put(account_id, chat_id, is_member)
+        await self.flush()
+
+    def mark_seen(self, account_id: str, chat_id: int) -> None:
+        """Аккаунт получил обновление из канала - значит, состоит в нем.
+
+        Вызывается на каждом обновлении, поэтому запись обновляется не чаще,
+        чем раз в половину ttl.
+        """
+        entry = self._entries.get(account_id, {}).get(chat_id)
+        if entry and entry[0] and time.time() - entry[1] < self.ttl / 2:
+            return
+        self._put(account_id, chat_id, True)
+
+    def forget_account(self, account_id: str) -> None:
+        self._entries.pop(account_id, None)
+
+    def memberships(self) -> Dict[str, Set[int]]:
+        """Актуальные членства: аккаунт -> множество каналов"""
+        now = time.time()
+        return {
+            account_id: {
+                chat_id for chat_id, (is_member, checked_at) in chats.items()
+                if is_member and now - checked_at <= self.ttl
+            }
+            for account_id, chats in self._entries.items()
+        }
+
+    async def flush(self) -> None:
+        if not self._dirty:
+            return
+        dirty, self._dirty = self._dirty, set()
+        records = []
+        for account_id, chat_id in dirty:
+            entry = self._entries.get(account_id, {}).get(chat_id)
+            if entry:
+                records.append((chat_id, account_id, entry[0], entry[1]))
+        if not await self.db.save_memberships(records):
+            self._dirty.update(dirty)
@@ -1,27 +1,52 @@
 import asyncio
 import os
+import json
+import time
 import logging
 from telethon import types
-from typing import Dict, Set, List, Optional, Any
+from typing import Dict, Set, List, Optional, Any, Callable, Awaitable
 from datetime import datetime
 from telethon import TelegramClient, events
-from telethon.tl.types import Message, PeerChannel, Channel
+from telethon.tl.types import Message, PeerChannel, Channel, UpdateNewChannelMessage, UpdateNewMessage
 from telethon.tl.functions.channels import JoinChannelRequest
 from .account_manager import AccountManager
 from .proxy_manager import ProxyManager
 from ..database.database_manager import DatabaseManager
-from ..config import MESSAGE_TEMPLATES, MONITORING_SETTINGS, BOTS_FOLDER, load_settings
+from ..config import MESSAGE_TEMPLATES, MONITORING_SETTINGS, BOTS_FOLDER, PROXY_SETTINGS, SETTINGS
 from .smart_distributor import SmartDistributor
+from .client_supervisor import ClientSupervisor, ClientState
+from .update_router import UpdateRouter
+from .load_tracker import ChannelLoadTracker
+from .membership_cache import MembershipCache
+from .resolution_cache import ResolutionCache
+from .account_telemetry import AccountTelemetry, ProxySwapPolicy
+from .rebalance_planner import RebalancePlanner
+from .hit_latency import HitLatencyTracker
+from .update_recorder import UpdateRecorder
+from .telegram_client import TelegramClientLike
+from ..utils.metrics import REGISTRY
 
 logger = logging.getLogger(__name__)
 
 REDISTRIBUTION_THRESHOLD = 1.5
 
+MESSAGES = REGISTRY.counter('monitor_messages_total', 'Принятые сообщения', ['account', 'chat'])
+KEYWORD_HITS = REGISTRY.counter('monitor_keyword_hits_total', 'Найденные ключевые слова')
+MATCH_SECONDS = REGISTRY.histogram('monitor_matcher_seconds', 'Время поиска ключевых слов в сообщении')
+NOTIFICATION_QUEUE = REGISTRY.gauge('monitor_notification_queue_depth', 'Совпадения, ожидающие отправки уведомлений')
+NOTIFICATION_SECONDS = REGISTRY.histogram('monitor_notification_send_seconds', 'Время отправки уведомления админу')
+DB_WRITE_SECONDS = REGISTRY.histogram('monitor_db_write_seconds', 'Время записи найденного сообщения в базу')
+RECONNECTS = REGISTRY.counter('monitor_reconnects_total', 'Переподключения аккаунтов', ['account'])
+JOIN_BACKLOG = REGISTRY.gauge('monitor_join_backlog', 'Вступления в каналы в очереди')
+ACTIVE_CLIENTS = REGISTRY.gauge('monitor_active_clients', 'Подключенные клиенты')
+WATCHED_CHANNELS = REGISTRY.gauge('monitor_watched_channels', 'Отслеживаемые каналы')
+HANDLER_ERRORS = REGISTRY.gauge('monitor_handler_errors', 'Ошибки обработки сообщений с момента запуска')
+
 class MessageMonitor:
     def __init__(self, db_manager: DatabaseManager, account_manager: AccountManager):
         self.db = db_manager
         self.account_manager = account_manager
-        self.monitoring_clients = {}
+        self.monitoring_clients: Dict[str, TelegramClientLike] = {}
         self.bot = None
         self.is_monitoring = False
         self.distributor = None
@@ -36,6 +61,36 @@ class MessageMonitor:
         }
         self.logger = logging.getLogger(__name__)
         self.processed_messages = set()
+        self.supervisors: Dict[str, ClientSupervisor] = {}
+        self.router = UpdateRouter()
+        self.load_tracker = ChannelLoadTracker()
+        self.membership_cache = MembershipCache(db_manager)
+        self.resolution_cache = ResolutionCache(db_manager)
+        self.telemetry = AccountTelemetry()
+        self.proxy_policy = ProxySwapPolicy(self.telemetry)
+        self.health_check_task: Optional[asyncio.Task] = None
+        self.telemetry_task: Optional[asyncio.Task] = None
+        self.hit_latency = HitLatencyTracker(db_manager)
+        self.recorder: Optional[UpdateRecorder] = None  # запись входящего потока для воспроизведения
+        # Многопроцессный режим: аккаунты и каналы этого процесса, приемник совпадений
+        self.owned_accounts: Optional[Set[str]] = None
+        self.channel_filter: Optional[Callable[[int], bool]] = None
+        self.hit_sink: Optional[Callable[[Dict], Awaitable[None]]] = None
+        self.remote_stats: Dict[int, Dict] = {}  # статистика процессов-воркеров по номеру
+        # Координатор без клиентов: разрешение ссылок через воркер и уведомление воркеров о новых каналах
+        self.remote_resolver: Optional[Callable[[str], Awaitable[Dict]]] = None
+        self.channels_changed: Optional[Callable[[], Awaitable[None]]] = None
+        # False - распределением владеет координатор кластера: монитор не перебалансирует каналы сам
+        self.manages_distribution = True
+        self._handler_clients: Dict[str, Any] = {}  # account_id -> (клиент, зарегистрированный обработчик)
+        REGISTRY.on_collect(self._collect_metrics)
+
+    def _collect_metrics(self) -> None:
+        """Метрики, которые вычисляются при чтении, а не на горячем пути"""
+        JOIN_BACKLOG.set(self.distributor.join_scheduler.pending() if self.distributor else 0)
+        ACTIVE_CLIENTS.set(len([s for s in self.supervisors.values() if s.is_ready]))
+        WATCHED_CHANNELS.set(len(self.router))
+        HANDLER_ERRORS.set(self.stats['errors'])
 
     async def initialize(self, app) -> None:
         try:
@@ -48,12 +103,8 @@ class MessageMonitor:
                 self.logger.error("Нет доступных клиентов")
                 return
 
-            # Очищаем старые обработчики перед инициализацией
-            for client in self.monitoring_clients.values():
-                client.remove_event_handler(self.message_handler)
-                
             # Инициализация распределителя с проверкой
-            self.distributor = SmartDistributor(self.account_manager, self.db)
+            self._create_distributor()
             await self.distributor.initialize()
 
             # Проверяем работоспособность клиентов
@@ -62,7 +113,7 @@ class MessageMonitor:
                 return
 
             # Загрузка и распределение каналов
-            channels = await self.db.load_channels()
+            channels = await self.load_watched_channels()
             self.logger.info(f"Загружено каналов: {len(channels)}")
             
             if channels:
@@ -79,23 +130,24 @@ class MessageMonitor:
                     )
                     if distribution:
                         await self.distributor.apply_distribution(distribution)
+                        self.router.rebuild(distribution)
 
-                        # Настройка обработчиков для каждого клиента
+                        # Регистрация обработчиков для каждого клиента
                         for account_id, client in self.monitoring_clients.items():
                             if client and client.is_connected():
-                                client_channels = distribution.get(account_id, [])
-                                if client_channels:
-                                    client.add_event_handler(
-                                        self.message_handler,
-                                        events.NewMessage(chats=client_channels)
-                                    )
-                                    self.logger.info(f"Добавлен обработчик для {account_id} ({len(client_channels)} каналов)")
+                                self.register_client_handler(account_id, client)
+                                self.logger.info(
+                                    f"Добавлен обработчик для {account_id} "
+                                    f"({len(distribution.get(account_id, []))} каналов)"
+                                )
 
             # Активация мониторинга
             self.is_monitoring = True
             self.stats['status'] = 'Активен'
             self.stats['start_time'] = datetime.now()
             self.stats['watched_channels'] = len(channels)
+            self._start_supervisors()
+            self._start_background_tasks()
             
             self.logger.info(f"Мониторинг активирован, отслеживается {len(channels)} каналов")
 
@@ -103,31 +155,87 @@ class MessageMonitor:
             self.logger.error(f"Ошибка при инициализации монитора: {e}")
             raise
 
+    def _create_distributor(self) -> SmartDistributor:
+        if self.distributor:
+            # Прежний дистрибьютор больше не получает настройки и состояния клиентов
+            self.distributor.close()
+            for supervisor in self.supervisors.values():
+                supervisor.unsubscribe(self.distributor.on_client_state)
+        self.distributor = SmartDistributor(
+            self.account_manager, self.db, self.load_tracker, self.membership_cache
+        )
+        # Дистрибьютор работает с теми же подключенными клиентами, что и монитор
+        self.distributor.clients = self.monitoring_clients
+        self.distributor.scope = self.owned_accounts
+        self.distributor.subscribe(self._on_distribution_changed)
+        if self.manages_distribution:
+            for supervisor in self.supervisors.values():
+                supervisor.subscribe(self.distributor.on_client_state)
+        return self.distributor
+
+    async def apply_assignment(self, distribution: Dict[str, List[int]]) -> None:
+        """Назначение каналов, полученное от координатора кластера.
+
+        Распределение не записывается в базу (им владеет координатор);
+        в каналы, членство в которых не подтверждено, аккаунты вступают
+        в фоне через JoinScheduler.
+        """
+        try:
+            distributor = self.distributor
+            if distributor is None:
+                # Загружаем кэш членства один раз; распределение из базы ниже заменяется назначением
+                distributor = self._create_distributor()
+                await distributor.initialize()
+            distributor.distribution = {
+                account_id: [int(chat_id) for chat_id in channels]
+                for account_id, channels in distribution.items()
+            }
+            for account_id, channels in distributor.distribution.items():
+                for chat_id in channels:
+                    if not self.membership_cache.get(account_id, chat_id):
+                        distributor.join_scheduler.submit(account_id, chat_id)
+
+            await self.update_handlers()
+            self.stats['watched_channels'] = sum(len(channels) for channels in distribution.values())
+        except Exception as e:
+            self.logger.error(f"Ошибка при применении назначения каналов: {e}")
+
+    async def release_account(self, account_id: str) -> None:
+        """Отключение аккаунта, аренда которого передана другому узлу"""
+        try:
+            if self.owned_accounts is not None:
+                self.owned_accounts.discard(account_id)
+            supervisor = self.supervisors.pop(account_id, None)
+            if supervisor:
+                supervisor.client = None
+                await supervisor.stop()
+            self._handler_clients.pop(account_id, None)
+            self.telemetry.forget(account_id)
+            if self.distributor:
+                self.distributor.distribution.pop(account_id, None)
+                self.router.rebuild(self.distributor.distribution)
+            client = self.monitoring_clients.pop(account_id, None)
+            if client and client.is_connected():
+                await client.disconnect()
+            self.logger.info(f"Аккаунт {account_id} освобожден")
+        except Exception as e:
+            self.logger.error(f"Ошибка при освобождении аккаунта {account_id}: {e}")
+
     async def update_handlers(self):
         """Обновление обработчиков сообщений для всех клиентов"""
         try:
             distribution = self.distributor.distribution
+
+            # Таблица маршрутизации строится заново и подменяется целиком
+            self.router.rebuild(distribution)
             
             for account_id, channel_ids in distribution.items():
                 client = self.monitoring_clients.get(account_id)
                 if client:
-                    # Удаляем все существующие обработчики для этого клиента
-                    handlers_to_remove = []
-                    for handler in client.list_event_handlers():
-                        if handler[0] == self.message_handler:
-                            handlers_to_remove.append(handler)
-                    
-                    for handler in handlers_to_remove:
-                        client.remove_event_handler(handler[0])
-
-                    if channel_ids:  # Проверяем, что есть каналы для мониторинга
-                        client.add_event_handler(
-                            self.message_handler,
-                            events.NewMessage(chats=channel_ids)
-                        )
-                        self.logger.info(
-                            f"Аккаунту {account_id} назначено {len(channel_ids)} каналов"
-                        )
+                    self.register_client_handler(account_id, client)
+                    self.logger.info(
+                        f"Аккаунту {account_id} назначено {len(channel_ids)} каналов"
+                    )
                     
         except Exception as e:
             self.logger.error(f"Ошибка при обновлении обработчиков: {e}")
@@ -151,26 +259,31 @@ class MessageMonitor:
                         'title': title
                     }
                     channels.append(channel)
-                    self.logger.info(f"Загружен канал: ID={chat_id}, username={username}, title={title}")
+                    self.logger.debug(f"Загружен канал: ID={chat_id}, username={username}, title={title}")
             return channels
         except Exception as e:
             self.logger.error(f"Ошибка при загрузке каналов: {e}")
             return []
             
+    async def load_watched_channels(self) -> List[Dict]:
+        """Активные каналы, которые отслеживает этот процесс"""
+        channels = await self.db.load_channels()
+        if self.channel_filter:
+            channels = [channel for channel in channels if self.channel_filter(int(channel['chat_id']))]
+        return channels
+
     async def initialize_clients(self) -> None:
         try:
             self.logger.info("Начало инициализации клиентов")
             accounts = self.account_manager.get_accounts()
+            if self.owned_accounts is not None:
+                accounts = [account for account in accounts if account in self.owned_accounts]
             self.logger.info(f"Найдено {len(accounts)} аккаунтов")
 
-            # Загружаем список разрешенных каналов
-            allowed_channels = await self.db.load_channels()
-            allowed_chat_ids = [channel['chat_id'] for channel in allowed_channels]
-
             for account in accounts:
                 try:
-                    if account not in self.monitoring_clients:
-                        await asyncio.sleep(1)  # Задержка между подключениями
+                    if account not in self.monitoring_clients and account not in self.supervisors:
+                        await asyncio.sleep(self.account_manager.connect_delay)  # Задержка между подключениями
                         client = await self.account_manager.create_client(account)
                         
                         if client:
@@ -182,13 +295,10 @@ class MessageMonitor:
                                 if await client.is_user_authorized():
                                     self.logger.info(f"Клиент {account} создан и авторизован успешно")
                                     self.monitoring_clients[account] = client
+                                    self._ensure_supervisor(account, client)
                                     
-                                    # Добавляем обработчик
-                                    if allowed_chat_ids:
-                                        client.add_event_handler(
-                                            self.message_handler,
-                                            events.NewMessage(chats=allowed_chat_ids)
-                                        )
+                                    # Добавляем обработчик; каналы попадут в таблицу маршрутизации при распределении
+                                    self.register_client_handler(account, client)
                                 else:
                                     self.logger.error(f"Клиент {account} не авторизован")
                                     continue
@@ -209,7 +319,7 @@ class MessageMonitor:
     async def check_clients_health(self) -> bool:
         try:
             active_clients = 0
-            for account_id, client in self.monitoring_clients.items():
+            for account_id, client in list(self.monitoring_clients.items()):
                 try:
                     if client and client.is_connected():
                         # Проверяем авторизацию
@@ -220,18 +330,14 @@ class MessageMonitor:
                                 active_clients += 1
                                 continue
                                 
-                    # Если что-то пошло не так, пробуем переподключить клиента
-                    self.logger.warning(f"Переподключение клиента {account_id}")
-                    if client:
-                        await client.disconnect()
-                    new_client = await self.account_manager.create_client(account_id)
-                    if new_client:
-                        self.monitoring_clients[account_id] = new_client
-                        if await new_client.is_user_authorized():
-                            active_clients += 1
+                    # Переподключением занимается супервизор аккаунта
+                    self._ensure_supervisor(account_id, client).report_failure(
+                        Exception("Клиент не прошел проверку состояния")
+                    )
                             
                 except Exception as e:
                     self.logger.error(f"Ошибка при проверке клиента {account_id}: {e}")
+                    self._ensure_supervisor(account_id, client).report_failure(e)
                     
             self.stats['active_clients'] = active_clients
             return active_clients > 0
@@ -240,55 +346,145 @@ class MessageMonitor:
             self.logger.error(f"Ошибка при проверке клиентов: {e}")
             return False
 
+    def _ensure_supervisor(self, account_id: str, client=None) -> ClientSupervisor:
+        """Получение (или создание) супервизора аккаунта"""
+        supervisor = self.supervisors.get(account_id)
+        if supervisor is None:
+            supervisor = ClientSupervisor(account_id, self.account_manager, client)
+            supervisor.subscribe(self._on_client_state)
+            if self.distributor and self.manages_distribution:
+                supervisor.subscribe(self.distributor.on_client_state)
+            self.supervisors[account_id] = supervisor
+            if self.is_monitoring:
+                supervisor.start()
+        return supervisor
+
+    def _start_supervisors(self) -> None:
+        for supervisor in self.supervisors.values():
+            supervisor.start()
+
+    async def _on_client_state(self, account_id: str, old_state: str, new_state: str, client) -> None:
+        """Реакция на смену состояния клиента"""
+        if new_state == ClientState.READY:
+            self.telemetry.record_reconnect(account_id)
+            RECONNECTS.labels(account_id).inc()
+            self.monitoring_clients[account_id] = client
+            self.register_client_handler(account_id, client)
+            self.logger.info(f"Аккаунт {account_id} снова в работе")
+        elif old_state == ClientState.READY:
+            self.monitoring_clients.pop(account_id, None)
+
+        if new_state == ClientState.FAILED:
+            supervisor = self.supervisors.get(account_id)
+            await self._notify_account_failure(
+                account_id,
+                supervisor.last_error if supervisor else "неизвестная ошибка"
+            )
+
+        self.stats['active_clients'] = len([
+            s for s in self.supervisors.values() if s.is_ready
+        ])
+
+    async def _on_distribution_changed(self, distribution: Dict[str, List[int]]) -> None:
+        await self.update_handlers()
+
+    def register_client_handler(self, account_id: str, client: TelegramClientLike) -> None:
+        """Регистрация единственного обработчика обновлений клиента.
+
+        Обработчик не фильтрует чаты средствами Telethon: принадлежность чата
+        аккаунту проверяется по общей таблице маршрутизации.
+        """
+        registered = self._handler_clients.get(account_id)
+        if registered and registered[0] is client:
+            return
+
+        async def on_update(update):
+            await self._on_raw_update(account_id, client, update)
+
+        client.add_event_handler(
+            on_update,
+            events.Raw(types=[UpdateNewChannelMessage, UpdateNewMessage])
+        )
+        self._handler_clients[account_id] = (client, on_update)
+
+    async def _on_raw_update(self, account_id: str, client, update) -> None:
+        chat_id = self.router.chat_id_of(update)
+        if chat_id is None:
+            return
+
+        # Любое полученное обновление подтверждает членство аккаунта в чате
+        self.membership_cache.mark_seen(account_id, chat_id)
+
+        if not self.is_monitoring or not self.router.accepts_chat(account_id, chat_id):
+            return
+
+        self.load_tracker.record(chat_id)
+        MESSAGES.labels(account_id, chat_id).inc()
+
+        try:
+            event = self.build_event(client, update)
+            if event is None:
+                return
+        except Exception as e:
+            self.logger.error(f"Ошибка при разборе обновления для {account_id}: {e}")
+            return
+
+        await self.message_handler(event, account_id)
+
+    @staticmethod
+    def build_event(client, update):
+        """Событие NewMessage из сырого обновления (None, если это не новое сообщение)"""
+        event = events.NewMessage.build(update)
+        if event is None:
+            return None
+        event.original_update = update
+        event._entities = getattr(update, '_entities', {})
+        event._set_client(client)
+        return event
+
+    def assign_channel(self, chat_id: int, account_id: str) -> None:
+        """Назначение канала аккаунту (или перенос с другого аккаунта)"""
+        self.router.assign(chat_id, account_id)
+
+        if self.distributor:
+            distribution = self.distributor.distribution
+            for other_id, channels in distribution.items():
+                if other_id != account_id and chat_id in channels:
+                    channels.remove(chat_id)
+            channels = distribution.setdefault(account_id, [])
+            if chat_id not in channels:
+                channels.append(chat_id)
+
+    def unassign_channel(self, chat_id: int) -> None:
+        """Снятие канала с мониторинга на всех аккаунтах"""
+        self.router.unassign(chat_id)
 
     async def handle_account_failure(self, account_id: str, error: Exception) -> None:
         """Обработка выхода аккаунта из строя"""
         try:
             self.logger.error(f"Аккаунт {account_id} вышел из строя: {error}")
-            
-            # Отключаем проблемный клиент
-            client = self.monitoring_clients.pop(account_id, None)
-            if client:
-                try:
-                    await client.disconnect()
-                except:
-                    pass
-
-            # Пробуем переподключить аккаунт
-            MAX_RETRY_ATTEMPTS = 3
-            for attempt in range(MAX_RETRY_ATTEMPTS):
-                try:
-                    self.logger.info(f"Попытка переподключения аккаунта {account_id} ({attempt + 1}/{MAX_RETRY_ATTEMPTS})")
-                    await asyncio.sleep(5 * (attempt + 1))  # Увеличивающаяся задержка
-                    
-                    new_client = await self.account_manager.create_client(account_id)
-                    if new_client:
-                        self.monitoring_clients[account_id] = new_client
-                        self.logger.info(f"Аккаунт {account_id} успешно переподключен")
-                        
-                        # Восстанавливаем обработчики
-                        channels = self.distributor.distribution.get(account_id, [])
-                        if channels:
-                            new_client.add_event_handler(
-                                self.message_handler,
-                                events.NewMessage(chats=channels)
-                            )
-                        return
-                except Exception as e:
-                    self.logger.error(f"Попытка {attempt + 1} переподключения аккаунта {account_id} не удалась: {e}")
+            self.monitoring_clients.pop(account_id, None)
 
-            # Если все попытки неудачны, перераспределяем каналы
-            self.logger.warning(f"Не удалось восстановить аккаунт {account_id}, выполняем перераспределение")
-            await self.distributor.handle_account_failure(account_id)
+            # Переподключение с backoff выполняет супервизор, не блокируя остальные аккаунты
+            self._ensure_supervisor(account_id).report_failure(error)
 
         except Exception as e:
             self.logger.error(f"Ошибка при обработке выхода аккаунта из строя: {e}")
 
-    async def message_handler(self, event) -> None:
+    @staticmethod
+    def find_keywords(text: str, keywords: List[str]) -> List[str]:
+        """Ключевые слова, входящие в текст (без учета регистра)"""
+        message_text = text.lower()
+        return [word for word in keywords if word.lower() in message_text]
+
+    async def message_handler(self, event, account_id: Optional[str] = None) -> None:
         try:
             if not self.is_monitoring or not event.message:
                 return
-                    
+            received = time.time()
+            if self.recorder:
+                self.recorder.record(event, account_id, received)
+
             chat = await event.get_chat()
             if hasattr(chat, 'type') and chat.type == 'private':
                 return
@@ -299,21 +495,27 @@ class MessageMonitor:
                 return
                         
             self.processed_messages.add(message_unique_id)
+            self.telemetry.record_lag(account_id, event.message.date)
             
             if len(self.processed_messages) > 1000:
                 self.processed_messages = set(list(self.processed_messages)[-1000:])
 
             self.stats['messages_processed'] += 1
-            
-            if not event.message.text:
+
+            # Сопоставление идет по исходному тексту без разметки: message.text
+            # собирает разметку из entities (дорого на длинных постах), а
+            # форматирование нужно только для реально отправляемых уведомлений
+            raw_text = event.message.message
+            if not raw_text:
                 return
 
             # Определяем ID аккаунта-воркера
-            worker_phone = None
-            for phone, client in self.monitoring_clients.items():
-                if client == event.client:
-                    worker_phone = phone
-                    break
+            worker_phone = account_id
+            if worker_phone is None:
+                for phone, client in self.monitoring_clients.items():
+                    if client == event.client:
+                        worker_phone = phone
+                        break
                         
             # Загружаем ключевые слова
             keywords = self.db.load_keywords()
@@ -321,17 +523,17 @@ class MessageMonitor:
                 return
                         
             # Ищем совпадения
-            found_keywords = []
-            message_text = event.message.text.lower()
-            for word in keywords:
-                if word.lower() in message_text:
-                    found_keywords.append(word)
+            match_started = time.perf_counter()
+            found_keywords = self.find_keywords(raw_text, keywords)
+            MATCH_SECONDS.observe(time.perf_counter() - match_started)
 
             if not found_keywords:
                 return
+            matched = time.time()
 
             # Обновляем статистику найденных ключевых слов
             self.stats['keywords_found'] = self.stats.get('keywords_found', 0) + len(found_keywords)
+            KEYWORD_HITS.inc(len(found_keywords))
                         
             self.logger.info(f"Найдены ключевые слова: {found_keywords}")
 
@@ -368,36 +570,53 @@ class MessageMonitor:
                 except:
                     message_link = "Ссылка недоступна"
 
-            escaped_chat_title = chat.title.replace('_', '\\_').replace('*', '\\*').replace('`', '\\`').replace('[', '\\[')
-            escaped_text = event.message.text[:4000].replace('_', '\\_').replace('*', '\\*').replace('`', '\\`').replace('[', '\\[')
-            escaped_keywords = ', '.join(k.replace('_', '\\_').replace('*', '\\*').replace('`', '\\`').replace('[', '\\[') for k in found_keywords)
+            hit = {
+                'chat_id': chat.id,
+                'chat_title': chat.title,
+                'message_id': event.message.id,
+                'sender_id': sender.id if sender else None,
+                'sender_info': sender_info,
+                'text': raw_text,
+                'keywords': found_keywords,
+                'worker': worker_phone,
+                'message_link': message_link,
+                # Отметки времени этапов (время Unix) для HitLatencyTracker
+                'timing': {
+                    'date': event.message.date.timestamp() if event.message.date else received,
+                    'received': received,
+                    'matched': matched,
+                    'enqueued': time.time(),
+                },
+            }
+            if self.hit_sink:
+                # Процесс-воркер: уведомление отправит и сохранит координатор
+                await self.hit_sink(hit)
+            else:
+                await self.publish_hit(hit)
 
+        except Exception as e:
+            self.logger.error(f"Ошибка при обработке сообщения: {str(e)}")
+            self.stats['errors'] += 1
+            
+            
+    @staticmethod
+    def _stamp_delivery(timing: Dict, sending: float) -> None:
+        """Отметки начала и подтверждения первой успешной отправки (неудачные попытки не учитываются)"""
+        if 'acked' not in timing:
+            timing['sending'] = sending
+            timing['acked'] = time.time()
+
+    async def publish_hit(self, hit: Dict) -> None:
+        """Отправка уведомления о совпадении админам и сохранение в базу"""
+        NOTIFICATION_QUEUE.inc()
+        timing = dict(hit.get('timing') or {})
+        try:
             # Получаем список всех админов
             admins = await self.db.get_admins()
 
-            notification = (
-                "🔍 *Найдено совпадение\\!*\n\n"
-                f"📱 *Группа:* `{escaped_chat_title}`\n"
-                f"👤 *Отправитель:* {sender_info}\n"
-                f"🔑 *Ключевые слова:* `{escaped_keywords}`\n"
-                f"👨‍💻 *Воркер:* `{worker_phone}`\n\n"
-                f"💬 *Сообщение:*\n"
-                f"`{escaped_text}`\n\n"
-                f"🔗 [Ссылка на сообщение]({message_link})\n"
-                f"⏰ Время: `{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}`"
-            )
-
-            simple_notification = (
-                "🔍 Найдено совпадение!\n\n"
-                f"📱 Группа: {chat.title}\n"
-                f"👤 Отправитель: {sender_info}\n"
-                f"🔑 Ключевые слова: {', '.join(found_keywords)}\n"
-                f"👨‍💻 Воркер: {worker_phone}\n\n"
-                f"💬 Сообщение:\n"
-                f"{event.message.text[:4000]}\n\n"
-                f"🔗 {message_link}\n"
-                f"⏰ Время: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}"
-            )
+            # Тексты уведомлений собираются один раз и только если есть кому отправить
+            notification = None
+            simple_notification = None
 
             # Отправляем уведомление всем админам
             for admin in admins:
@@ -412,43 +631,107 @@ class MessageMonitor:
 
                     try:
                         # Пробуем отправить форматированное сообщение
+                        if notification is None:
+                            notification = self._format_notification(hit)
+                        sending = time.time()
+                        send_started = time.perf_counter()
                         await self.bot.bot.send_message(
                             chat_id=chat_id,
                             text=notification,
                             parse_mode='MarkdownV2',
                             disable_web_page_preview=True
                         )
+                        NOTIFICATION_SECONDS.observe(time.perf_counter() - send_started)
+                        self._stamp_delivery(timing, sending)
                     except Exception as format_error:
                         # Если не получилось, отправляем простое сообщение
                         self.logger.error(f"Ошибка форматирования: {format_error}")
+                        if simple_notification is None:
+                            simple_notification = self._format_simple_notification(hit)
+                        sending = time.time()
+                        send_started = time.perf_counter()
                         await self.bot.bot.send_message(
                             chat_id=chat_id,
                             text=simple_notification,
                             disable_web_page_preview=True
                         )
+                        NOTIFICATION_SECONDS.observe(time.perf_counter() - send_started)
+                        self._stamp_delivery(timing, sending)
 
                 except Exception as e:
                     self.logger.error(f"Ошибка при отправке уведомления админу {admin['username']}: {str(e)}")
 
+            # Задержки считаются до первого доставленного уведомления; без доставки не пишутся
+            if 'acked' in timing:
+                self.hit_latency.record(timing)
+
             # Сохраняем в базу данных
             try:
+                write_started = time.perf_counter()
                 await self.db.add_found_message(
-                    chat_id=chat.id,
-                    chat_title=chat.title,
-                    message_id=event.message.id,
-                    sender_id=sender.id if sender else None,
-                    sender_name=sender_info,
-                    text=event.message.text,
-                    found_keywords=found_keywords
+                    chat_id=hit['chat_id'],
+                    chat_title=hit['chat_title'],
+                    message_id=hit['message_id'],
+                    sender_id=hit['sender_id'],
+                    sender_name=hit['sender_info'],
+                    text=hit['text'],
+                    found_keywords=hit['keywords']
                 )
+                DB_WRITE_SECONDS.observe(time.perf_counter() - write_started)
             except Exception as db_error:
                 self.logger.error(f"Ошибка при сохранении сообщения в базу данных: {str(db_error)}")
 
         except Exception as e:
-            self.logger.error(f"Ошибка при обработке сообщения: {str(e)}")
-            self.stats['errors'] += 1
-            
-            
+            self.logger.error(f"Ошибка при отправке уведомления о совпадении: {str(e)}")
+        finally:
+            NOTIFICATION_QUEUE.dec()
+
+    @staticmethod
+    def _escape_markdown(text: str) -> str:
+        return text.replace('_', '\\_').replace('*', '\\*').replace('`', '\\`').replace('[', '\\[')
+
+    def _format_notification(self, hit: Dict) -> str:
+        escaped_chat_title = self._escape_markdown(hit['chat_title'])
+        escaped_text = self._escape_markdown(hit['text'][:4000])
+        escaped_keywords = ', '.join(self._escape_markdown(k) for k in hit['keywords'])
+        return (
+            "🔍 *Найдено совпадение\\!*\n\n"
+            f"📱 *Группа:* `{escaped_chat_title}`\n"
+            f"👤 *Отправитель:* {hit['sender_info']}\n"
+            f"🔑 *Ключевые слова:* `{escaped_keywords}`\n"
+            f"👨‍💻 *Воркер:* `{hit['worker']}`\n\n"
+            f"💬 *Сообщение:*\n"
+            f"`{escaped_text}`\n\n"
+            f"🔗 [Ссылка на сообщение]({hit['message_link']})\n"
+            f"⏰ Время: `{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}`"
+        )
+
+    @staticmethod
+    def _format_simple_notification(hit: Dict) -> str:
+        return (
+            "🔍 Найдено совпадение!\n\n"
+            f"📱 Группа: {hit['chat_title']}\n"
+            f"👤 Отправитель: {hit['sender_info']}\n"
+            f"🔑 Ключевые слова: {', '.join(hit['keywords'])}\n"
+            f"👨‍💻 Воркер: {hit['worker']}\n\n"
+            f"💬 Сообщение:\n"
+            f"{hit['text'][:4000]}\n\n"
+            f"🔗 {hit['message_link']}\n"
+            f"⏰ Время: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}"
+        )
+
+    async def notify_admins(self, text: str, parse_mode: Optional[str] = 'Markdown') -> None:
+        """Служебное уведомление всем админам, запустившим бота"""
+        if not self.bot or not hasattr(self.bot, 'bot'):
+            return
+        for admin in await self.db.get_admins():
+            try:
+                chat_id = await self.db.get_admin_chat_id(admin['username'])
+                if chat_id:
+                    await self.bot.bot.send_message(chat_id=chat_id, text=text, parse_mode=parse_mode)
+            except Exception as e:
+                self.logger.error(f"Ошибка при отправке уведомления админу {admin['username']}: {e}")
+
     async def send_error_notification(self, error_description: str) -> None:
         try:
             notification = MESSAGE_TEMPLATES['error_notification'].format(
@@ -478,15 +761,25 @@ class MessageMonitor:
                 self.is_monitoring = True
                 self.stats['status'] = 'Активен'
                 self.stats['start_time'] = datetime.now()
-                
-                # Запускаем задачу проверки состояния
-                self.health_check_task = asyncio.create_task(self.periodic_health_check())
+                self._start_supervisors()
+                self._start_background_tasks()
                 
                 self.logger.info(f"Мониторинг запущен с {len(self.monitoring_clients)} клиентами")
                 
         except Exception as e:
             self.logger.error(f"Ошибка при запуске мониторинга: {e}")
 
+    def _start_background_tasks(self) -> None:
+        """Запуск периодических задач (проверка состояния, телеметрия), если они еще не работают.
+
+        Вызывается и из initialize, и из start_monitoring: после initialize
+        мониторинг уже активен, и start_monitoring ничего не делает.
+        """
+        if self.health_check_task is None or self.health_check_task.done():
+            self.health_check_task = asyncio.create_task(self.periodic_health_check())
+        if self.telemetry_task is None or self.telemetry_task.done():
+            self.telemetry_task = asyncio.create_task(self.periodic_telemetry())
+
     async def stop_monitoring(self) -> None:
         try:
             self.is_monitoring = False
@@ -494,8 +787,23 @@ class MessageMonitor:
             self.stats['start_time'] = None
             
             # Останавливаем задачу проверки состояния
-            if hasattr(self, 'health_check_task'):
+            if self.health_check_task:
                 self.health_check_task.cancel()
+                self.health_check_task = None
+            if self.telemetry_task:
+                self.telemetry_task.cancel()
+                self.telemetry_task = None
+
+            await self.membership_cache.flush()
+            await self.hit_latency.flush()
+            if self.distributor:
+                await self.distributor.join_scheduler.stop()
+
+            # Останавливаем супервизоры клиентов
+            for supervisor in list(self.supervisors.values()):
+                supervisor.client = None
+                await supervisor.stop()
+            self.supervisors.clear()
                 
             # Корректно закрываем все клиенты
             for phone, client in self.monitoring_clients.items():
@@ -513,7 +821,11 @@ class MessageMonitor:
             self.logger.error(f"Ошибка при остановке мониторинга: {e}")
 
     async def periodic_health_check(self):
-        """Периодическая проверка состояния системы"""
+        """Периодическая проверка распределения каналов.
+
+        Состояние отдельных клиентов отслеживают их супервизоры, здесь
+        проверяется только покрытие каналов и наличие активных аккаунтов.
+        """
         try:
             while self.is_monitoring:
                 await asyncio.sleep(300)  # Проверка каждые 5 минут
@@ -523,45 +835,11 @@ class MessageMonitor:
                     
                 self.logger.info("Выполняется проверка состояния системы...")
                 
-                active_clients = 0
-                # Проверяем каждый аккаунт
-                for account_id, client in list(self.monitoring_clients.items()):
-                    try:
-                        if not client.is_connected():
-                            await self.handle_account_error(
-                                account_id,
-                                Exception("Клиент отключен")
-                            )
-                            continue
-                            
-                        # Проверяем авторизацию
-                        if not await client.is_user_authorized():
-                            await self.handle_account_error(
-                                account_id,
-                                Exception("Аккаунт не авторизован")
-                            )
-                            continue
-
-                        # Проверяем работоспособность
-                        try:
-                            me = await client.get_me()
-                            if me:
-                                active_clients += 1
-                        except Exception as e:
-                            if "FLOOD_WAIT" in str(e):
-                                await self.handle_account_error(account_id, e)
-                                continue
-                            else:
-                                self.logger.error(f"Ошибка при проверке аккаунта {account_id}: {e}")
-                                
-                    except Exception as e:
-                        self.logger.error(f"Ошибка при проверке аккаунта {account_id}: {e}")
-                
-                # Обновляем статистику активных клиентов
+                active_clients = len([s for s in self.supervisors.values() if s.is_ready])
                 self.stats['active_clients'] = active_clients
                         
                 # Проверяем необходимость перераспределения
-                if self.distributor:
+                if self.distributor and self.manages_distribution:
                     channels_count = len(set().union(*[
                         channels for channels in self.distributor.distribution.values()
                     ]))
@@ -569,27 +847,128 @@ class MessageMonitor:
                     if channels_count < self.stats['watched_channels']:
                         self.logger.warning("Обнаружены неотслеживаемые каналы, выполняем перераспределение")
                         await self.redistribute_channels()
+                    else:
+                        await self.distributor.rebalance_by_load()
                     
-                # Если нет активных клиентов, пробуем переинициализировать
-                if active_clients == 0:
-                    self.logger.warning("Нет активных клиентов, попытка переинициализации")
-                    try:
-                        await self.initialize_clients()
-                    except Exception as e:
-                        self.logger.error(f"Ошибка при переинициализации клиентов: {e}")
+                await self.membership_cache.flush()
+
+                # Подключаем аккаунты, у которых еще нет супервизора (например, новые)
+                try:
+                    await self.initialize_clients()
+                except Exception as e:
+                    self.logger.error(f"Ошибка при переинициализации клиентов: {e}")
 
         except asyncio.CancelledError:
             self.logger.info("Задача проверки состояния остановлена")
         except Exception as e:
             self.logger.error(f"Ошибка в задаче проверки состояния: {e}")
 
-    async def redistribute_channels(self) -> Dict[str, List[int]]:
+    async def periodic_telemetry(self):
+        """Замер времени ответа аккаунтов и смена прокси медленным аккаунтам"""
         try:
-            if not self.distributor:
+            while self.is_monitoring:
+                await asyncio.sleep(PROXY_SETTINGS['rtt_sample_interval'])
+
+                ready = [s for s in self.supervisors.values() if s.is_ready and s.client]
+                await asyncio.gather(*[
+                    self.telemetry.sample_rtt(s.account_id, s.client) for s in ready
+                ])
+
+                if not self.proxy_policy:
+                    continue
+                for account_id in self.proxy_policy.candidates([s.account_id for s in ready]):
+                    self.logger.warning(
+                        f"p95 времени ответа {account_id}: "
+                        f"{self.telemetry.p95_rtt(account_id):.2f} сек, меняем прокси"
+                    )
+                    await self.swap_account_proxy(account_id)
+
+        except asyncio.CancelledError:
+            self.logger.info("Задача телеметрии остановлена")
+        except Exception as e:
+            self.logger.error(f"Ошибка в задаче телеметрии: {e}")
+
+    async def swap_account_proxy(self, account_id: str) -> bool:
+        """Замена прокси аккаунта на лучший свободный из пула"""
+        try:
+            proxy_manager = self.account_manager.proxy_manager
+            new_proxy = await proxy_manager.reserve_proxy()
+            if not new_proxy:
+                self.logger.warning(f"Нет свободных прокси для замены у {account_id}")
+                return False
+
+            proxy_path = os.path.join(self.account_manager.bots_folder, account_id, "proxy.json")
+            old_proxy = None
+            try:
+                with open(proxy_path, 'r', encoding='utf-8') as f:
+                    old_proxy = json.load(f)
+            except Exception:
+                pass
+
+            old_client = self.monitoring_clients.get(account_id)
+            if not await self.account_manager.update_account_proxy(account_id, new_proxy):
+                await self._rollback_proxy_swap(account_id, proxy_path, old_proxy, new_proxy)
+                return False
+
+            if old_client:
+                try:
+                    await old_client.disconnect()
+                except Exception:
+                    pass
+
+            client = self.account_manager.monitoring_clients.get(account_id)
+            supervisor = self.supervisors.get(account_id)
+            if supervisor:
+                supervisor.client = client
+            self.monitoring_clients[account_id] = client
+            self.register_client_handler(account_id, client)
+
+            # Старый прокси возвращается в пул со штрафом за медленную работу
+            if old_proxy:
+                proxy_manager.pool.record(old_proxy, False, None)
+                await proxy_manager.return_proxy(old_proxy)
+
+            self.proxy_policy.mark_swapped(account_id)
+            self.logger.info(f"Прокси аккаунта {account_id} заменен на {new_proxy['addr']}:{new_proxy['port']}")
+            return True
+
+        except Exception as e:
+            self.logger.error(f"Ошибка при замене прокси аккаунта {account_id}: {e}")
+            return False
+
+    async def _rollback_proxy_swap(self, account_id: str, proxy_path: str,
+                                   old_proxy: Optional[Dict], new_proxy: Dict) -> None:
+        """Откат неудачной замены прокси: возвращаем старый proxy.json и переподключаемся через супервизор"""
+        proxy_manager = self.account_manager.proxy_manager
+        if old_proxy:
+            try:
+                with open(proxy_path, 'w', encoding='utf-8') as f:
+                    json.dump(old_proxy, f, indent=4)
+                await proxy_manager.return_proxy(new_proxy)
+            except Exception as e:
+                self.logger.error(f"Ошибка при восстановлении прокси аккаунта {account_id}: {e}")
+        # Без старого прокси proxy.json остается на новом, поэтому он не возвращается в пул
+
+        # Старый клиент уже отключен при пересоздании, держать его в мониторинге нельзя
+        self.monitoring_clients.pop(account_id, None)
+        self.account_manager.monitoring_clients.pop(account_id, None)
+        supervisor = self.supervisors.get(account_id)
+        if supervisor:
+            supervisor.report_failure(RuntimeError("не удалось заменить прокси"))
+        self.logger.warning(f"Замена прокси аккаунта {account_id} не удалась, клиент будет переподключен")
+
+    async def redistribute_channels(self, dry_run: bool = False) -> Dict[str, List[int]]:
+        """Перераспределение каналов между рабочими аккаунтами.
+
+        Использует планировщик с минимумом вступлений; при dry_run только
+        рассчитывает план и пишет его стоимость в лог.
+        """
+        try:
+            if not self.distributor or not self.manages_distribution:
                 return {}
                         
             # Получаем все каналы
-            channels = await self.db.load_channels()
+            channels = await self.load_watched_channels()
             if not channels:
                 return {}
                         
@@ -605,81 +984,129 @@ class MessageMonitor:
                 self.logger.error("Нет рабочих аккаунтов для перераспределения")
                 return {}
                         
-            # Выполняем новое распределение
-            new_distribution = await self.distributor.distribute_channels(
-                [int(channel['chat_id']) for channel in channels],
-                working_accounts
+            # Планируем перенос только избыточных каналов
+            channel_ids = [int(channel['chat_id']) for channel in channels]
+            capacities = RebalancePlanner.even_capacities(
+                working_accounts,
+                len(channel_ids),
+                self.distributor.max_channels_per_account
             )
-                    
-            if new_distribution:
-                # Применяем новое распределение
-                await self.distributor.apply_distribution(new_distribution)
-                
-                # Для каждого аккаунта обновляем обработчики и членство в каналах
-                for account_id, channel_ids in new_distribution.items():
-                    client = self.monitoring_clients.get(account_id)
-                    if client:
-                        # Обновляем обработчики для клиента
-                        handlers_to_remove = []
-                        for handler in client.list_event_handlers():
-                            if handler[0] == self.message_handler:
-                                handlers_to_remove.append(handler)
-                        
-                        for handler in handlers_to_remove:
-                            client.remove_event_handler(handler[0])
-                            
-                        client.add_event_handler(
-                            self.message_handler,
-                            events.NewMessage(chats=channel_ids)
-                        )
-                        
-                        self.logger.info(f"Обновлены каналы для аккаунта {account_id}: {len(channel_ids)} каналов")
+            plan = await self.distributor.plan_rebalance(channel_ids, capacities)
 
-                return new_distribution
-                
-            return {}
+            # Применение плана перестраивает таблицу маршрутизации через подписку
+            plan = await self.distributor.apply_plan(plan, dry_run=dry_run)
+            return plan['distribution']
 
         except Exception as e:
             self.logger.error(f"Ошибка при перераспределении каналов: {e}")
             return {}
 
+    @staticmethod
+    def normalize_link(link: str) -> str:
+        """Ссылка на канал в виде @username или исходной ссылки-приглашения"""
+        if link.startswith('https://t.me/'):
+            if '+' in link:
+                return link
+            return f"@{link.split('/')[-1]}"
+        if not link.startswith('@'):
+            return f"@{link}"
+        return link
+
+    async def resolve_link(self, chat_link: str) -> Dict:
+        """Разрешение ссылки первым клиентом процесса (запрос координатора без клиентов)"""
+        if not self.monitoring_clients:
+            raise ValueError("Нет доступных клиентов")
+        account_id, client = next(iter(self.monitoring_clients.items()))
+        entity = await self.resolution_cache.resolve(account_id, client, chat_link)
+        return {'id': entity.id, 'title': entity.title, 'username': entity.username}
+
+    async def reload_channels(self) -> None:
+        """Повторная загрузка каналов из базы: новые каналы распределяются между
+        клиентами процесса, аккаунты вступают в них через JoinScheduler"""
+        try:
+            if not self.distributor:
+                return
+            channels = await self.load_watched_channels()
+            active_clients = [
+                account_id for account_id, client in self.monitoring_clients.items()
+                if client and client.is_connected()
+            ]
+            if not channels or not active_clients:
+                return
+
+            distribution = await self.distributor.distribute_channels(
+                [int(channel['chat_id']) for channel in channels], active_clients
+            )
+            await self.distributor.apply_distribution(distribution)
+            for account_id, channel_ids in distribution.items():
+                for chat_id in channel_ids:
+                    if not self.membership_cache.get(account_id, chat_id):
+                        self.distributor.join_scheduler.submit(account_id, chat_id)
+            await self.update_handlers()
+            self.stats['watched_channels'] = len(channels)
+            self.logger.info(f"Каналы перезагружены: {len(channels)}")
+        except Exception as e:
+            self.logger.error(f"Ошибка при перезагрузке каналов: {e}")
+
+    async def _add_channel_remote(self, chat_link: str, progress_callback=None) -> bool:
+        """Добавление канала координатором: ссылку разрешает воркер, вступают
+        в канал воркеры после перезагрузки каналов"""
+        if progress_callback:
+            await progress_callback(f"🔄 Получение информации о канале через воркер...")
+        channel = await self.remote_resolver(chat_link)
+
+        if channel['id'] in self.db.channels:
+            if progress_callback:
+                await progress_callback(f"ℹ️ Канал {channel['title']} уже добавлен")
+            return True
+
+        if not await self.db.add_channel(
+            chat_id=channel['id'],
+            title=channel['title'],
+            username=channel['username']
+        ):
+            raise Exception("Не удалось сохранить канал в базу")
+
+        self.stats['watched_channels'] = len(self.db.channels)
+        if self.channels_changed:
+            await self.channels_changed()
+
+        if progress_callback:
+            await progress_callback(f"✅ Канал {channel['title']} добавлен, воркеры вступят в него в фоне")
+        return True
+
     async def add_channel(self, link: str, progress_callback = None) -> bool:
         try:
-            if not self.monitoring_clients:
+            if not self.monitoring_clients and not self.remote_resolver:
                 raise ValueError("Нет доступных клиентов")
 
             if progress_callback:
                 await progress_callback(f"🔍 Получение информации о канале: {link}")
 
-            client = next(iter(self.monitoring_clients.values()))
-            self.logger.info(f"Используем клиент для добавления чата")
+            chat_link = self.normalize_link(link)
+            self.logger.info(f"Пытаемся добавить чат: {chat_link}")
 
-            if link.startswith('https://t.me/'):
-                if '+' in link:
-                    chat_link = link
-                else:
-                    username = link.split('/')[-1]
-                    chat_link = f"@{username}"
-            elif not link.startswith('@'):
-                chat_link = f"@{link}"
-            else:
-                chat_link = link
+            # Канал с известным username уже отслеживается - запрос не нужен
+            if chat_link.startswith('@') and self.db.channels.get_id(chat_link) is not None:
+                if progress_callback:
+                    await progress_callback(f"ℹ️ Канал {chat_link} уже добавлен")
+                return True
 
-            self.logger.info(f"Пытаемся добавить чат: {chat_link}")
+            if not self.monitoring_clients:
+                return await self._add_channel_remote(chat_link, progress_callback)
+
+            account_id, client = next(iter(self.monitoring_clients.items()))
+            self.logger.info(f"Используем клиент {account_id} для добавления чата")
             
             if progress_callback:
                 await progress_callback(f"🔄 Получение информации о канале...")
 
-            # Получаем информацию о канале
-            entity = await client.get_entity(chat_link)
+            # Получаем информацию о канале (из кэша ссылок, иначе запросом)
+            entity = await self.resolution_cache.resolve(account_id, client, chat_link)
             self.logger.info(f"Получена информацию о чате: {entity.title}")
 
-            if not isinstance(entity, (Channel, PeerChannel)):
-                raise ValueError("Это не канал или группа")
-
             # Проверяем, не добавлен ли уже канал
-            existing_channels = await self.db.load_channels()
-            if any(int(channel['chat_id']) == entity.id for channel in existing_channels):
+            if entity.id in self.db.channels:
                 if progress_callback:
                     await progress_callback(f"ℹ️ Канал {entity.title} уже добавлен")
                 return True
@@ -697,7 +1124,16 @@ class MessageMonitor:
                 if progress_callback:
                     await progress_callback(f"🔄 Вступаем в канал {entity.title}...")
                 
-                await client(JoinChannelRequest(entity))
+                try:
+                    await client(JoinChannelRequest(entity.input_channel))
+                except Exception as e:
+                    if not (entity.cached and self.resolution_cache.is_stale_error(e)):
+                        raise
+                    # Запись в кэше устарела: сбрасываем и разрешаем ссылку заново
+                    self.logger.info(f"Устаревшая запись кэша для {chat_link}, повторное разрешение")
+                    await self.resolution_cache.invalidate(account_id, chat_link)
+                    entity = await self.resolution_cache.resolve(account_id, client, chat_link, force=True)
+                    await client(JoinChannelRequest(entity.input_channel))
                 self.logger.info(f"Успешно присоединились к чату: {entity.title}")
 
                 if progress_callback:
@@ -714,7 +1150,7 @@ class MessageMonitor:
                     
                     if progress_callback:
                         await progress_callback(f"🔄 Повторная попытка вступления в канал {entity.title}")
-                    await client(JoinChannelRequest(entity))
+                    await client(JoinChannelRequest(entity.input_channel))
                 else:
                     raise
 
@@ -728,38 +1164,14 @@ class MessageMonitor:
             if not success:
                 raise Exception("Не удалось сохранить канал в базу")
 
-            # После успешного сохранения обновляем обработчики
-            channels = await self.db.load_channels()
-            allowed_chat_ids = [int(channel['chat_id']) for channel in channels]
-
-            for account_id, client in self.monitoring_clients.items():
-                try:
-                    # Удаляем старые обработчики
-                    handlers_to_remove = []
-                    for handler in client.list_event_handlers():
-                        if handler[0] == self.message_handler:
-                            handlers_to_remove.append(handler)
-                    
-                    for handler in handlers_to_remove:
-                        client.remove_event_handler(handler[0])
-                    
-                    # Добавляем новый обработчик с обновленным списком каналов
-                    client.add_event_handler(
-                        self.message_handler,
-                        events.NewMessage(chats=allowed_chat_ids)
-                    )
-                    
-                    self.logger.info(
-                        f"Обновлены обработчики для аккаунта {account_id}: "
-                        f"{len(allowed_chat_ids)} каналов"
-                    )
-                except Exception as e:
-                    self.logger.error(
-                        f"Ошибка при обновлении обработчиков для аккаунта {account_id}: {e}"
-                    )
+            # Канал отслеживает аккаунт, который в него вступил
+            self.assign_channel(entity.id, account_id)
+            self.register_client_handler(account_id, client)
+            if self.distributor:
+                await self.distributor.apply_distribution(self.distributor.distribution)
 
             # Обновляем статистику
-            self.stats['watched_channels'] = len(channels)
+            self.stats['watched_channels'] = len(self.db.channels)
 
             if progress_callback:
                 await progress_callback(f"✅ Канал {entity.title} успешно добавлен")
@@ -780,6 +1192,8 @@ class MessageMonitor:
             if not success:
                 return False
 
+            self.unassign_channel(chat_id)
+
             # Получаем текущее распределение
             if self.distributor:
                 distribution = self.distributor.distribution
@@ -789,32 +1203,15 @@ class MessageMonitor:
                     if chat_id in channels:
                         # Удаляем канал из списка
                         channels.remove(chat_id)
-                        
-                        # Обновляем обработчики для этого аккаунта
-                        client = self.monitoring_clients.get(account_id)
-                        if client:
-                            # Удаляем старые обработчики
-                            handlers_to_remove = []
-                            for handler in client.list_event_handlers():
-                                if handler[0] == self.message_handler:
-                                    handlers_to_remove.append(handler)
-                            
-                            for handler in handlers_to_remove:
-                                client.remove_event_handler(handler[0])
-                            
-                            # Добавляем новый обработчик с обновленным списком каналов
-                            if channels:
-                                client.add_event_handler(
-                                    self.message_handler,
-                                    events.NewMessage(chats=channels)
-                                )
                         break
 
                 # Сохраняем обновленное распределение
                 await self.distributor.apply_distribution(distribution)
 
             # Обновляем статистику
-            self.stats['watched_channels'] = len(await self.db.load_channels())
+            self.stats['watched_channels'] = len(self.db.channels)
+            if self.channels_changed and not self.monitoring_clients:
+                await self.channels_changed()
             
             self.logger.info(f"Канал {chat_id} успешно удален")
             return True
@@ -843,7 +1240,17 @@ class MessageMonitor:
         else:
             self.stats['status'] = 'Остановлен'
 
-        return self.stats
+        if not self.remote_stats:
+            return self.stats
+
+        # Многопроцессный режим: суммируем статистику процессов-воркеров
+        stats = dict(self.stats)
+        for remote in self.remote_stats.values():
+            for key in ('messages_processed', 'keywords_found', 'errors', 'active_clients'):
+                stats[key] = stats.get(key, 0) + remote.get(key, 0)
+        if stats['active_clients'] > 0:
+            stats['status'] = 'Активен'
+        return stats
 
     async def check_channels(self) -> Dict[str, bool]:
         results = {}
@@ -862,11 +1269,9 @@ class MessageMonitor:
         
     async def calculate_optimal_channels(self) -> int:
         try:
-            from project.config import load_settings
-            settings = load_settings()
-            max_channels_per_client = settings.get('max_channels_per_client', 500)
+            max_channels_per_client = SETTINGS.max_channels_per_client
 
-            all_channels = self.db.load_channels()
+            all_channels = await self.load_watched_channels()
             total_channels = len(all_channels)
             active_accounts = len(self.monitoring_clients)
 
@@ -894,7 +1299,7 @@ class MessageMonitor:
 
         except Exception as e:
             self.logger.error(f"Ошибка при расчете оптимальной нагрузки: {e}")
-            return settings.get('max_channels_per_client', 500)
+            return MONITORING_SETTINGS.get('max_channels_per_client', 500)
 
     async def handle_new_account(self, account_id: str) -> bool:
         try:
@@ -906,55 +1311,32 @@ class MessageMonitor:
             self.monitoring_clients[account_id] = client
 
             optimal_channels_per_account = await self.calculate_optimal_channels()
-            channels_to_move = []
+            distribution = self.distributor.distribution
 
-            for existing_account, existing_client in self.monitoring_clients.items():
+            # Избыток отдают только сильно перегруженные аккаунты,
+            # остальные сохраняют свои каналы
+            capacities = {}
+            for existing_account in set(self.monitoring_clients) | set(distribution):
+                current_channels = distribution.get(existing_account, [])
                 if existing_account == account_id:
-                    continue
-
-                current_channels = self.distributor.distribution.get(existing_account, [])
-                if len(current_channels) > (optimal_channels_per_account * REDISTRIBUTION_THRESHOLD):
-                    excess_channels = len(current_channels) - optimal_channels_per_account
-                    channels_to_transfer = min(
-                        excess_channels,
-                        len(current_channels) - optimal_channels_per_account
-                    )
-
-                    channels_to_move.extend(current_channels[-channels_to_transfer:])
-                    self.distributor.distribution[existing_account] = current_channels[:-channels_to_transfer]
-
-                    handlers_to_remove = []
-                    for handler in existing_client.list_event_handlers():
-                        if handler[0] == self.message_handler:
-                            handlers_to_remove.append(handler)
-
-                    for handler in handlers_to_remove:
-                        existing_client.remove_event_handler(handler[0])
-
-                    existing_client.add_event_handler(
-                        self.message_handler,
-                        events.NewMessage(chats=self.distributor.distribution[existing_account])
-                    )
-
+                    capacities[existing_account] = optimal_channels_per_account
+                elif len(current_channels) > (optimal_channels_per_account * REDISTRIBUTION_THRESHOLD):
+                    capacities[existing_account] = optimal_channels_per_account
                     self.logger.info(
-                        f"Перемещаем {channels_to_transfer} каналов с аккаунта {existing_account}"
+                        f"Перемещаем {len(current_channels) - optimal_channels_per_account} "
+                        f"каналов с аккаунта {existing_account}"
                     )
+                else:
+                    capacities[existing_account] = len(current_channels)
 
-            if channels_to_move:
-                self.distributor.distribution[account_id] = channels_to_move
+            self.register_client_handler(account_id, client)
 
-                for channel_id in channels_to_move:
-                    try:
-                        await self.distributor.safe_join_channel(client, channel_id)
-                        await asyncio.sleep(5)
-                    except Exception as e:
-                        self.logger.error(f"Ошибка при присоединении к каналу {channel_id}: {e}")
-
-                client.add_event_handler(
-                    self.message_handler,
-                    events.NewMessage(chats=channels_to_move)
-                )
+            all_channels = [chat_id for channels in distribution.values() for chat_id in channels]
+            plan = await self.distributor.plan_rebalance(all_channels, capacities)
+            plan = await self.distributor.apply_plan(plan)
+            channels_to_move = [move['chat_id'] for move in plan['moves'] if move['to'] == account_id]
 
+            if channels_to_move:
                 self.logger.info(
                     f"Аккаунту {account_id} передано {len(channels_to_move)} каналов"
                 )
@@ -1017,66 +1399,36 @@ class MessageMonitor:
     async def handle_account_error(self, account_id: str, error: Exception) -> None:
         try:
             self.logger.error(f"Ошибка аккаунта {account_id}: {str(error)}")
-            
-            # Отключаем проблемный клиент
-            client = self.monitoring_clients.pop(account_id, None)
-            if client:
-                try:
-                    await client.disconnect()
-                except:
-                    pass
+            self.monitoring_clients.pop(account_id, None)
 
-            # Если есть дистрибьютор
-            if self.distributor:
-                # Перераспределяем каналы
-                success = await self.distributor.handle_account_failure(account_id)
-                if success:
-                    # Обновляем обработчики для всех аккаунтов
-                    for acc_id, channels in self.distributor.distribution.items():
-                        client = self.monitoring_clients.get(acc_id)
-                        if client:
-                            # Удаляем старые обработчики
-                            handlers_to_remove = []
-                            for handler in client.list_event_handlers():
-                                if handler[0] == self.message_handler:
-                                    handlers_to_remove.append(handler)
-                            
-                            for handler in handlers_to_remove:
-                                client.remove_event_handler(handler[0])
-                            
-                            # Добавляем новый обработчик
-                            client.add_event_handler(
-                                self.message_handler,
-                                events.NewMessage(chats=channels)
-                            )
-                            
-                            self.logger.info(
-                                f"Обновлены каналы для аккаунта {acc_id}: {len(channels)} каналов"
-                            )
-
-            notification = (
-                f"❌ *Ошибка аккаунта*\n\n"
-                f"Аккаунт: `{account_id}`\n"
-                f"Ошибка: `{str(error)}`\n"
-                f"Время: `{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}`\n\n"
-                "Каналы перераспределены между оставшимися аккаунтами."
-            )
-            
-            try:
-                if hasattr(self.bot, 'bot'):
-                    await self.bot.bot.send_message(
-                        chat_id=self.admin_chat_id,
-                        text=notification,
-                        parse_mode='Markdown'
-                    )
-                elif hasattr(self.bot, 'send_message'):
-                    await self.bot.send_message(
-                        chat_id=self.admin_chat_id,
-                        text=notification,
-                        parse_mode='Markdown'
-                    )
-            except Exception as e:
-                self.logger.error(f"Ошибка при отправке уведомления: {e}")
+            # Супервизор переподключит клиента с backoff; при окончательном отказе
+            # дистрибьютор получит событие и перераспределит каналы
+            self._ensure_supervisor(account_id).report_failure(error)
 
         except Exception as e:
-            self.logger.error(f"Ошибка при обработке ошибки аккаунта {account_id}: {e}")
\ No newline at end of file
+            self.logger.error(f"Ошибка при обработке ошибки аккаунта {account_id}: {e}")
+
+    async def _notify_account_failure(self, account_id: str, error: str) -> None:
+        notification = (
+            f"❌ *Ошибка аккаунта*\n\n"
+            f"Аккаунт: `{account_id}`\n"
+            f"Ошибка: `{error}`\n"
+            f"Время: `{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}`\n\n"
+            "Каналы перераспределены между оставшимися аккаунтами."
+        )
+        
+        try:
+            if hasattr(self.bot, 'bot'):
+                await self.bot.bot.send_message(
+                    chat_id=self.admin_chat_id,
+                    text=notification,
+                    parse_mode='Markdown'
+                )
+            elif hasattr(self.bot, 'send_message'):
+                await self.bot.send_message(
+                    chat_id=self.admin_chat_id,
+                    text=notification,
+                    parse_mode='Markdown'
+                )
+        except Exception as e:
+            self.logger.error(f"Ошибка при отправке уведомления: {e}")
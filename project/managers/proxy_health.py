@@ -0,0 +1,167 @@
+import time
+import asyncio
+import logging
+from typing import Callable, Dict, List, Optional, Tuple
+from ..config import PROXY_SETTINGS
+
+logger = logging.getLogger(__name__)
+
+
+class ProxyHealthService:
+    """Фоновая проверка прокси с кэшированием результатов.
+
+    Живость прокси определяется SOCKS5-рукопожатием (приветствие и, при
+    наличии логина, авторизация RFC 1929) без HTTP-запроса через прокси.
+    Результаты хранятся check_interval секунд; интерфейс и импорт аккаунтов
+    читают кэш через status()/check(), а устаревшие записи обновляются в фоне.
+    """
+
+    def __init__(self, proxy_manager, ttl: float = None, max_concurrent: int = None, timeout: float = None):
+        self.proxy_manager = proxy_manager
+        self.ttl = ttl or PROXY_SETTINGS['check_interval']
+        self.timeout = timeout or PROXY_SETTINGS['check_timeout']
+        self._semaphore = asyncio.Semaphore(max_concurrent or PROXY_SETTINGS['max_simultaneous_checks'])
+        self._results: Dict[str, Tuple[bool, Optional[float], float]] = {}  # ключ -> (работает, задержка, время)
+        self._watched: Dict[str, Dict] = {}
+        self._pending: Dict[str, asyncio.Task] = {}
+        self._task: Optional[asyncio.Task] = None
+        self._listeners: List[Callable[[Dict, bool, Optional[float]], None]] = []
+        self.logger = logger
+
+    def subscribe(self, callback: Callable[[Dict, bool, Optional[float]], None]) -> None:
+        """Подписка на результаты проверок: callback(прокси, работает, задержка)"""
+        self._listeners.append(callback)
+
+    @staticmethod
+    def key(proxy: Dict) -> str:
+        return f"{proxy['addr']}:{proxy['port']}"
+
+    def watch(self, proxy: Dict) -> None:
+        """Добавить прокси (например, прокси аккаунта) в фоновые проверки"""
+        self._watched[self.key(proxy)] = proxy
+
+    def status(self, proxy: Dict) -> Optional[bool]:
+        """Кэшированный статус без ожидания: None, если прокси еще не проверен.
+        Устаревшая запись возвращается как есть, а проверка запускается в фоне."""
+        key = self.key(proxy)
+        self._watched.setdefault(key, proxy)
+        result = self._results.get(key)
+        if not result or time.time() - result[2] > self.ttl:
+            self._schedule(proxy)
+        return result[0] if result else None
+
+    def latency(self, proxy: Dict) -> Optional[float]:
+        result = self._results.get(self.key(proxy))
+        return result[1] if result else None
+
+    async def check(self, proxy: Dict, force: bool = False) -> bool:
+        """Статус прокси: из кэша, если он свежий, иначе проверкой"""
+        result = self._results.get(self.key(proxy))
+        if not force and result and time.time() - result[2] <= self.ttl:
+            return result[0]
+        return await self._probe_once(proxy)
+
+    async def check_many(self, proxies: List[Dict], force: bool = False) -> List[bool]:
+        return await asyncio.gather(*[self.check(proxy, force) for proxy in proxies])
+
+    def _schedule(self, proxy: Dict) -> Optional[asyncio.Task]:
+        key = self.key(proxy)
+        task = self._pending.get(key)
+        if task:
+            return task
+        try:
+            task = asyncio.get_running_loop().create_task(self._probe(proxy))
+        except RuntimeError:
+            return None
+        self._pending[key] = task
+        task.add_done_callback(lambda _: self._pending.pop(key, None))
+        return task
+
+    async def _probe_once(self, proxy: Dict) -> bool:
+        """Одна проверка на прокси: параллельные запросы ждут уже идущую"""
+        return await asyncio.shield(self._schedule(proxy))
+
+    async def _probe(self, proxy: Dict) -> bool:
+        async with self._semaphore:
+            started = time.monotonic()
+            is_working = await self._socks5_handshake(proxy)
+            latency = time.monotonic() - started if is_working else None
+        self._results[self.key(proxy)] = (is_working, latency, time.time())
+        for callback in self._listeners:
+            try:
+                callback(proxy, is_working, latency)
+            except Exception as e:
+                self.logger.error(f"Ошибка в подписчике проверки прокси: {e}")
+        return is_working
+
+    async def _socks5_handshake(self, proxy: Dict) -> bool:
+        writer = None
+        try:
+            reader, writer = await asyncio.wait_for(
+                asyncio.open_connection(proxy['addr'], int(proxy['port'])),
+                timeout=self.timeout
+            )
+            username = (proxy.get('username') or '').encode()
+            password = (proxy.get('password') or '').encode()
+
+            # Приветствие: версия 5, один метод (логин/пароль или без авторизации)
+            method = 0x02 if username else 0x00
+            writer.write(bytes([0x05, 0x01, method]))
+            await writer.drain()
+            reply = await asyncio.wait_for(reader.readexactly(2), timeout=self.timeout)
+            if reply[0] != 0x05 or reply[1] != method:
+                return False
+
+            if method == 0x02:
+                writer.write(
+                    bytes([0x01, len(username)]) + username + bytes([len(password)]) + password
+                )
+                await writer.drain()
+                reply = await asyncio.wait_for(reader.readexactly(2), timeout=self.timeout)
+                if reply[1] != 0x00:
+                    return False
+
+            return True
+
+        except Exception as e:
+            self.logger.debug(f"Прокси {self.key(proxy)} не прошел проверку: {e}")
+            return False
+        finally:
+            if writer:
+                writer.close()
+                try:
+                    await writer.wait_closed()
+                except Exception:
+                    pass
+
+    async def refresh(self) -> Dict[str, bool]:
+        """Проверка всех известных прокси (из файла и отслеживаемых)"""
+        proxies = {self.key(p): p for p in self.proxy_manager.load_proxies()}
+        proxies.update(self._watched)
+        results = await self.check_many(list(proxies.values()), force=True)
+        working = sum(results)
+        self.logger.info(f"Проверено прокси: {len(results)}, рабочих: {working}")
+        return dict(zip(proxies.keys(), results))
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                await self.refresh()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                self.logger.error(f"Ошибка при фоновой проверке прокси: {e}")
+            await asyncio.sleep(self.ttl)
+
+    def start(self) -> None:
+        if not self._task or self._task.done():
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
@@ -1,40 +1,49 @@
 import re
 import json
-import aiohttp
 import logging
 import os
 import asyncio
-from aiohttp_socks import ProxyConnector
 from typing import Optional, List, Dict, Tuple
 from ..config import PROXY_FILE, PROXY_SETTINGS
+from .proxy_health import ProxyHealthService
+from .proxy_pool import ProxyPool
 
 logger = logging.getLogger(__name__)
 
 class ProxyManager:
-    def __init__(self):
+    def __init__(self, read_only: bool = False):
+        """read_only - пул только для чтения (процессы-воркеры, пулом владеет координатор)"""
         self.proxy_file = PROXY_FILE
-        self.test_url = "http://httpbin.org/ip"
         self.test_timeout = PROXY_SETTINGS['check_timeout']
         self.max_concurrent_checks = PROXY_SETTINGS['max_simultaneous_checks']
         self._cached_proxies = []
         self.logger = logger
-        self._semaphore = asyncio.Semaphore(self.max_concurrent_checks)
-        
+        self.health = ProxyHealthService(self)
+        self.pool = ProxyPool(self.proxy_file, self.parse_proxy, read_only=read_only)
+        self.health.subscribe(self.pool.record)
+
         proxy_dir = os.path.dirname(self.proxy_file)
         os.makedirs(proxy_dir, exist_ok=True)
-        if not os.path.exists(self.proxy_file):
+        if not read_only and not os.path.exists(self.proxy_file):
             with open(self.proxy_file, 'w', encoding='utf-8') as f:
                 pass
 
+        self.pool.load()
+
     def add_proxy(self, proxy_string: str) -> bool:
         try:
-            with open(self.proxy_file, 'a', encoding='utf-8') as f:
-                f.write(f"{proxy_string}\n")
-            return True
+            return self.pool.add(proxy_string)
         except Exception as e:
             self.logger.error(f"Ошибка при добавлении прокси: {e}")
             return False
 
+    def clear_proxies(self) -> None:
+        self.pool.clear()
+
+    def load_proxies(self) -> List[Dict]:
+        """Свободные прокси из пула в разобранном виде"""
+        return self.pool.proxies()
+
     def parse_proxy(self, proxy_string: str) -> Optional[Dict]:
         """Парсинг строки прокси"""
         try:
@@ -70,16 +79,22 @@ class ProxyManager:
             return None
 
     async def reserve_proxy(self) -> Optional[Dict]:
-        """Получить и зарезервировать прокси"""
+        """Получить и зарезервировать лучший по оценке рабочий прокси"""
         try:
-            available_proxies = await self.get_available_proxies()
-            if not available_proxies:
-                self.logger.warning("Нет доступных прокси")
-                return None
+            tried = set()
+            while True:
+                proxy = self.pool.reserve(exclude=tried)
+                if not proxy:
+                    self.logger.warning("Нет доступных прокси")
+                    return None
+
+                # Статус обычно уже в кэше; сетевая проверка только для нового прокси
+                if await self.check_proxy(proxy):
+                    return proxy
+
+                tried.add(self.pool.key(proxy))
+                self.pool.release(proxy)
 
-            # Берем первую рабочую прокси
-            return available_proxies[0]
-            
         except Exception as e:
             self.logger.error(f"Ошибка при резервировании прокси: {e}")
             return None
@@ -87,54 +102,23 @@ class ProxyManager:
     async def return_proxy(self, proxy: Dict) -> None:
         """Вернуть прокси в пул"""
         try:
-            if await self.check_proxy(proxy):
-                self.add_proxy(
-                    f"{proxy['addr']}:{proxy['port']}:{proxy['username']}:{proxy['password']}"
-                )
+            self.pool.release(proxy)
         except Exception as e:
             self.logger.error(f"Ошибка при возврате прокси: {e}")
 
-    async def check_proxy(self, proxy_config: Dict) -> bool:
-        """Асинхронная проверка работоспособности прокси"""
-        async with self._semaphore:  # Ограничиваем одновременных проверок
-            try:
-                proxy_url = f"socks5://{proxy_config['username']}:{proxy_config['password']}@{proxy_config['addr']}:{proxy_config['port']}"
-                
-                connector = ProxyConnector.from_url(proxy_url)
-                timeout = aiohttp.ClientTimeout(total=self.test_timeout)
-                
-                async with aiohttp.ClientSession(connector=connector, timeout=timeout) as session:
-                    async with session.get(self.test_url) as response:
-                        if response.status == 200:
-                            data = await response.json()
-                            return 'origin' in data
-                return False
-            except Exception as e:
-                self.logger.error(f"Ошибка при проверке прокси {proxy_config['addr']}:{proxy_config['port']}: {e}")
-                return False
+    async def check_proxy(self, proxy_config: Dict, force: bool = False) -> bool:
+        """Работоспособность прокси: кэшированный результат или SOCKS5-рукопожатие"""
+        try:
+            return await self.health.check(proxy_config, force=force)
+        except Exception as e:
+            self.logger.error(f"Ошибка при проверке прокси {proxy_config['addr']}:{proxy_config['port']}: {e}")
+            return False
 
     async def get_available_proxies(self) -> List[Dict]:
         try:
-            proxies = []
-            with open(self.proxy_file, 'r', encoding='utf-8') as f:
-                proxy_strings = [line.strip() for line in f if line.strip()]
-
-            # Создаем список задач для проверки прокси
-            tasks = []
-            for proxy_string in proxy_strings:
-                proxy_config = self.parse_proxy(proxy_string)
-                if proxy_config:
-                    tasks.append(self.check_proxy(proxy_config))
-
-            # Запускаем проверки параллельно
-            if tasks:
-                results = await asyncio.gather(*tasks)
-                proxies = [
-                    config for config, is_valid in zip(
-                        [self.parse_proxy(p) for p in proxy_strings],
-                        results
-                    ) if is_valid
-                ]
+            proxy_configs = self.load_proxies()
+            results = await self.health.check_many(proxy_configs)
+            proxies = [config for config, is_valid in zip(proxy_configs, results) if is_valid]
 
             self.logger.info(f"Найдено {len(proxies)} рабочих прокси")
             return proxies
@@ -162,14 +146,12 @@ class ProxyManager:
             if tasks:
                 results = await asyncio.gather(*tasks)
 
-                # Добавляем рабочие прокси в файл
-                with open(self.proxy_file, 'a', encoding='utf-8') as f:
-                    for (proxy_string, _), is_working in zip(proxy_configs, results):
-                        if is_working:
-                            f.write(f"{proxy_string}\n")
-                            added += 1
-                        else:
-                            failed += 1
+                # Добавляем рабочие прокси в пул
+                for (proxy_string, _), is_working in zip(proxy_configs, results):
+                    if is_working and self.pool.add(proxy_string):
+                        added += 1
+                    else:
+                        failed += 1
 
             return added, failed
 
@@ -177,19 +159,13 @@ class ProxyManager:
             self.logger.error(f"Ошибка при массовом добавлении прокси: {e}")
             return added, failed
 
-    async def check_all_proxies(self) -> List[Tuple[Dict, bool]]:
+    async def check_all_proxies(self, force: bool = False) -> List[Tuple[Dict, bool]]:
+        """Статус всех прокси из файла; force - проверить заново, минуя кэш"""
         results = []
         try:
-            with open(self.proxy_file, 'r') as f:
-                proxy_strings = [line.strip() for line in f if line.strip()]
-
-            proxy_configs = [self.parse_proxy(p) for p in proxy_strings]
-            proxy_configs = [p for p in proxy_configs if p]
-
-            # Запускаем проверки параллельно
-            tasks = [self.check_proxy(config) for config in proxy_configs]
-            if tasks:
-                check_results = await asyncio.gather(*tasks)
+            proxy_configs = self.load_proxies()
+            if proxy_configs:
+                check_results = await self.health.check_many(proxy_configs, force=force)
                 results = list(zip(proxy_configs, check_results))
 
                 for config, is_working in results:
@@ -206,10 +182,7 @@ class ProxyManager:
     async def get_proxy_status(self) -> Dict:
         """Получение статистики прокси"""
         try:
-            with open(self.proxy_file, 'r') as f:
-                lines = f.readlines()
-            
-            total = len(lines)
+            total = len(self.pool)
             if not total:
                 return {
                     "total": 0,
@@ -243,24 +216,13 @@ class ProxyManager:
     async def remove_invalid_proxies(self) -> int:
         try:
             results = await self.check_all_proxies()
-            valid_proxies = []
             removed = 0
 
-            with open(self.proxy_file, 'r') as f:
-                proxy_strings = [line.strip() for line in f if line.strip()]
-
-            # Собираем рабочие прокси
-            for proxy_string, (config, is_working) in zip(proxy_strings, results):
-                if is_working:
-                    valid_proxies.append(proxy_string)
-                else:
+            for config, is_working in results:
+                if not is_working and self.pool.remove(config):
                     removed += 1
 
-            # Перезаписываем файл только рабочими прокси
-            with open(self.proxy_file, 'w') as f:
-                for proxy in valid_proxies:
-                    f.write(f"{proxy}\n")
-
+            self.pool.compact()
             return removed
 
         except Exception as e:
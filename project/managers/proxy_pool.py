@@ -0,0 +1,206 @@
+import os
+import heapq
+import logging
+import itertools
+from typing import Callable, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Штраф к оценке за долю неудачных проверок, секунд задержки
+FAILURE_PENALTY = 10.0
+# Оценка задержки прокси, который еще не проверялся
+UNKNOWN_LATENCY = 1.0
+# Сжатие журнала, когда в нем накопилось столько записей
+COMPACT_THRESHOLD = 200
+
+
+class ProxyPool:
+    """Пул свободных прокси в памяти.
+
+    Прокси упорядочены по оценке (задержка + штраф за долю неудачных
+    проверок) в куче с ленивым удалением, поэтому резервирование стоит
+    O(log n) и не требует проверки всего списка. Изменения дописываются
+    в журнал (<proxy.txt>.journal) строками "+<прокси>" / "-<прокси>";
+    compact() переписывает proxy.txt текущим содержимым пула и очищает журнал.
+
+    Пул с read_only=True (процессы-воркеры) только читает файлы: пишет и
+    выдает прокси один процесс-владелец, иначе несколько процессов сжимали
+    бы общий журнал одновременно.
+    """
+
+    def __init__(self, proxy_file: str, parse: Callable[[str], Optional[Dict]], read_only: bool = False):
+        self.proxy_file = proxy_file
+        self.read_only = read_only
+        self.journal_file = f"{proxy_file}.journal"
+        self.parse = parse
+        self._free: Dict[str, str] = {}        # ключ -> строка прокси
+        self._stats: Dict[str, Dict] = {}      # ключ -> {'latency', 'checks', 'failures'}
+        self._heap: List[Tuple[float, int, str]] = []
+        self._counter = itertools.count()
+        self._journal_size = 0
+        self.logger = logger
+
+    @staticmethod
+    def key(proxy: Dict) -> str:
+        return f"{proxy['addr']}:{proxy['port']}"
+
+    @staticmethod
+    def format(proxy: Dict) -> str:
+        return f"{proxy['addr']}:{proxy['port']}:{proxy['username']}:{proxy['password']}"
+
+    def __len__(self) -> int:
+        return len(self._free)
+
+    def __contains__(self, proxy: Dict) -> bool:
+        return self.key(proxy) in self._free
+
+    def proxies(self) -> List[Dict]:
+        return [config for config in map(self.parse, self._free.values()) if config]
+
+    def score(self, key: str) -> float:
+        stats = self._stats.get(key)
+        if not stats or not stats['checks']:
+            return UNKNOWN_LATENCY
+        latency = stats['latency'] if stats['latency'] is not None else UNKNOWN_LATENCY
+        return latency + FAILURE_PENALTY * stats['failures'] / stats['checks']
+
+    def _push(self, key: str) -> None:
+        heapq.heappush(self._heap, (self.score(key), next(self._counter), key))
+        if len(self._heap) > 2 * len(self._free) + 16:
+            self._rebuild_heap()
+
+    def _rebuild_heap(self) -> None:
+        """Куча заново из свободных прокси: устаревшие записи не копятся бесконечно"""
+        self._heap = [(self.score(key), next(self._counter), key) for key in self._free]
+        heapq.heapify(self._heap)
+
+    def load(self) -> None:
+        """Загрузка proxy.txt с применением журнала и последующим сжатием"""
+        self._free = {}
+        self._heap = []
+        try:
+            if os.path.exists(self.proxy_file):
+                with open(self.proxy_file, 'r', encoding='utf-8') as f:
+                    for line in f:
+                        self._add_line(line.strip())
+
+            if os.path.exists(self.journal_file):
+                with open(self.journal_file, 'r', encoding='utf-8') as f:
+                    for line in f:
+                        line = line.strip()
+                        if line.startswith('+'):
+                            self._add_line(line[1:])
+                        elif line.startswith('-'):
+                            config = self.parse(line[1:])
+                            if config:
+                                self._free.pop(self.key(config), None)
+
+            if not self.read_only:
+                self.compact()
+            self.logger.info(f"Загружено прокси в пул: {len(self._free)}")
+        except Exception as e:
+            self.logger.error(f"Ошибка при загрузке пула прокси: {e}")
+
+    def _add_line(self, proxy_string: str) -> Optional[str]:
+        config = self.parse(proxy_string) if proxy_string else None
+        if not config:
+            return None
+        key = self.key(config)
+        self._free[key] = proxy_string.split()[0]
+        self._push(key)
+        return key
+
+    def _journal(self, op: str, proxy_string: str) -> None:
+        if self.read_only:
+            return
+        try:
+            with open(self.journal_file, 'a', encoding='utf-8') as f:
+                f.write(f"{op}{proxy_string}\n")
+            self._journal_size += 1
+            if self._journal_size >= COMPACT_THRESHOLD:
+                self.compact()
+        except Exception as e:
+            self.logger.error(f"Ошибка при записи журнала прокси: {e}")
+
+    def compact(self) -> None:
+        """Перезапись proxy.txt содержимым пула и очистка журнала"""
+        if self.read_only:
+            return
+        try:
+            tmp_path = f"{self.proxy_file}.tmp"
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                for proxy_string in self._free.values():
+                    f.write(f"{proxy_string}\n")
+            os.replace(tmp_path, self.proxy_file)
+            if os.path.exists(self.journal_file):
+                os.remove(self.journal_file)
+            self._journal_size = 0
+        except Exception as e:
+            self.logger.error(f"Ошибка при сжатии журнала прокси: {e}")
+
+    def add(self, proxy_string: str) -> bool:
+        if self.read_only:
+            return False
+        key = self._add_line(proxy_string.strip())
+        if not key:
+            return False
+        self._journal('+', self._free[key])
+        return True
+
+    def remove(self, proxy: Dict) -> bool:
+        if self.read_only:
+            return False
+        proxy_string = self._free.pop(self.key(proxy), None)
+        if proxy_string is None:
+            return False
+        self._journal('-', proxy_string)
+        return True
+
+    def clear(self) -> None:
+        if self.read_only:
+            return
+        self._free = {}
+        self._heap = []
+        self.compact()
+
+    def reserve(self, exclude: Optional[set] = None) -> Optional[Dict]:
+        """Взять лучший свободный прокси. Синхронно, поэтому два резервирования
+        в одном цикле событий не получат один и тот же прокси."""
+        if self.read_only:
+            self.logger.warning("Пул прокси открыт только для чтения: прокси выдает процесс-владелец")
+            return None
+        skipped = []
+        reserved = None
+        while self._heap:
+            score, _, key = heapq.heappop(self._heap)
+            if key not in self._free or score != self.score(key):
+                continue  # устаревшая запись кучи
+            if exclude and key in exclude:
+                skipped.append(key)
+                continue
+            proxy_string = self._free.pop(key)
+            self._journal('-', proxy_string)
+            reserved = self.parse(proxy_string)
+            break
+
+        for key in skipped:
+            self._push(key)
+        return reserved
+
+    def release(self, proxy: Dict) -> None:
+        """Вернуть прокси в пул"""
+        self.add(self.format(proxy))
+
+    def record(self, proxy: Dict, is_working: bool, latency: Optional[float]) -> None:
+        """Учет результата проверки прокси в его оценке"""
+        key = self.key(proxy)
+        previous = self.score(key)
+        stats = self._stats.setdefault(key, {'latency': None, 'checks': 0, 'failures': 0})
+        stats['checks'] += 1
+        if is_working:
+            stats['latency'] = latency
+        else:
+            stats['failures'] += 1
+        # При неизменной оценке прежняя запись кучи остается действительной
+        if key in self._free and self.score(key) != previous:
+            self._push(key)
@@ -0,0 +1,122 @@
+import math
+from typing import Dict, List, Optional, Set
+
+
+class RebalancePlanner:
+    """Планировщик перераспределения каналов с минимумом вступлений.
+
+    На вход получает текущее распределение, целевую вместимость аккаунтов
+    и известные членства. Каналы остаются на месте, пока аккаунт не
+    превышает вместимость; при переносе предпочтение отдается аккаунтам,
+    которые уже состоят в канале (перенос без вступления).
+    План не выполняется здесь - его применяет вызывающий код, поэтому
+    тот же план служит и для пробного прогона (dry-run).
+    """
+
+    def __init__(self, current: Dict[str, List[int]], capacities: Dict[str, int],
+                 memberships: Optional[Dict[str, Set[int]]] = None,
+                 channels: Optional[List[int]] = None):
+        self.current = current
+        self.capacities = capacities
+        self.memberships = memberships or {}
+        self.channels = channels
+        # Аккаунт, который сейчас отслеживает канал, уже состоит в нем
+        self._assigned = {account_id: set(chat_ids) for account_id, chat_ids in current.items()}
+
+    @staticmethod
+    def even_capacities(accounts: List[str], channels_count: int, max_per_account: int) -> Dict[str, int]:
+        """Равномерная вместимость с учетом лимита каналов на аккаунт"""
+        if not accounts:
+            return {}
+        per_account = min(math.ceil(channels_count / len(accounts)), max_per_account)
+        return {account_id: per_account for account_id in accounts}
+
+    def _is_member(self, account_id: str, chat_id: int) -> bool:
+        return (chat_id in self.memberships.get(account_id, ())
+                or chat_id in self._assigned.get(account_id, ()))
+
+    def _has_spare_member(self, distribution: Dict[str, List[int]], account_id: str, chat_id: int) -> bool:
+        """Есть ли другой аккаунт со свободным местом, уже состоящий в канале"""
+        return any(
+            other != account_id
+            and len(distribution[other]) < self.capacities[other]
+            and self._is_member(other, chat_id)
+            for other in distribution
+        )
+
+    def plan(self) -> Dict:
+        """Построение плана: итоговое распределение, переносы и число вступлений"""
+        accounts = list(self.capacities)
+        if not accounts:
+            return {'distribution': {}, 'moves': [], 'joins': 0}
+        distribution = {account_id: [] for account_id in accounts}
+
+        channels = self.channels
+        if channels is None:
+            channels = [chat_id for chat_ids in self.current.values() for chat_id in chat_ids]
+        wanted = set(channels)
+
+        # Каналы, которые нужно разместить: с недоступных аккаунтов и новые
+        pending = []
+        placed = set()
+        for account_id, chat_ids in self.current.items():
+            for chat_id in chat_ids:
+                if chat_id not in wanted or chat_id in placed:
+                    continue
+                placed.add(chat_id)
+                if account_id in distribution:
+                    distribution[account_id].append(chat_id)
+                else:
+                    pending.append((chat_id, account_id))
+        pending.extend((chat_id, None) for chat_id in channels if chat_id not in placed)
+
+        # С перегруженных аккаунтов снимаем в первую очередь каналы,
+        # в которых уже состоит аккаунт со свободным местом
+        for account_id in accounts:
+            excess = len(distribution[account_id]) - self.capacities[account_id]
+            if excess <= 0:
+                continue
+            chat_ids = distribution[account_id]
+            ordered = sorted(
+                chat_ids,
+                key=lambda chat_id: not self._has_spare_member(distribution, account_id, chat_id)
+            )
+            shed = set(ordered[:excess])
+            distribution[account_id] = [chat_id for chat_id in chat_ids if chat_id not in shed]
+            pending.extend((chat_id, account_id) for chat_id in ordered[:excess])
+
+        # Сначала размещаем каналы, которые можно перенести без вступления
+        pending.sort(key=lambda item: not any(
+            self._is_member(account_id, item[0]) for account_id in accounts if account_id != item[1]
+        ))
+
+        moves = []
+        for chat_id, source in pending:
+            candidates = [
+                account_id for account_id in accounts
+                if len(distribution[account_id]) < self.capacities[account_id]
+            ] or accounts
+
+            # Без вступления, затем с наибольшим запасом вместимости
+            target = min(
+                candidates,
+                key=lambda x: (
+                    not self._is_member(x, chat_id),
+                    len(distribution[x]) - self.capacities[x]
+                )
+            )
+            distribution[target].append(chat_id)
+            if target == source:
+                continue
+            moves.append({
+                'chat_id': chat_id,
+                'from': source,
+                'to': target,
+                'join': not self._is_member(target, chat_id)
+            })
+
+        return {
+            'distribution': distribution,
+            'moves': moves,
+            'joins': sum(1 for move in moves if move['join'])
+        }
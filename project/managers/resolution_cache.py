@@ -0,0 +1,129 @@
+import re
+import time
+import logging
+from typing import Dict, Optional, Tuple
+from telethon.errors import (
+    ChannelInvalidError, ChannelPrivateError, UsernameNotOccupiedError, InviteHashExpiredError
+)
+from telethon.tl.types import Channel, InputChannel
+
+# Сбрасываемые ошибки: сохраненные id/access_hash больше не действительны
+STALE_ERRORS = (ChannelInvalidError, ChannelPrivateError, UsernameNotOccupiedError, InviteHashExpiredError)
+
+
+class ResolvedChannel:
+    """Результат разрешения ссылки: достаточно данных для вступления без get_entity"""
+
+    def __init__(self, chat_id: int, access_hash: int, title: str,
+                 username: Optional[str] = None, cached: bool = False):
+        self.id = chat_id
+        self.access_hash = access_hash
+        self.title = title
+        self.username = username
+        self.cached = cached
+
+    @property
+    def input_channel(self) -> InputChannel:
+        return InputChannel(self.id, self.access_hash)
+
+
+class ResolutionCache:
+    """Постоянный кэш разрешения ссылок (username / invite hash -> канал).
+
+    access_hash в Telegram привязан к аккаунту, поэтому ключ записи -
+    пара (ссылка, аккаунт). Записи старше ttl разрешаются заново; запись,
+    с которой запрос завершился ошибкой, сбрасывается через invalidate().
+    """
+
+    def __init__(self, db_manager, ttl: float = 7 * 24 * 3600):
+        self.db = db_manager
+        self.ttl = ttl
+        self._entries: Optional[Dict[Tuple[str, str], Tuple[int, int, str, Optional[str], float]]] = None
+        self._latest: Dict[str, Tuple[int, int, str, Optional[str], float]] = {}  # ключ -> самая свежая запись
+        self.stats = {'hits': 0, 'misses': 0}
+        self.logger = logging.getLogger(__name__)
+
+    @staticmethod
+    def link_key(chat_link: str) -> str:
+        """Нормализованный ключ ссылки: u:<username> или i:<invite hash>"""
+        link = chat_link.strip()
+        invite = re.search(r'(?:joinchat/|\+)([\w-]+)$', link)
+        if invite:
+            return f"i:{invite.group(1)}"
+        username = link.rstrip('/').split('/')[-1].lstrip('@').lower()
+        return f"u:{username}"
+
+    async def _ensure_loaded(self) -> None:
+        if self._entries is None:
+            self._entries = await self.db.load_resolved_links()
+            for (key, _), entry in self._entries.items():
+                if key not in self._latest or entry[4] > self._latest[key][4]:
+                    self._latest[key] = entry
+
+    async def get(self, account_id: str, chat_link: str) -> Optional[ResolvedChannel]:
+        await self._ensure_loaded()
+        entry = self._entries.get((self.link_key(chat_link), account_id))
+        if not entry or time.time() - entry[4] > self.ttl:
+            return None
+        chat_id, access_hash, title, username, _ = entry
+        return ResolvedChannel(chat_id, access_hash, title, username, cached=True)
+
+    async def lookup(self, chat_link: str) -> Optional[ResolvedChannel]:
+        """Свежая запись для ссылки от любого аккаунта: только id, title и username.
+
+        access_hash чужого аккаунта не подходит для запросов, поэтому он
+        не возвращается (0); для вступления нужен get() с нужным аккаунтом.
+        """
+        await self._ensure_loaded()
+        entry = self._latest.get(self.link_key(chat_link))
+        if not entry or time.time() - entry[4] > self.ttl:
+            return None
+        chat_id, _, title, username, _ = entry
+        return ResolvedChannel(chat_id, 0, title, username, cached=True)
+
+    async def put(self, account_id: str, chat_link: str, channel: ResolvedChannel) -> None:
+        await self._ensure_loaded()
+        key = self.link_key(chat_link)
+        entry = (channel.id, channel.access_hash, channel.title, channel.username, time.time())
+        self._entries[(key, account_id)] = entry
+        self._latest[key] = entry
+        await self.db.save_resolved_link(key, account_id, *entry)
+
+    async def invalidate(self, account_id: str, chat_link: str) -> None:
+        await self._ensure_loaded()
+        key = self.link_key(chat_link)
+        entry = self._entries.pop((key, account_id), None)
+        if entry:
+            if self._latest.get(key) is entry:
+                del self._latest[key]
+            await self.db.delete_resolved_link(key, account_id)
+
+    async def invalidate_link(self, chat_link: str) -> None:
+        """Сброс записей ссылки для всех аккаунтов (ссылка указывает не туда или больше не существует)"""
+        await self._ensure_loaded()
+        key = self.link_key(chat_link)
+        self._latest.pop(key, None)
+        for entry_key in [entry_key for entry_key in self._entries if entry_key[0] == key]:
+            del self._entries[entry_key]
+            await self.db.delete_resolved_link(*entry_key)
+
+    async def resolve(self, account_id: str, client, chat_link: str, force: bool = False) -> ResolvedChannel:
+        """Разрешение ссылки: из кэша, а при его отсутствии - через get_entity"""
+        if not force:
+            cached = await self.get(account_id, chat_link)
+            if cached:
+                self.stats['hits'] += 1
+                return cached
+
+        self.stats['misses'] += 1
+        entity = await client.get_entity(chat_link)
+        if not isinstance(entity, Channel) or not getattr(entity, 'access_hash', None):
+            raise ValueError("Это не канал или группа")
+
+        channel = ResolvedChannel(entity.id, entity.access_hash, entity.title, entity.username)
+        await self.put(account_id, chat_link, channel)
+        return channel
+
+    @staticmethod
+    def is_stale_error(error: Exception) -> bool:
+        return isinstance(error, STALE_ERRORS)
@@ -0,0 +1,63 @@
+import time
+import asyncio
+import logging
+from typing import Dict, Optional
+from ..config import SETTINGS
+
+logger = logging.getLogger(__name__)
+
+
+class RetentionJob:
+    """Периодическая очистка старых данных (cleanup_old_data).
+
+    Интервал и срок хранения берутся из настроек; при их изменении
+    ожидание прерывается и новый интервал применяется сразу.
+    """
+
+    def __init__(self, db_manager, settings=SETTINGS):
+        self.db = db_manager
+        self.settings = settings
+        self.logger = logger
+        self._task: Optional[asyncio.Task] = None
+        self._wake = asyncio.Event()
+        self._last_run = time.monotonic()
+        settings.subscribe(self.on_settings_changed)
+
+    def on_settings_changed(self, changes: Dict) -> None:
+        if 'cleanup_interval' in changes or 'data_retention_days' in changes:
+            self._wake.set()
+
+    async def run_once(self) -> None:
+        days = self.settings.data_retention_days
+        await asyncio.get_running_loop().run_in_executor(None, self.db.cleanup_old_data, days)
+
+    async def _run(self) -> None:
+        while True:
+            remaining = self.settings.cleanup_interval - (time.monotonic() - self._last_run)
+            if remaining > 0:
+                try:
+                    await asyncio.wait_for(self._wake.wait(), remaining)
+                    # Изменились настройки: пересчитываем ожидание с новым интервалом
+                    self._wake.clear()
+                    continue
+                except asyncio.TimeoutError:
+                    pass
+
+            self._last_run = time.monotonic()
+            try:
+                await self.run_once()
+            except Exception as e:
+                self.logger.error(f"Ошибка при очистке старых данных: {e}")
+
+    def start(self) -> None:
+        if not self._task or self._task.done():
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
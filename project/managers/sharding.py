@@ -0,0 +1,317 @@
+import zlib
+import queue
+import asyncio
+import logging
+import multiprocessing
+from datetime import datetime
+from typing import Dict, List, Optional
+from ..config import BOTS_FOLDER, SHARDING_SETTINGS
+
+logger = logging.getLogger(__name__)
+
+
+def shard_of_account(account_id: str, shards: int) -> int:
+    """Номер процесса для аккаунта; не зависит от порядка и числа других аккаунтов"""
+    return zlib.crc32(account_id.encode()) % shards
+
+
+def shard_of_channel(chat_id: int, owners: Dict[int, int], active: List[int]) -> int:
+    """Каналы остаются в процессе своего текущего аккаунта, новые делятся по id
+    между запущенными процессами (active - их номера по возрастанию)"""
+    owner = owners.get(chat_id)
+    if owner in active:
+        return owner
+    return active[abs(chat_id) % len(active)]
+
+
+def run_shard(shard_id: int, active: List[int], accounts: List[str], owners: Dict[int, int],
+              out_queue, in_queue) -> None:
+    """Точка входа процесса-воркера"""
+    asyncio.run(ShardWorker(shard_id, active, accounts, owners, out_queue, in_queue).run())
+
+
+class ShardWorker:
+    """Процесс-воркер: собственный MessageMonitor для своей части аккаунтов.
+
+    Совпадения и статистика отправляются координатору через out_queue,
+    команды приходят через in_queue: stop, reload (перечитать каналы из базы
+    с новой картой владельцев каналов) и resolve (разрешить ссылку на канал
+    для координатора).
+    """
+
+    def __init__(self, shard_id: int, active: List[int], accounts: List[str], owners: Dict[int, int],
+                 out_queue, in_queue):
+        self.shard_id = shard_id
+        self.active = active
+        self.accounts = set(accounts)
+        self.owners = owners
+        self.out_queue = out_queue
+        self.in_queue = in_queue
+        self.monitor = None
+        self.logger = logging.getLogger(f"{__name__}.shard{shard_id}")
+        self._tasks = set()
+
+    def _send(self, message: Dict) -> None:
+        message['shard'] = self.shard_id
+        self.out_queue.put(message)
+
+    async def _send_hit(self, hit: Dict) -> None:
+        self._send({'type': 'hit', 'hit': hit})
+
+    def _receive(self, timeout: float) -> Optional[Dict]:
+        try:
+            return self.in_queue.get(timeout=timeout)
+        except queue.Empty:
+            return None
+
+    def _spawn_task(self, coro) -> None:
+        task = asyncio.create_task(coro)
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _resolve(self, command: Dict) -> None:
+        try:
+            channel = await self.monitor.resolve_link(command['link'])
+            self._send({'type': 'resolved', 'id': command['id'], 'channel': channel})
+        except Exception as e:
+            self._send({'type': 'resolved', 'id': command['id'], 'error': str(e)})
+
+    def _stats(self) -> Dict:
+        stats = self.monitor.get_stats()
+        return {
+            key: stats.get(key, 0)
+            for key in ('messages_processed', 'keywords_found', 'errors', 'active_clients')
+        }
+
+    async def run(self) -> None:
+        # Импорт внутри процесса: модули с клиентами не нужны координатору до запуска воркеров
+        from ..database.database_manager import DatabaseManager
+        from .proxy_manager import ProxyManager
+        from .account_manager import AccountManager
+        from .message_monitor import MessageMonitor
+
+        try:
+            db = DatabaseManager()
+            account_manager = AccountManager(bots_folder=BOTS_FOLDER, proxy_manager=ProxyManager(read_only=True))
+            self.monitor = MessageMonitor(db, account_manager)
+            self.monitor.owned_accounts = self.accounts
+            self.monitor.channel_filter = (
+                lambda chat_id: shard_of_channel(chat_id, self.owners, self.active) == self.shard_id
+            )
+            self.monitor.hit_sink = self._send_hit
+            # Пул прокси принадлежит координатору: воркеры не меняют прокси сами
+            self.monitor.proxy_policy = None
+
+            await self.monitor.initialize(None)
+            await self.monitor.start_monitoring()
+            self.logger.info(f"Воркер {self.shard_id} запущен: {len(self.accounts)} аккаунтов")
+            self._send({'type': 'started', 'accounts': sorted(self.accounts)})
+
+            loop = asyncio.get_running_loop()
+            while True:
+                command = await loop.run_in_executor(
+                    None, self._receive, SHARDING_SETTINGS['stats_interval']
+                )
+                self._send({'type': 'stats', 'stats': self._stats()})
+                kind = command.get('type') if command else None
+                if kind == 'stop':
+                    break
+                if kind == 'reload':
+                    self.owners = command['owners']
+                    self.active = command['active']
+                    self._spawn_task(self.monitor.reload_channels())
+                elif kind == 'resolve':
+                    self._spawn_task(self._resolve(command))
+
+        except Exception as e:
+            self.logger.error(f"Ошибка в воркере {self.shard_id}: {e}")
+            self._send({'type': 'error', 'error': str(e)})
+        finally:
+            if self.monitor:
+                await self.monitor.stop_monitoring()
+            self._send({'type': 'stopped'})
+
+
+class ShardCoordinator:
+    """Координатор многопроцессного режима.
+
+    Процесс бота (интерфейс и владелец базы) делит аккаунты из BOTS_FOLDER
+    между shards процессами-воркерами, принимает от них совпадения (отправка
+    уведомлений и запись в базу идут здесь) и статистику, перезапускает
+    упавшие воркеры.
+    """
+
+    def __init__(self, message_monitor, shards: int = None):
+        self.monitor = message_monitor
+        self.shards = shards or SHARDING_SETTINGS['shards']
+        self.logger = logger
+        self._ctx = multiprocessing.get_context('spawn')
+        self._out_queue = None
+        self._processes: Dict[int, multiprocessing.Process] = {}
+        self._in_queues: Dict[int, object] = {}
+        self._plan: Dict[int, List[str]] = {}
+        self._owners: Dict[int, int] = {}
+        self._active: List[int] = []  # номера процессов, у которых есть аккаунты
+        self._reader: Optional[asyncio.Task] = None
+        self._stopping = False
+        self._requests: Dict[int, asyncio.Future] = {}
+        self._next_request = 0
+        self._hit_tasks = set()
+        # Клиентов в процессе бота нет: новые каналы разрешают и отслеживают воркеры
+        self.monitor.remote_resolver = self.resolve
+        self.monitor.channels_changed = self.reload
+
+    async def plan(self) -> Dict[int, List[str]]:
+        """Разбиение аккаунтов и текущих каналов по процессам"""
+        plan = {shard_id: [] for shard_id in range(self.shards)}
+        for account_id in sorted(self.monitor.account_manager.get_accounts()):
+            plan[shard_of_account(account_id, self.shards)].append(account_id)
+
+        self._plan = plan
+        self._active = [shard_id for shard_id, accounts in plan.items() if accounts]
+        await self._load_owners()
+        return plan
+
+    async def _load_owners(self) -> None:
+        """Процесс-владелец каждого канала по сохраненному распределению"""
+        distribution = await self.monitor.db.load_distribution()
+        self._owners = {
+            int(chat_id): shard_of_account(account_id, self.shards)
+            for account_id, channels in distribution.items()
+            for chat_id in channels
+        }
+
+    def _spawn(self, shard_id: int) -> None:
+        in_queue = self._ctx.Queue()
+        process = self._ctx.Process(
+            target=run_shard,
+            args=(shard_id, self._active, self._plan[shard_id], self._owners, self._out_queue, in_queue),
+            name=f"monitor-shard-{shard_id}",
+            daemon=True
+        )
+        process.start()
+        self._processes[shard_id] = process
+        self._in_queues[shard_id] = in_queue
+        self.logger.info(
+            f"Запущен воркер {shard_id} (pid {process.pid}), аккаунтов: {len(self._plan[shard_id])}"
+        )
+
+    async def start(self) -> None:
+        await self.plan()
+        self._stopping = False
+        self._out_queue = self._ctx.Queue()
+        for shard_id in self._active:
+            self._spawn(shard_id)
+        self.monitor.stats['start_time'] = datetime.now()
+        self._reader = asyncio.create_task(self._read_loop())
+
+    def _receive(self) -> Optional[Dict]:
+        try:
+            return self._out_queue.get(timeout=1)
+        except queue.Empty:
+            return None
+
+    async def _read_loop(self) -> None:
+        loop = asyncio.get_running_loop()
+        while not self._stopping:
+            try:
+                message = await loop.run_in_executor(None, self._receive)
+                if message:
+                    await self._dispatch(message)
+                self._restart_dead()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                self.logger.error(f"Ошибка при обработке сообщения воркера: {e}")
+
+    async def _dispatch(self, message: Dict) -> None:
+        shard_id = message.get('shard')
+        kind = message.get('type')
+        if kind == 'hit':
+            # Каждое совпадение - отдельная задача, как у обработчика сообщений:
+            # отправка в Bot API не задерживает чтение очереди
+            task = asyncio.create_task(self.monitor.publish_hit(message['hit']))
+            self._hit_tasks.add(task)
+            task.add_done_callback(self._hit_tasks.discard)
+        elif kind == 'resolved':
+            future = self._requests.get(message.get('id'))
+            if future and not future.done():
+                if 'error' in message:
+                    future.set_exception(ValueError(message['error']))
+                else:
+                    future.set_result(message['channel'])
+        elif kind == 'stats':
+            self.monitor.remote_stats[shard_id] = message['stats']
+        elif kind == 'error':
+            self.logger.error(f"Воркер {shard_id}: {message.get('error')}")
+        elif kind == 'stopped':
+            self.monitor.remote_stats.pop(shard_id, None)
+
+    async def resolve(self, chat_link: str) -> Dict:
+        """Разрешение ссылки одним из воркеров: {'id', 'title', 'username'}"""
+        shards = [shard_id for shard_id, process in self._processes.items() if process.is_alive()]
+        if not shards:
+            raise ValueError("Нет запущенных воркеров")
+
+        self._next_request += 1
+        request_id = self._next_request
+        future = asyncio.get_running_loop().create_future()
+        self._requests[request_id] = future
+        try:
+            shard_id = shards[request_id % len(shards)]
+            self._in_queues[shard_id].put({'type': 'resolve', 'id': request_id, 'link': chat_link})
+            return await asyncio.wait_for(future, SHARDING_SETTINGS['resolve_timeout'])
+        finally:
+            self._requests.pop(request_id, None)
+
+    async def reload(self) -> None:
+        """Команда воркерам перечитать каналы из базы (после добавления или удаления).
+
+        Вместе с командой рассылается новая карта владельцев: каналы, которых
+        еще нет в распределении, делятся только между запущенными процессами.
+        """
+        await self._load_owners()
+        for in_queue in self._in_queues.values():
+            in_queue.put({'type': 'reload', 'owners': self._owners, 'active': self._active})
+
+    def _restart_dead(self) -> None:
+        for shard_id, process in list(self._processes.items()):
+            if not self._stopping and process.exitcode is not None:
+                self.logger.warning(f"Воркер {shard_id} завершился с кодом {process.exitcode}, перезапуск")
+                self.monitor.remote_stats.pop(shard_id, None)
+                self._spawn(shard_id)
+
+    async def stop(self) -> None:
+        self._stopping = True
+        for in_queue in self._in_queues.values():
+            in_queue.put({'type': 'stop'})
+
+        loop = asyncio.get_running_loop()
+        for shard_id, process in self._processes.items():
+            await loop.run_in_executor(None, process.join, SHARDING_SETTINGS['stop_timeout'])
+            if process.is_alive():
+                self.logger.warning(f"Воркер {shard_id} не остановился вовремя, завершаем принудительно")
+                process.terminate()
+
+        if self._reader:
+            self._reader.cancel()
+            try:
+                await self._reader
+            except asyncio.CancelledError:
+                pass
+            self._reader = None
+
+        # Совпадения, отправленные воркерами перед остановкой
+        # (процессы уже завершены, очередь читается без ожидания)
+        while self._out_queue:
+            try:
+                message = self._out_queue.get_nowait()
+            except queue.Empty:
+                break
+            await self._dispatch(message)
+        if self._hit_tasks:
+            await asyncio.gather(*list(self._hit_tasks), return_exceptions=True)
+
+        self._processes.clear()
+        self._in_queues.clear()
+        self.monitor.remote_stats.clear()
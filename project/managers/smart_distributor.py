@@ -3,49 +3,132 @@ import json
 import logging
 import asyncio
 import aiosqlite
-from typing import Dict, List, Optional, Any
+from typing import Dict, List, Optional, Set, Any, Callable, Awaitable
+from telethon.errors import FloodWaitError
 from telethon.tl.functions.channels import JoinChannelRequest, GetFullChannelRequest
-from ..config import MONITORING_SETTINGS, load_settings
+from ..config import SETTINGS
+from .client_supervisor import ClientState, FLOOD_WAIT_SECONDS
+from .load_tracker import ChannelLoadTracker
+from .rebalance_planner import RebalancePlanner
+from .membership_cache import MembershipCache
+from .join_scheduler import JoinScheduler, JoinCallback
+from .telegram_client import TelegramClientLike
+
+# Допустимое превышение средней нагрузки (сообщений в минуту) на аккаунт
+LOAD_TOLERANCE = 1.2
 
 class SmartDistributor:
-    def __init__(self, account_manager, db_manager):
+    def __init__(self, account_manager, db_manager, load_tracker: Optional[ChannelLoadTracker] = None,
+                 membership_cache: Optional[MembershipCache] = None):
         self.account_manager = account_manager
         self.db = db_manager
+        self.load_tracker = load_tracker or ChannelLoadTracker()
+        self.memberships = membership_cache or MembershipCache(db_manager)
+        self.join_scheduler = JoinScheduler(self)
         self.logger = logging.getLogger(__name__)
         self._distribution = {}
+        self.unassigned_channels: List[int] = []
+        self.clients: Dict[str, TelegramClientLike] = {}  # Готовые клиенты по данным супервизоров
+        self.scope: Optional[Set[str]] = None  # Аккаунты процесса-воркера (None - все)
+        self._listeners: List[Callable[..., Awaitable[None]]] = []
+        self._pending_moves: Dict[int, tuple] = {}  # канал -> (откуда, куда), пока получатель вступает
+        self._tasks: Set[asyncio.Task] = set()
+
+        self.max_channels_per_account = SETTINGS.max_channels_per_client
+        self.join_delay = SETTINGS.join_channel_delay
+        SETTINGS.subscribe(self.on_settings_changed)
 
-        try:
-            settings = load_settings()
-            self.max_channels_per_account = settings.get('max_channels_per_client', 500)
-            self.join_delay = settings.get('join_channel_delay', 5)
-        except Exception as e:
-            self.logger.warning(f"Не удалось загрузить настройки, используем значения по умолчанию: {e}")
-            self.max_channels_per_account = MONITORING_SETTINGS.get('max_channels_per_client', 500)
-            self.join_delay = MONITORING_SETTINGS.get('join_channel_delay', 5)
-            
         self.logger.info(f"Настройки дистрибьютора: max_channels={self.max_channels_per_account}, join_delay={self.join_delay}")
 
+    def close(self) -> None:
+        """Отписка от настроек, когда дистрибьютор заменен новым (очередь вступлений дорабатывает)"""
+        SETTINGS.unsubscribe(self.on_settings_changed)
+        # Перераспределение каналов упавших аккаунтов теперь выполняет новый дистрибьютор
+        for task in list(self._tasks):
+            task.cancel()
+
+    def on_settings_changed(self, changes: Dict) -> None:
+        """Применение новых настроек без перезапуска (JoinScheduler читает join_delay отсюда)"""
+        if 'max_channels_per_client' in changes:
+            self.max_channels_per_account = changes['max_channels_per_client'][1]
+        if 'join_channel_delay' in changes:
+            self.join_delay = changes['join_channel_delay'][1]
+
     async def initialize(self):
         """Инициализация распределения из базы"""
         try:
             self._distribution = await self.load_distribution()
             self.logger.info(f"Загружено распределение: {len(self._distribution)} аккаунтов")
+            await self.memberships.load()
         except Exception as e:
             self.logger.error(f"Ошибка при инициализации распределения: {e}")
             self._distribution = {}
   
+    def subscribe(self, callback: Callable[..., Awaitable[None]]) -> None:
+        """Подписка на изменение распределения: callback(distribution)"""
+        if callback not in self._listeners:
+            self._listeners.append(callback)
+
+    async def _notify_distribution_changed(self) -> None:
+        for callback in list(self._listeners):
+            try:
+                await callback(self.distribution)
+            except Exception as e:
+                self.logger.error(f"Ошибка в подписчике распределения: {e}")
+
+    def get_client(self, account_id: str) -> Optional[TelegramClientLike]:
+        return self.clients.get(account_id) or self.account_manager.monitoring_clients.get(account_id)
+
+    def _account_of(self, client) -> Optional[str]:
+        for account_id, known_client in self.clients.items():
+            if known_client is client:
+                return account_id
+        return None
+
+    async def on_client_state(self, account_id: str, old_state: str, new_state: str, client) -> None:
+        """Реакция на смену состояния клиента из супервизора"""
+        try:
+            if new_state == ClientState.READY and client:
+                self.clients[account_id] = client
+                return
+
+            self.clients.pop(account_id, None)
+
+            if new_state == ClientState.FAILED and account_id in self.distribution:
+                # Перераспределение включает вступление в каналы, не блокируем супервизор
+                task = asyncio.create_task(self._reassign_failed_account(account_id))
+                self._tasks.add(task)
+                task.add_done_callback(self._tasks.discard)
+        except Exception as e:
+            self.logger.error(f"Ошибка при обработке состояния клиента {account_id}: {e}")
+
+    async def _reassign_failed_account(self, account_id: str) -> None:
+        try:
+            self.logger.warning(f"Аккаунт {account_id} выведен из работы, перераспределяем его каналы")
+            if await self.handle_account_failure(account_id):
+                await self.db.save_distribution(self.distribution, self.scope)
+                await self._notify_distribution_changed()
+        except Exception as e:
+            self.logger.error(f"Ошибка при перераспределении каналов аккаунта {account_id}: {e}")
+
     async def _check_membership(self, account_id: str, chat_id: int) -> bool:
-        """Проверка членства аккаунта в канале"""
+        """Проверка членства аккаунта в канале (RPC только при устаревшем кэше)"""
         try:
-            client = self.account_manager.monitoring_clients.get(account_id)
+            cached = self.memberships.get(account_id, chat_id)
+            if cached is not None:
+                return cached
+
+            client = self.get_client(account_id)
             if not client:
                 return False
                 
             try:
                 channel = await client(GetFullChannelRequest(chat_id))
-                return channel.full_chat.can_view_messages
+                is_member = bool(channel.full_chat.can_view_messages)
             except:
-                return False
+                is_member = False
+            await self.memberships.set(account_id, chat_id, is_member)
+            return is_member
         except Exception as e:
             self.logger.error(f"Ошибка при проверке членства {account_id} в {chat_id}: {e}")
             return False
@@ -135,6 +218,8 @@ class SmartDistributor:
                 ''') as cursor:
                     async for row in cursor:
                         account_id, chat_id = row
+                        if self.scope is not None and account_id not in self.scope:
+                            continue
                         if account_id not in distribution:
                             distribution[account_id] = []
                         distribution[account_id].append(chat_id)
@@ -147,13 +232,13 @@ class SmartDistributor:
         try:
             async with aiosqlite.connect(self.db.db_path) as db:
                 # Очищаем старое распределение
-                await db.execute('DELETE FROM channel_distribution')
-                
+                await self.db.clear_distribution(db, self.scope)
+
                 # Добавляем новое распределение
                 for account_id, channels in new_distribution.items():
                     for chat_id in channels:
                         await db.execute('''
-                            INSERT INTO channel_distribution (chat_id, account_id)
+                            INSERT OR REPLACE INTO channel_distribution (chat_id, account_id)
                             VALUES (?, ?)
                         ''', (chat_id, account_id))
                 
@@ -178,12 +263,14 @@ class SmartDistributor:
         return await self.db.get_channel_account(chat_id)
         
     async def distribute_channels(self, channels_list: List[int], accounts_list: List[str]) -> Dict[str, List[int]]:
+        """Распределение каналов с учетом количества и наблюдаемой нагрузки"""
         try:
             if not accounts_list:
                 raise ValueError("Нет доступных аккаунтов")
 
             # Создаем новое распределение
             new_distribution = {account_id: [] for account_id in accounts_list}
+            loads = {account_id: 0.0 for account_id in accounts_list}
             
             # Считаем оптимальное количество каналов на аккаунт
             channels_per_account = min(
@@ -191,47 +278,60 @@ class SmartDistributor:
                 self.max_channels_per_account
             )
 
+            # Ожидаемая нагрузка каналов и целевая нагрузка на аккаунт
+            rates = self.load_tracker.rates(channels_list)
+            total_load = sum(rates.values())
+            load_target = max(
+                total_load / len(accounts_list) * LOAD_TOLERANCE,
+                max(rates.values(), default=0.0)
+            )
+
             # Текущее распределение из базы
             current_distribution = await self.db.load_distribution()
+            current_accounts = {
+                chat_id: acc_id
+                for acc_id, acc_channels in current_distribution.items()
+                for chat_id in acc_channels
+            }
             
-            # Сначала оставляем каналы на прежних аккаунтах где возможно
+            # Сначала оставляем каналы на прежних аккаунтах где возможно,
+            # начиная с самых нагруженных каналов
             channels_to_distribute = []
-            for channel_id in channels_list:
-                current_account = None
-                for acc_id, acc_channels in current_distribution.items():
-                    if channel_id in acc_channels:
-                        current_account = acc_id
-                        break
+            for channel_id in sorted(channels_list, key=lambda x: rates[x], reverse=True):
+                current_account = current_accounts.get(channel_id)
                         
                 if current_account and current_account in accounts_list:
-                    # Оставляем канал на текущем аккаунте если не превышает лимит
-                    if len(new_distribution[current_account]) < channels_per_account:
+                    # Оставляем канал на текущем аккаунте если не превышает лимиты
+                    if (len(new_distribution[current_account]) < channels_per_account and
+                            loads[current_account] + rates[channel_id] <= load_target):
                         new_distribution[current_account].append(channel_id)
+                        loads[current_account] += rates[channel_id]
                         continue
                 
                 channels_to_distribute.append(channel_id)
 
-            accounts_sorted = sorted(
-                accounts_list,
-                key=lambda x: len(new_distribution[x])
-            )
-
+            # Остальные каналы (уже отсортированы по убыванию нагрузки) отдаем
+            # наименее нагруженному аккаунту, у которого есть место
             for channel_id in channels_to_distribute:
-                # Ищем аккаунт с минимальной нагрузкой
-                for account_id in accounts_sorted:
-                    if len(new_distribution[account_id]) < channels_per_account:
-                        new_distribution[account_id].append(channel_id)
-                        break
-                else:
-                    # Если все аккаунты загружены, добавляем к наименее загруженному
-                    new_distribution[accounts_sorted[0]].append(channel_id)
+                candidates = [
+                    account_id for account_id in accounts_list
+                    if len(new_distribution[account_id]) < channels_per_account
+                ] or accounts_list
+                # Если все аккаунты загружены, добавляем к наименее загруженному
+                account_id = min(
+                    candidates,
+                    key=lambda x: (loads[x], len(new_distribution[x]))
+                )
+                new_distribution[account_id].append(channel_id)
+                loads[account_id] += rates[channel_id]
 
             # Сохраняем новое распределение
-            await self.db.save_distribution(new_distribution)
+            await self.db.save_distribution(new_distribution, self.scope)
 
             for account_id, channels in new_distribution.items():
                 self.logger.info(
-                    f"Аккаунт {account_id}: {len(channels)} каналов "
+                    f"Аккаунт {account_id}: {len(channels)} каналов, "
+                    f"нагрузка {loads[account_id]:.1f} сообщ/мин "
                     f"(лимит: {channels_per_account})"
                 )
 
@@ -241,6 +341,170 @@ class SmartDistributor:
             self.logger.error(f"Ошибка при распределении каналов: {e}")
             raise
 
+    async def plan_rebalance(self, channels: List[int], capacities: Dict[str, int]) -> Dict:
+        """План перераспределения с минимальным числом вступлений"""
+        planner = RebalancePlanner(self.distribution, capacities, self.memberships.memberships(), channels)
+        return planner.plan()
+
+    async def apply_plan(self, plan: Dict, dry_run: bool = False, background: bool = False,
+                         on_joined: Optional[JoinCallback] = None) -> Dict:
+        """Выполнение плана перераспределения.
+
+        В режиме dry_run только сообщает стоимость плана. При выполнении
+        аккаунт-получатель вступает в канал; если вступить не удалось,
+        канал остается на прежнем аккаунте (когда тот еще в работе).
+        С background=True вступления передаются в очередь JoinScheduler
+        (on_joined получает их результат): новые каналы сразу назначаются
+        получателю, а переносимые остаются на прежнем аккаунте до успешного
+        вступления получателя (_complete_move).
+        """
+        moves = plan['moves']
+        self.logger.info(
+            f"План перераспределения: переносов {len(moves)}, вступлений {plan['joins']}"
+            + (" (пробный прогон)" if dry_run else "")
+        )
+        if dry_run or not moves:
+            return plan
+
+        distribution = plan['distribution']
+
+        async def complete_move(account_id: str, chat_id: int, joined: bool) -> None:
+            await self._complete_move(account_id, chat_id, joined)
+            if on_joined:
+                await on_joined(account_id, chat_id, joined)
+
+        for move in moves:
+            chat_id, source, target = move['chat_id'], move['from'], move['to']
+            if not move['join']:
+                continue
+
+            if background:
+                if source in distribution:
+                    distribution[target].remove(chat_id)
+                    distribution[source].append(chat_id)
+                    self._pending_moves[chat_id] = (source, target)
+                    self.join_scheduler.submit(target, chat_id, complete_move)
+                else:
+                    self.join_scheduler.submit(target, chat_id, on_joined)
+                continue
+
+            client = self.get_client(target)
+            joined = bool(client) and await self.safe_join_channel(client, chat_id, target)
+            if joined:
+                await asyncio.sleep(self.join_delay)
+            elif source in distribution:
+                distribution[target].remove(chat_id)
+                distribution[source].append(chat_id)
+                move['to'] = source
+                self.logger.warning(f"Канал {chat_id} оставлен на аккаунте {source}: не удалось вступить через {target}")
+
+        self._distribution = distribution
+        await self.db.save_distribution(distribution, self.scope)
+        await self._notify_distribution_changed()
+        return plan
+
+    def get_account_loads(self) -> Dict[str, float]:
+        """Текущая нагрузка аккаунтов, сообщений в минуту"""
+        return {
+            account_id: self.load_tracker.load(channels)
+            for account_id, channels in self.distribution.items()
+        }
+
+    async def rebalance_by_load(self, target: Optional[float] = None) -> List[tuple]:
+        """Снижение нагрузки самого загруженного аккаунта ниже цели.
+
+        Переносит минимальное число каналов: с самого нагруженного аккаунта
+        берутся сначала самые активные каналы, пока его нагрузка не станет
+        ниже цели. Вступления выполняет JoinScheduler, канал переходит к
+        получателю только после успешного вступления (_complete_move).
+        Возвращает список запланированных переносов (chat_id, откуда, куда).
+        """
+        moves = []
+        try:
+            accounts = [
+                account_id for account_id in self.distribution
+                if self.get_client(account_id)
+            ]
+            if len(accounts) < 2:
+                return moves
+
+            loads = {account_id: self.load_tracker.load(self.distribution[account_id]) for account_id in accounts}
+            counts = {account_id: len(self.distribution[account_id]) for account_id in accounts}
+            # Переносы, ожидающие вступления, считаются уже выполненными
+            for chat_id, (source, receiver) in self._pending_moves.items():
+                if source in loads and receiver in loads:
+                    rate = self.load_tracker.load([chat_id])
+                    loads[source] -= rate
+                    loads[receiver] += rate
+                    counts[source] -= 1
+                    counts[receiver] += 1
+            if target is None:
+                target = sum(loads.values()) / len(accounts) * LOAD_TOLERANCE
+
+            hottest = max(accounts, key=lambda x: loads[x])
+            if loads[hottest] <= target:
+                return moves
+
+            rates = self.load_tracker.rates(self.distribution[hottest])
+            for chat_id in sorted(rates, key=rates.get, reverse=True):
+                if loads[hottest] <= target:
+                    break
+                if chat_id in self._pending_moves:
+                    continue
+
+                rate = rates[chat_id]
+                receivers = [
+                    account_id for account_id in accounts
+                    if account_id != hottest and counts[account_id] < self.max_channels_per_account
+                ]
+                if not receivers:
+                    break
+                receiver = min(receivers, key=lambda x: loads[x])
+
+                # Перенос имеет смысл, только если получатель не станет горячее источника
+                if rate <= 0 or loads[receiver] + rate >= loads[hottest]:
+                    continue
+
+                loads[hottest] -= rate
+                loads[receiver] += rate
+                counts[hottest] -= 1
+                counts[receiver] += 1
+                moves.append((chat_id, hottest, receiver))
+
+            for chat_id, source, receiver in moves:
+                self._pending_moves[chat_id] = (source, receiver)
+                self.join_scheduler.submit(receiver, chat_id, self._complete_move)
+
+            if moves:
+                self.logger.info(
+                    f"Запланирован перенос {len(moves)} каналов с аккаунта {hottest}, "
+                    f"нагрузка после переноса {loads[hottest]:.1f} сообщ/мин (цель {target:.1f})"
+                )
+
+            return moves
+
+        except Exception as e:
+            self.logger.error(f"Ошибка при балансировке по нагрузке: {e}")
+            return moves
+
+    async def _complete_move(self, account_id: str, chat_id: int, joined: bool) -> None:
+        """Перенос канала на аккаунт после его вступления в канал"""
+        source, _ = self._pending_moves.pop(chat_id, (None, None))
+        if source is None:
+            return
+        if not joined:
+            self.logger.warning(f"Канал {chat_id} оставлен на аккаунте {source}: не удалось вступить через {account_id}")
+            return
+        # Пока шло вступление, распределение могло измениться
+        if chat_id not in self.distribution.get(source, []) or account_id not in self.distribution:
+            return
+
+        self.distribution[source].remove(chat_id)
+        self.distribution[account_id].append(chat_id)
+        await self.db.save_distribution(self.distribution, self.scope)
+        await self._notify_distribution_changed()
+        self.logger.info(f"Канал {chat_id} перенесен с аккаунта {source} на {account_id}")
+
     async def check_account(self, client) -> bool:
         try:
             return await client.is_user_authorized()
@@ -251,7 +515,7 @@ class SmartDistributor:
     async def add_new_account(self, account_id: str) -> bool:
         try:
             # Проверяем новый аккаунт
-            client = await self.account_manager.get_client(account_id)
+            client = self.get_client(account_id)
             if not client or not await self.check_account(client):
                 return False
 
@@ -305,7 +569,7 @@ class SmartDistributor:
                             self.unassigned_channels = self.unassigned_channels[can_add:]
                             
                             # Вступаем в новые каналы
-                            client = await self.account_manager.get_client(account_id)
+                            client = self.get_client(account_id)
                             if client:
                                 await self.join_channels(client, new_channels)
                                 self.distribution[account_id].extend(new_channels)
@@ -325,20 +589,31 @@ class SmartDistributor:
             except Exception as e:
                 self.logger.error(f"Ошибка при вступлении в канал {channel_id}: {e}")
 
-    async def safe_join_channel(self, client, channel_id: int) -> bool:
+    async def safe_join_channel(self, client, channel_id: int, account_id: Optional[str] = None) -> bool:
         """Безопасное вступление в канал с проверками и повторными попытками"""
         max_retries = 3
         base_delay = self.join_delay
+        account_id = account_id or self._account_of(client)
+
+        # Известное членство не требует ни проверки, ни вступления
+        if account_id and self.memberships.get(account_id, channel_id):
+            return True
         
         for attempt in range(max_retries):
             try:
                 try:
                     channel = await client(GetFullChannelRequest(channel_id))
                     if channel.full_chat.can_view_messages:
+                        if account_id:
+                            await self.memberships.set(account_id, channel_id, True)
                         return True
+                except FloodWaitError:
+                    raise
                 except Exception as e:
                     if "CHANNEL_PRIVATE" in str(e):
                         self.logger.error(f"Канал {channel_id} недоступен")
+                        if account_id:
+                            await self.memberships.set(account_id, channel_id, False)
                         return False
 
                 # Вступаем в канал
@@ -351,16 +626,16 @@ class SmartDistributor:
                 check = await client(GetFullChannelRequest(channel_id))
                 if check.full_chat.can_view_messages:
                     self.logger.info(f"Успешное вступление в канал {channel_id}")
+                    if account_id:
+                        await self.memberships.set(account_id, channel_id, True)
                     return True
                     
+            except FloodWaitError as e:
+                wait_time = e.seconds
+                self.logger.warning(f"Флуд-контроль для {channel_id}, ожидание {wait_time} сек")
+                FLOOD_WAIT_SECONDS.labels(account_id or 'unknown', 'join').inc(wait_time)
+                await asyncio.sleep(wait_time)
             except Exception as e:
-                error_msg = str(e)
-                if "FLOOD_WAIT" in error_msg:
-                    wait_time = int(''.join(filter(str.isdigit, error_msg)))
-                    self.logger.warning(f"Флуд-контроль для {channel_id}, ожидание {wait_time} сек")
-                    await asyncio.sleep(wait_time)
-                    continue
-                    
                 self.logger.error(f"Ошибка при вступлении в канал {channel_id}: {e}")
                 await asyncio.sleep(base_delay * (attempt + 1))
         
@@ -0,0 +1,46 @@
+"""Интерфейс клиента Telegram, от которого зависят монитор и дистрибьютор.
+
+MessageMonitor, SmartDistributor и AccountManager используют только
+перечисленные здесь методы TelegramClient. Поэтому вместо настоящего
+клиента можно подставить любую реализацию, например FakeTelegramClient
+из fake_telegram для нагрузочных прогонов без сети.
+"""
+from typing import Any, Callable, List, Optional, Protocol, runtime_checkable
+
+
+@runtime_checkable
+class TelegramClientLike(Protocol):
+    """Используемое подмножество telethon.TelegramClient"""
+
+    def is_connected(self) -> bool: ...
+
+    async def connect(self) -> None: ...
+
+    async def disconnect(self) -> None: ...
+
+    async def is_user_authorized(self) -> bool: ...
+
+    async def get_me(self) -> Any: ...
+
+    async def get_entity(self, entity: Any) -> Any: ...
+
+    def add_event_handler(self, callback: Callable, event: Any = None) -> None: ...
+
+    def remove_event_handler(self, callback: Callable, event: Any = None) -> int: ...
+
+    async def __call__(self, request: Any) -> Any: ...
+
+
+class ClientFactory(Protocol):
+    """Источник аккаунтов и клиентов для AccountManager.
+
+    По умолчанию AccountManager создает TelegramClient из файлов в папке
+    аккаунтов; фабрика заменяет и список аккаунтов, и создание клиентов.
+    """
+
+    # Пауза между подключениями аккаунтов при запуске монитора
+    connect_delay: float
+
+    def get_accounts(self) -> List[str]: ...
+
+    async def create_client(self, account_id: str) -> Optional[TelegramClientLike]: ...
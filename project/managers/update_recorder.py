@@ -0,0 +1,269 @@
+"""Запись входящего потока сообщений и его воспроизведение.
+
+UpdateRecorder пишет каждое входящее сообщение (чат, id, дата, исходный
+текст, отправитель, аккаунт, время получения) в сжатый файл JSON-строк.
+Файл только дописывается: каждый сброс буфера - отдельный gzip-член, так что
+запись переживает перезапуски, а gzip.open читает файл целиком. При
+анонимизации id заменяются стабильными хэшами, а текст маскируется с
+сохранением длины и вхождений ключевых слов. Соль хэшей не пишется в
+запись (иначе id восстанавливаются перебором): она задается явно или
+хранится рядом, в <path>.salt, и одинакова до и после перезапуска.
+
+UpdateReplayer подает записанный поток в MessageMonitor.message_handler
+со скоростью 1x, Nx или максимальной - для офлайн-воспроизведения пиков
+нагрузки (поиск ключевых слов, дедупликация, очередь уведомлений).
+"""
+import os
+import gzip
+import hmac
+import json
+import time
+import asyncio
+import hashlib
+import logging
+from datetime import datetime, timezone
+from typing import Dict, Iterator, List, Optional
+from telethon import utils
+from telethon.tl.types import PeerChannel
+from .fake_telegram import FakeNetwork, FakeTelegramClient
+
+logger = logging.getLogger(__name__)
+
+FORMAT_VERSION = 1
+
+
+def anonymize_text(text: str, keywords: List[str]) -> str:
+    """Маскировка текста: буквы -> x/X, цифры -> 0; вхождения ключевых слов,
+    пробелы и знаки препинания сохраняются, длина не меняется"""
+    lower = text.lower()
+    if len(lower) != len(text):
+        # Редкие символы меняют длину при lower(): сопоставляем посимвольно
+        lower = ''.join(ch.lower() if len(ch.lower()) == 1 else ch for ch in text)
+    keep = bytearray(len(text))
+    for keyword in keywords:
+        word = keyword.lower()
+        if not word:
+            continue
+        start = lower.find(word)
+        while start != -1:
+            keep[start:start + len(word)] = b'\x01' * len(word)
+            start = lower.find(word, start + 1)
+
+    masked = []
+    for index, ch in enumerate(text):
+        if keep[index] or not ch.isalnum():
+            masked.append(ch)
+        elif ch.isdigit():
+            masked.append('0')
+        else:
+            masked.append('X' if ch.isupper() else 'x')
+    return ''.join(masked)
+
+
+class UpdateRecorder:
+    """Буферизованная запись входящих сообщений в сжатый файл"""
+
+    def __init__(self, path: str, anonymize: bool = False, keywords_source=None,
+                 salt: Optional[bytes] = None, flush_interval: float = 1.0, max_buffer: int = 100000):
+        """keywords_source - функция без аргументов со списком ключевых слов
+        (для анонимизации, обычно db.load_keywords)"""
+        self.path = path
+        self.anonymize = anonymize
+        self.keywords_source = keywords_source
+        self.salt = salt or (self._load_salt() if anonymize else b'')
+        self.flush_interval = flush_interval
+        self.max_buffer = max_buffer
+        self.logger = logger
+        self.stats = {'recorded': 0, 'dropped': 0, 'written': 0}
+        self._buffer: List[Dict] = []
+        self._task: Optional[asyncio.Task] = None
+
+    def _load_salt(self) -> bytes:
+        """Соль из <path>.salt; при первом запуске создается и сохраняется"""
+        salt_path = self.path + '.salt'
+        if os.path.exists(salt_path):
+            with open(salt_path, 'rb') as f:
+                return f.read()
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        salt = os.urandom(16)
+        fd = os.open(salt_path, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o600)
+        with os.fdopen(fd, 'wb') as f:
+            f.write(salt)
+        return salt
+
+    def _hash_id(self, value: int, modulo: int) -> int:
+        digest = hmac.new(self.salt, str(value).encode(), hashlib.sha256).digest()
+        return int.from_bytes(digest[:8], 'big') % modulo
+
+    def record(self, event, account_id: Optional[str], received: float) -> None:
+        """Вызывается в message_handler для каждого входящего сообщения; только буферизация"""
+        if len(self._buffer) >= self.max_buffer:
+            self.stats['dropped'] += 1
+            return
+        message = event.message
+        self._buffer.append({
+            'c': event.chat_id,
+            'm': message.id,
+            'd': message.date.timestamp() if message.date else received,
+            'r': received,
+            's': message.sender_id,
+            'a': account_id,
+            't': message.message or '',
+        })
+        self.stats['recorded'] += 1
+
+    def _anonymize(self, records: List[Dict], keywords: List[str]) -> List[Dict]:
+        for record in records:
+            chat_id, _ = utils.resolve_id(record['c'])
+            record['c'] = utils.get_peer_id(PeerChannel(1000000000 + self._hash_id(chat_id, 10 ** 9)))
+            if record['s'] is not None:
+                record['s'] = 1 + self._hash_id(record['s'], 10 ** 10)
+            if record['a'] is not None:
+                record['a'] = f"account_{self._hash_id(record['a'], 16 ** 6):06x}"
+            record['t'] = anonymize_text(record['t'], keywords)
+        return records
+
+    def _write(self, records: List[Dict], keywords: Optional[List[str]] = None) -> None:
+        if keywords is not None:
+            records = self._anonymize(records, keywords)
+        new_file = not os.path.exists(self.path) or os.path.getsize(self.path) == 0
+        with gzip.open(self.path, 'at', encoding='utf-8') as f:
+            if new_file:
+                f.write(json.dumps({
+                    'version': FORMAT_VERSION,
+                    'created': datetime.now().isoformat(timespec='seconds'),
+                    'anonymized': self.anonymize,
+                }) + '\n')
+            for record in records:
+                f.write(json.dumps(record, ensure_ascii=False, separators=(',', ':')) + '\n')
+
+    async def flush(self) -> None:
+        if not self._buffer:
+            return
+        records, self._buffer = self._buffer, []
+        try:
+            keywords = None
+            if self.anonymize:
+                keywords = (self.keywords_source() if self.keywords_source else None) or []
+            # Анонимизация, сжатие и запись на диск - вне событийного цикла
+            await asyncio.get_running_loop().run_in_executor(None, self._write, records, keywords)
+            self.stats['written'] += len(records)
+        except Exception as e:
+            self.logger.error(f"Ошибка при записи потока сообщений в {self.path}: {e}")
+
+    def start(self) -> None:
+        if self._task is None or self._task.done():
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            self._task = asyncio.create_task(self._run())
+            self.logger.info(f"Запись потока сообщений в {self.path}" + (" (анонимизация)" if self.anonymize else ""))
+
+    async def stop(self) -> None:
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        await self.flush()
+
+    async def _run(self) -> None:
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            await self.flush()
+
+
+def read_records(path: str) -> Iterator[Dict]:
+    """Записи файла по порядку (заголовок пропускается)"""
+    with gzip.open(path, 'rt', encoding='utf-8') as f:
+        for line in f:
+            if not line.strip():
+                continue
+            record = json.loads(line)
+            if 'version' in record:
+                continue
+            yield record
+
+
+class UpdateReplayer:
+    """Воспроизведение записанного потока через MessageMonitor.message_handler.
+
+    speed - множитель скорости относительно записи (1 - как было, 10 - в 10 раз
+    быстрее), None - максимальная скорость. Каждое сообщение обрабатывается в
+    своей задаче, как у Telethon, поэтому незавершенные задачи показывают
+    очередь сообщений и уведомлений. Даты сообщений сдвигаются к моменту
+    воспроизведения с сохранением исходной задержки доставки.
+    """
+
+    def __init__(self, monitor, path: str, speed: Optional[float] = 1.0, yield_every: int = 100):
+        self.monitor = monitor
+        self.path = path
+        self.speed = speed
+        self.yield_every = yield_every
+        self.logger = logger
+        self.network = FakeNetwork(channels=0)
+        self.client = FakeTelegramClient(self.network, 'replay')
+        self._tasks = set()
+        self.stats = {
+            'records': 0,
+            'max_in_flight': 0,
+            'max_schedule_lag': 0.0,
+        }
+
+    def _build_event(self, record: Dict, now: float):
+        chat_id, _ = utils.resolve_id(record['c'])
+        sender = self.network.sender(record['s']) if record.get('s') else None
+        date = datetime.fromtimestamp(now - max(0.0, record['r'] - record['d']), timezone.utc)
+        update = self.network.make_update(chat_id, record['t'], sender, message_id=record['m'], date=date)
+        return self.monitor.build_event(self.client, update)
+
+    def _spawn(self, record: Dict, now: float) -> None:
+        event = self._build_event(record, now)
+        if event is None:
+            return
+        task = asyncio.create_task(self.monitor.message_handler(event, record.get('a')))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+        self.stats['max_in_flight'] = max(self.stats['max_in_flight'], len(self._tasks))
+
+    async def run(self) -> Dict:
+        monitor_stats = dict(self.monitor.stats)
+        started = time.monotonic()
+        first_received = None
+
+        for record in read_records(self.path):
+            if first_received is None:
+                first_received = record['r']
+            if self.speed:
+                due = started + (record['r'] - first_received) / self.speed
+                delay = due - time.monotonic()
+                if delay > 0:
+                    await asyncio.sleep(delay)
+                else:
+                    self.stats['max_schedule_lag'] = max(self.stats['max_schedule_lag'], -delay)
+            elif self.stats['records'] % self.yield_every == 0:
+                await asyncio.sleep(0)
+
+            self._spawn(record, time.time())
+            self.stats['records'] += 1
+
+        while self._tasks:
+            await asyncio.gather(*list(self._tasks), return_exceptions=True)
+
+        elapsed = time.monotonic() - started
+        result = dict(self.stats)
+        result.update(
+            elapsed=elapsed,
+            rate=self.stats['records'] / elapsed if elapsed else 0.0,
+            processed=self.monitor.stats['messages_processed'] - monitor_stats['messages_processed'],
+            keywords_found=self.monitor.stats['keywords_found'] - monitor_stats.get('keywords_found', 0),
+            errors=self.monitor.stats['errors'] - monitor_stats['errors'],
+        )
+        self.logger.info(
+            f"Воспроизведено {result['records']} сообщений за {elapsed:.1f} сек ({result['rate']:.0f} сообщ/сек)"
+        )
+        return result
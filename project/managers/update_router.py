@@ -0,0 +1,65 @@
+from typing import Dict, List, Optional
+
+
+class UpdateRouter:
+    """Глобальная таблица маршрутизации chat_id -> аккаунт.
+
+    Каждый клиент регистрирует один нефильтрованный обработчик сырых
+    обновлений и пропускает дальше только сообщения из чатов, которые
+    закреплены за ним. Таблица перестраивается целиком и подменяется
+    одной операцией присваивания, поэтому обработчики никогда не видят
+    частично заполненное распределение.
+    """
+
+    def __init__(self):
+        self._routes: Dict[int, str] = {}
+
+    @staticmethod
+    def normalize(chat_id) -> int:
+        """Приведение id к "сырому" виду (без префикса -100 / знака)"""
+        chat_id = int(chat_id)
+        if chat_id < 0:
+            chat_id = -chat_id
+            if chat_id > 1000000000000:
+                chat_id -= 1000000000000
+        return chat_id
+
+    @staticmethod
+    def chat_id_of(update) -> Optional[int]:
+        """Извлечение id чата из UpdateNewChannelMessage / UpdateNewMessage"""
+        message = getattr(update, 'message', None)
+        peer = getattr(message, 'peer_id', None)
+        if peer is None:
+            return None
+        chat_id = getattr(peer, 'channel_id', None)
+        if chat_id is None:
+            chat_id = getattr(peer, 'chat_id', None)
+        return chat_id
+
+    def rebuild(self, distribution: Dict[str, List[int]]) -> None:
+        routes = {}
+        for account_id, channels in distribution.items():
+            for chat_id in channels:
+                routes[self.normalize(chat_id)] = account_id
+        self._routes = routes
+
+    def assign(self, chat_id, account_id: str) -> None:
+        self._routes[self.normalize(chat_id)] = account_id
+
+    def unassign(self, chat_id) -> None:
+        self._routes.pop(self.normalize(chat_id), None)
+
+    def owner(self, chat_id) -> Optional[str]:
+        return self._routes.get(self.normalize(chat_id))
+
+    def accepts(self, account_id: str, update) -> bool:
+        """Должен ли аккаунт обработать это обновление"""
+        chat_id = self.chat_id_of(update)
+        return chat_id is not None and self._routes.get(chat_id) == account_id
+
+    def accepts_chat(self, account_id: str, chat_id: int) -> bool:
+        """То же, что accepts, для уже извлеченного "сырого" id чата"""
+        return self._routes.get(chat_id) == account_id
+
+    def __len__(self) -> int:
+        return len(self._routes)
@@ -1,7 +1,8 @@
-from .logger import setup_logger, LoggerManager, log_async_errors, cleanup_old_logs
+from .logger import setup_logger, stop_logging, LoggerManager, log_async_errors, cleanup_old_logs
 
 __all__ = [
     'setup_logger',
+    'stop_logging',
     'LoggerManager',
     'log_async_errors',
     'cleanup_old_logs'
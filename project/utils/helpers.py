@@ -75,4 +75,26 @@ class RateLimiter:
                 await asyncio.sleep(sleep_time)
                 now = datetime.now().timestamp()
         
-        self.timestamps.append(now)
\ No newline at end of file
+        self.timestamps.append(now)
+
+class ThrottledProgress:
+    """Отправка прогресса не чаще одного раза за interval секунд"""
+
+    def __init__(self, callback, interval: float = 3.0):
+        self.callback = callback
+        self.interval = interval
+        self._last_sent = 0.0
+        self._pending: Optional[str] = None
+
+    async def update(self, text: str, force: bool = False) -> None:
+        now = datetime.now().timestamp()
+        if not force and now - self._last_sent < self.interval:
+            self._pending = text
+            return
+        self._pending = None
+        self._last_sent = now
+        await self.callback(text)
+
+    async def flush(self) -> None:
+        if self._pending is not None:
+            await self.update(self._pending, force=True)
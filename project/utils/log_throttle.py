@@ -0,0 +1,191 @@
+"""Ограничение частоты записей в лог и изменение уровней логгеров на ходу.
+
+LogThrottle - фильтр обработчиков: у каждого места вызова (файл и строка)
+своя корзина токенов, записи сверх нее подавляются, а раз в summary_interval
+в лог уходит сводка "подавлено N похожих сообщений". ERROR и выше не
+ограничиваются. LevelOverrides временно меняет уровень логгера (например,
+DEBUG на 5 минут по команде /loglevel) и возвращает прежний по таймеру;
+пока уровень изменен, записи этого логгера не ограничиваются.
+"""
+import time
+import asyncio
+import logging
+import threading
+from typing import Dict, List, Optional, Tuple
+from .metrics import REGISTRY
+
+LOG_SUPPRESSED = REGISTRY.counter(
+    'monitor_log_suppressed_total', 'Записи лога, подавленные ограничением частоты', ['logger']
+)
+
+
+class _Bucket:
+    __slots__ = ('tokens', 'updated', 'suppressed', 'last')
+
+    def __init__(self, burst: float, now: float):
+        self.tokens = burst
+        self.updated = now
+        self.suppressed = 0
+        self.last: Optional[logging.LogRecord] = None
+
+
+class LogThrottle(logging.Filter):
+    """Корзина токенов на каждое место вызова; rate <= 0 - без ограничений"""
+
+    def __init__(self, rate: float = 5.0, burst: int = 20, summary_interval: float = 60.0,
+                 max_level: int = logging.WARNING):
+        super().__init__()
+        self.rate = rate
+        self.burst = burst
+        self.summary_interval = summary_interval
+        self.max_level = max_level
+        self.exempt: Tuple[str, ...] = ()
+        self._buckets: Dict[Tuple[str, int], _Bucket] = {}
+        self._lock = threading.Lock()
+        self._last_sweep = time.monotonic()
+
+    def configure(self, rate: float, burst: int, summary_interval: float, max_level: int) -> None:
+        with self._lock:
+            self.rate = rate
+            self.burst = burst
+            self.summary_interval = summary_interval
+            self.max_level = max_level
+            self._buckets.clear()
+
+    def _is_exempt(self, name: str) -> bool:
+        for prefix in self.exempt:
+            if not prefix or name == prefix or name.startswith(prefix + '.'):
+                return True
+        return False
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        # Запись проходит через несколько обработчиков (логгер и корневой) - решение принимается один раз
+        allowed = getattr(record, 'throttle_allowed', None)
+        if allowed is not None:
+            return allowed
+        if self.rate <= 0 or record.levelno > self.max_level or self._is_exempt(record.name):
+            allowed = True
+        else:
+            allowed = self._take(record)
+        record.throttle_allowed = allowed
+        return allowed
+
+    def _take(self, record: logging.LogRecord) -> bool:
+        now = time.monotonic()
+        summaries = []
+        with self._lock:
+            key = (record.pathname, record.lineno)
+            bucket = self._buckets.get(key)
+            if bucket is None:
+                bucket = self._buckets[key] = _Bucket(self.burst, now)
+            else:
+                bucket.tokens = min(self.burst, bucket.tokens + (now - bucket.updated) * self.rate)
+                bucket.updated = now
+            if bucket.tokens >= 1:
+                bucket.tokens -= 1
+                allowed = True
+            else:
+                bucket.suppressed += 1
+                bucket.last = record
+                allowed = False
+            if now - self._last_sweep >= self.summary_interval:
+                self._last_sweep = now
+                summaries = self._collect_summaries()
+        if not allowed:
+            LOG_SUPPRESSED.labels(record.name).inc()
+        # Сводки пишутся вне блокировки: они снова проходят через этот фильтр
+        self._emit(summaries)
+        return allowed
+
+    def _collect_summaries(self) -> List[logging.LogRecord]:
+        summaries = []
+        for bucket in self._buckets.values():
+            if not bucket.suppressed:
+                continue
+            last = bucket.last
+            summary = logging.LogRecord(
+                last.name, last.levelno, last.pathname, last.lineno,
+                f"Подавлено {bucket.suppressed} похожих сообщений, последнее: {last.getMessage()}",
+                None, None, last.funcName
+            )
+            summary.throttle_allowed = True
+            summaries.append(summary)
+            bucket.suppressed = 0
+            bucket.last = None
+        return summaries
+
+    def _emit(self, summaries: List[logging.LogRecord]) -> None:
+        for summary in summaries:
+            logging.getLogger(summary.name).handle(summary)
+
+    def flush(self) -> None:
+        """Немедленная запись сводок о подавленных сообщениях"""
+        with self._lock:
+            self._last_sweep = time.monotonic()
+            summaries = self._collect_summaries()
+        self._emit(summaries)
+
+    def get_stats(self) -> Dict:
+        with self._lock:
+            return {
+                'callsites': len(self._buckets),
+                'suppressed_pending': sum(bucket.suppressed for bucket in self._buckets.values()),
+            }
+
+
+class LevelOverrides:
+    """Временные уровни логгеров с возвратом прежнего уровня по таймеру"""
+
+    def __init__(self, throttle: LogThrottle):
+        self.throttle = throttle
+        self._overrides: Dict[str, Dict] = {}
+
+    def set_level(self, name: str, level: int, duration: Optional[float] = None) -> None:
+        """Уровень level для логгера name ('' - корневой) на duration секунд (None - до сброса)"""
+        logger = logging.getLogger(name or None)
+        previous = self._overrides.get(name)
+        if previous:
+            if previous['timer']:
+                previous['timer'].cancel()
+            original = previous['original']
+        else:
+            original = logger.level
+
+        timer = None
+        if duration:
+            try:
+                timer = asyncio.get_running_loop().call_later(duration, self.reset, name)
+            except RuntimeError:
+                timer = None
+        logger.setLevel(level)
+        self._overrides[name] = {
+            'original': original,
+            'level': level,
+            'until': time.time() + duration if duration else None,
+            'timer': timer,
+        }
+        self.throttle.exempt = tuple(self._overrides)
+
+    def reset(self, name: str) -> bool:
+        override = self._overrides.pop(name, None)
+        if override is None:
+            return False
+        if override['timer']:
+            override['timer'].cancel()
+        logging.getLogger(name or None).setLevel(override['original'])
+        self.throttle.exempt = tuple(self._overrides)
+        return True
+
+    def reset_all(self) -> None:
+        for name in list(self._overrides):
+            self.reset(name)
+
+    def get_overrides(self) -> Dict[str, Dict]:
+        return {
+            name: {'level': logging.getLevelName(item['level']), 'until': item['until']}
+            for name, item in self._overrides.items()
+        }
+
+
+THROTTLE = LogThrottle()
+LEVELS = LevelOverrides(THROTTLE)
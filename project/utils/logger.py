@@ -1,15 +1,20 @@
 import os
 import sys
+import copy
+import queue
+import atexit
 import logging
 import logging.handlers
 from datetime import datetime
-from typing import Optional
+from typing import List, Optional, TextIO
 from pathlib import Path
 import traceback
 import json
 from functools import wraps
 import time
-from ..config import LOGS_DIR, LOGGING_CONFIG
+from ..config import LOGS_DIR, LOGGING_CONFIG, LOG_THROTTLE_SETTINGS
+from .metrics import REGISTRY
+from .log_throttle import THROTTLE
 
 class ColoredFormatter(logging.Formatter):
     grey = "\x1b[38;20m"
@@ -29,15 +34,23 @@ class ColoredFormatter(logging.Formatter):
     }
 
     def __init__(self, fmt: str):
-        super().__init__()
+        super().__init__(fmt)
         self.fmt = fmt
+        # Форматтеры создаются один раз на уровень; цвет задается в шаблоне,
+        # а не в записи, поэтому другие обработчики получают запись без ANSI-кодов
+        self._plain = logging.Formatter(fmt)
+        self._colored = {
+            level: logging.Formatter(
+                fmt.replace('%(levelname)s', f"{color}%(levelname)s{self.reset}")
+                   .replace('%(message)s', f"{color}%(message)s{self.reset}")
+            )
+            for level, color in self.COLORS.items()
+        }
 
     def format(self, record: logging.LogRecord) -> str:
-        if not record.exc_info:
-            level_color = self.COLORS.get(record.levelno)
-            record.levelname = f"{level_color}{record.levelname}{self.reset}"
-            record.msg = f"{level_color}{record.msg}{self.reset}"
-        return logging.Formatter(self.fmt).format(record)
+        if record.exc_info:
+            return self._plain.format(record)
+        return self._colored.get(record.levelno, self._plain).format(record)
 
 class JsonFormatter(logging.Formatter):
     def format(self, record: logging.LogRecord) -> str:
@@ -88,48 +101,128 @@ class AsyncLogger(logging.Logger):
             'errors_per_hour': (self.metrics['errors'] / uptime) * 3600 if uptime > 0 else 0
         }
 
-def setup_logger(name: Optional[str] = None) -> AsyncLogger:
-    # Регистрируем новый класс логгера
-    logging.setLoggerClass(AsyncLogger)
-    
-    # Создаем логгер
-    logger = logging.getLogger(name or __name__)
-    logger.setLevel(logging.DEBUG)
+class QueuedHandler(logging.handlers.QueueHandler):
+    """Обработчик событийного цикла: кладет запись в очередь фонового потока записи.
+
+    В отличие от стандартного QueueHandler не форматирует запись в вызывающем
+    потоке и сохраняет exc_info: очередь внутрипроцессная, и JsonFormatter
+    в фоновом потоке сам разбирает исключение.
+    """
+
+    def __init__(self, log_queue, listener: logging.handlers.QueueListener):
+        super().__init__(log_queue)
+        self.listener = listener
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # Аргументы подставляются сразу: изменяемые объекты могут поменяться
+        # до того, как запись дойдет до фонового потока
+        record = copy.copy(record)
+        record.message = record.getMessage()
+        record.msg = record.message
+        record.args = None
+        return record
+
+    def stop(self) -> None:
+        """Выгрузка очереди и остановка фонового потока этого обработчика"""
+        if self.listener in _listeners:
+            _listeners.remove(self.listener)
+            self.listener.stop()
+
+
+_listeners: List[logging.handlers.QueueListener] = []
+_shared_handler: Optional[QueuedHandler] = None
+
+
+def enqueue_handlers(handlers: List[logging.Handler]) -> QueuedHandler:
+    """Перенос обработчиков в фоновый поток; возвращает обработчик-очередь для логгера"""
+    log_queue = queue.SimpleQueue()
+    listener = logging.handlers.QueueListener(log_queue, *handlers, respect_handler_level=True)
+    listener.start()
+    if not _listeners:
+        atexit.register(stop_logging)
+    _listeners.append(listener)
+    return QueuedHandler(log_queue, listener)
+
+
+def stop_logging() -> None:
+    """Остановка фоновых потоков записи с выгрузкой очередей"""
+    THROTTLE.flush()
+    while _listeners:
+        _listeners.pop().stop()
 
-    # Очищаем существующие обработчики
-    logger.handlers.clear()
 
-    # Создаем директорию для логов если её нет
-    os.makedirs(LOGS_DIR, exist_ok=True)
+def create_handlers(logs_dir: str = LOGS_DIR, stream: Optional[TextIO] = None) -> List[logging.Handler]:
+    """Обработчики setup_logger: цветная консоль, monitor.log и error.log в JSON"""
+    os.makedirs(logs_dir, exist_ok=True)
 
     # Консольный обработчик с цветной подсветкой
-    console_handler = logging.StreamHandler(sys.stdout)
+    console_handler = logging.StreamHandler(stream or sys.stdout)
     console_handler.setLevel(logging.INFO)
     console_format = "%(asctime)s - %(levelname)s - %(message)s"
     console_handler.setFormatter(ColoredFormatter(console_format))
-    logger.addHandler(console_handler)
 
     # Файловый обработчик для всех логов
     file_handler = logging.handlers.RotatingFileHandler(
-        filename=os.path.join(LOGS_DIR, 'monitor.log'),
+        filename=os.path.join(logs_dir, 'monitor.log'),
         maxBytes=10 * 1024 * 1024,  # 10MB
         backupCount=5,
         encoding='utf-8'
     )
     file_handler.setLevel(logging.DEBUG)
     file_handler.setFormatter(JsonFormatter())
-    logger.addHandler(file_handler)
 
     # Файловый обработчик только для ошибок
     error_handler = logging.handlers.RotatingFileHandler(
-        filename=os.path.join(LOGS_DIR, 'error.log'),
+        filename=os.path.join(logs_dir, 'error.log'),
         maxBytes=10 * 1024 * 1024,  # 10MB
         backupCount=5,
         encoding='utf-8'
     )
     error_handler.setLevel(logging.ERROR)
     error_handler.setFormatter(JsonFormatter())
-    logger.addHandler(error_handler)
+
+    return [console_handler, file_handler, error_handler]
+
+
+def _enqueue_root_handlers() -> None:
+    """Обработчики корневого логгера из LOGGING_CONFIG тоже уходят в фоновый поток"""
+    root = logging.getLogger()
+    handlers = [handler for handler in root.handlers if not isinstance(handler, logging.handlers.QueueHandler)]
+    if handlers:
+        queued = enqueue_handlers(handlers)
+        queued.addFilter(THROTTLE)
+        for handler in handlers:
+            root.removeHandler(handler)
+        root.addHandler(queued)
+
+
+def setup_logger(name: Optional[str] = None) -> AsyncLogger:
+    global _shared_handler
+
+    # Регистрируем новый класс логгера
+    logging.setLoggerClass(AsyncLogger)
+    
+    # Создаем логгер
+    logger = logging.getLogger(name or __name__)
+    logger.setLevel(logging.DEBUG)
+
+    # Очищаем существующие обработчики
+    logger.handlers.clear()
+
+    # Форматирование и запись на диск - в фоновом потоке, событийный цикл
+    # только ставит запись в очередь. Обработчики общие для всех логгеров.
+    if _shared_handler is None:
+        # Частые записи с одного места ограничиваются до постановки в очередь
+        THROTTLE.configure(
+            LOG_THROTTLE_SETTINGS['rate'],
+            LOG_THROTTLE_SETTINGS['burst'],
+            LOG_THROTTLE_SETTINGS['summary_interval'],
+            logging.getLevelName(LOG_THROTTLE_SETTINGS['max_level'])
+        )
+        _enqueue_root_handlers()
+        _shared_handler = enqueue_handlers(create_handlers())
+        _shared_handler.addFilter(THROTTLE)
+    logger.addHandler(_shared_handler)
 
     return logger
 
@@ -168,6 +261,16 @@ class LoggerManager:
     def get_all_metrics(cls) -> dict:
         return {name: logger.get_metrics() for name, logger in cls._loggers.items()}
 
+    @classmethod
+    def collect_metrics(cls) -> None:
+        for name, metrics in cls.get_all_metrics().items():
+            LOG_ERRORS.labels(name).set(metrics['errors'])
+            LOG_WARNINGS.labels(name).set(metrics['warnings'])
+
+LOG_ERRORS = REGISTRY.gauge('monitor_log_errors', 'Ошибки, записанные логгером', ['logger'])
+LOG_WARNINGS = REGISTRY.gauge('monitor_log_warnings', 'Предупреждения, записанные логгером', ['logger'])
+REGISTRY.on_collect(LoggerManager.collect_metrics)
+
 def cleanup_old_logs(days: int = 30):
     try:
         current_time = time.time()
@@ -0,0 +1,159 @@
+"""Контроль отзывчивости событийного цикла.
+
+Корутина-пульс засыпает на interval и измеряет, насколько позже она
+проснулась (задержка планирования). Поток-сторож следит за пульсом: если
+цикл не отвечает дольше stall_threshold, он снимает стек потока цикла
+(sys._current_frames), чтобы найти блокирующую функцию и корутину, из
+которой она вызвана. Когда цикл оживает, зависание попадает в метрики,
+журнал и подписчикам (алерты).
+"""
+import os
+import sys
+import time
+import asyncio
+import inspect
+import logging
+import threading
+import traceback
+from collections import deque
+from typing import Callable, Deque, Dict, List, Optional
+from .metrics import REGISTRY
+
+logger = logging.getLogger(__name__)
+
+PROJECT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+LOOP_LAG = REGISTRY.histogram(
+    'monitor_loop_lag_seconds', 'Задержка планирования событийного цикла',
+    buckets=(0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+)
+LOOP_STALLS = REGISTRY.counter(
+    'monitor_loop_stalls_total', 'Зависания событийного цикла по блокирующей функции', ['function']
+)
+LOOP_STALL_SECONDS = REGISTRY.counter(
+    'monitor_loop_stall_seconds_total', 'Суммарное время зависаний по блокирующей функции', ['function']
+)
+
+
+def _describe_stack(frame) -> Dict:
+    """Блокирующая функция проекта, корутина-источник и сокращенный стек"""
+    site = None
+    coroutine = None
+    current = frame
+    while current is not None:
+        code = current.f_code
+        if site is None and code.co_filename.startswith(PROJECT_DIR):
+            site = f"{os.path.relpath(code.co_filename, PROJECT_DIR)}:{code.co_name}"
+        if coroutine is None and code.co_flags & inspect.CO_COROUTINE:
+            # Ближайшая корутина - та, из которой сделан блокирующий вызов
+            coroutine = code.co_qualname if hasattr(code, 'co_qualname') else code.co_name
+        current = current.f_back
+
+    stack = traceback.format_list(traceback.extract_stack(frame)[-8:])
+    return {
+        'function': site or f"{frame.f_code.co_filename}:{frame.f_code.co_name}",
+        'coroutine': coroutine,
+        'stack': ''.join(stack),
+    }
+
+
+class LoopMonitor:
+    """Пульс событийного цикла и поток-сторож для поиска блокирующих вызовов"""
+
+    def __init__(self, interval: float = 0.1, stall_threshold: float = 0.25, history: int = 50):
+        self.interval = interval
+        self.stall_threshold = stall_threshold
+        self.logger = logger
+        self.stalls: Deque[Dict] = deque(maxlen=history)
+        self.max_lag = 0.0
+        self._beat = time.monotonic()
+        self._loop_thread_id: Optional[int] = None
+        self._captured: Optional[Dict] = None  # снимок стека с меткой 'beat' - пульсом, после которого он снят
+        self._listeners: List[Callable[[Dict], None]] = []
+        self._task: Optional[asyncio.Task] = None
+        self._watchdog: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+
+    def subscribe(self, callback: Callable[[Dict], None]) -> None:
+        """Подписка на зависания: callback(stall) вызывается в потоке цикла"""
+        if callback not in self._listeners:
+            self._listeners.append(callback)
+
+    def start(self) -> None:
+        if self._task and not self._task.done():
+            return
+        self._loop_thread_id = threading.get_ident()
+        self._beat = time.monotonic()
+        self._stop.clear()
+        self._task = asyncio.create_task(self._heartbeat())
+        self._watchdog = threading.Thread(target=self._watch, name='loop-watchdog', daemon=True)
+        self._watchdog.start()
+
+    async def stop(self) -> None:
+        self._stop.set()
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _heartbeat(self) -> None:
+        while True:
+            expected = time.monotonic() + self.interval
+            await asyncio.sleep(self.interval)
+            now = time.monotonic()
+            previous, self._beat = self._beat, now
+            lag = max(0.0, now - expected)
+            LOOP_LAG.observe(lag)
+            self.max_lag = max(self.max_lag, lag)
+            # Сторож считает паузу вместе с interval, поэтому снимок бывает и без зависания;
+            # он относится только к этому пульсу и не должен попасть в следующий отчет
+            captured, self._captured = self._captured, None
+            if captured is not None and captured['beat'] != previous:
+                captured = None
+            if lag >= self.stall_threshold:
+                self._report(lag, captured)
+
+    def _watch(self) -> None:
+        """Поток-сторож: снимок стека цикла, пока тот не отвечает"""
+        captured_for = None
+        while not self._stop.wait(self.stall_threshold / 2):
+            beat = self._beat
+            if time.monotonic() - beat < self.stall_threshold or captured_for == beat:
+                continue
+            frame = sys._current_frames().get(self._loop_thread_id)
+            if frame is not None:
+                captured = _describe_stack(frame)
+                captured['beat'] = beat
+                self._captured = captured
+                captured_for = beat
+
+    def _report(self, lag: float, captured: Optional[Dict]) -> None:
+        stall = dict(captured or {'function': 'unknown', 'coroutine': None, 'stack': ''})
+        stall.pop('beat', None)
+        stall['duration'] = lag
+        stall['time'] = time.time()
+        self.stalls.append(stall)
+
+        LOOP_STALLS.labels(stall['function']).inc()
+        LOOP_STALL_SECONDS.labels(stall['function']).inc(lag)
+        self.logger.warning(
+            f"Событийный цикл не отвечал {lag:.2f} сек: {stall['function']}"
+            + (f" (корутина {stall['coroutine']})" if stall['coroutine'] else "")
+        )
+        for callback in list(self._listeners):
+            try:
+                callback(stall)
+            except Exception as e:
+                self.logger.error(f"Ошибка в подписчике монитора цикла: {e}")
+
+    def top_functions(self, limit: int = 5) -> List[Dict]:
+        """Функции с наибольшим суммарным временем зависаний из последних записей"""
+        totals: Dict[str, Dict] = {}
+        for stall in self.stalls:
+            entry = totals.setdefault(stall['function'], {'function': stall['function'], 'count': 0, 'seconds': 0.0})
+            entry['count'] += 1
+            entry['seconds'] += stall['duration']
+        return sorted(totals.values(), key=lambda x: x['seconds'], reverse=True)[:limit]
@@ -0,0 +1,164 @@
+"""Профилирование работающего процесса по запросу.
+
+SamplingProfiler - поток, который с заданной частотой снимает стек потока
+событийного цикла (sys._current_frames) и считает свернутые стеки
+(формат collapsed для flamegraph.pl / speedscope) и самые частые функции.
+profile_loop - cProfile на потоке цикла на заданное время.
+MemorySnapshots - снимки tracemalloc и их сравнение с предыдущим.
+
+Отчеты возвращаются как (имя файла, bytes) для отправки документом.
+"""
+import io
+import os
+import sys
+import time
+import pstats
+import asyncio
+import cProfile
+import threading
+import tracemalloc
+from collections import Counter
+from datetime import datetime
+from typing import List, Optional, Tuple
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+Document = Tuple[str, bytes]
+
+
+def _stamp() -> str:
+    return datetime.now().strftime('%Y%m%d_%H%M%S')
+
+
+def _frame_label(code) -> str:
+    filename = code.co_filename
+    if filename.startswith(PROJECT_ROOT):
+        filename = os.path.relpath(filename, PROJECT_ROOT)
+    else:
+        filename = os.path.basename(filename)
+    return f"{code.co_name} ({filename}:{code.co_firstlineno})"
+
+
+class SamplingProfiler:
+    """Статистический профилировщик одного потока"""
+
+    def __init__(self, thread_id: int, interval: float = 0.005):
+        self.thread_id = thread_id
+        self.interval = interval
+        self.stacks: Counter = Counter()
+        self.samples = 0
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self) -> None:
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name='sampling-profiler', daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread:
+            self._thread.join()
+            self._thread = None
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            if frame is None:
+                continue
+            stack = []
+            while frame is not None:
+                stack.append(_frame_label(frame.f_code))
+                frame = frame.f_back
+            stack.reverse()
+            self.stacks[tuple(stack)] += 1
+            self.samples += 1
+
+    def collapsed(self) -> str:
+        """Свернутые стеки: 'корень;...;лист число' на строку"""
+        return ''.join(f"{';'.join(stack)} {count}\n" for stack, count in self.stacks.most_common())
+
+    def top(self, limit: int = 30) -> str:
+        own: Counter = Counter()
+        total: Counter = Counter()
+        for stack, count in self.stacks.items():
+            own[stack[-1]] += count
+            for label in set(stack):
+                total[label] += count
+
+        samples = max(self.samples, 1)
+        lines = [f"Сэмплов: {self.samples}, интервал {self.interval * 1000:.0f} мс", "",
+                 "Собственное время (функция на вершине стека):"]
+        lines += [f"{count * 100 / samples:6.1f}%  {count:6d}  {label}" for label, count in own.most_common(limit)]
+        lines += ["", "Суммарное время (функция в стеке):"]
+        lines += [f"{count * 100 / samples:6.1f}%  {count:6d}  {label}" for label, count in total.most_common(limit)]
+        return '\n'.join(lines) + '\n'
+
+    async def run_for(self, seconds: float) -> List[Document]:
+        self.start()
+        try:
+            await asyncio.sleep(seconds)
+        finally:
+            await asyncio.get_running_loop().run_in_executor(None, self.stop)
+        stamp = _stamp()
+        return [
+            (f"profile_top_{stamp}.txt", self.top().encode()),
+            (f"profile_collapsed_{stamp}.txt", self.collapsed().encode()),
+        ]
+
+
+async def profile_loop(seconds: float, limit: int = 40) -> List[Document]:
+    """cProfile всего кода, выполняемого в потоке цикла, в течение seconds"""
+    profile = cProfile.Profile()
+    profile.enable()
+    try:
+        await asyncio.sleep(seconds)
+    finally:
+        profile.disable()
+
+    stream = io.StringIO()
+    stats = pstats.Stats(profile, stream=stream)
+    stream.write(f"cProfile потока цикла, {seconds:.0f} сек\n\n")
+    stats.sort_stats('tottime').print_stats(limit)
+    stats.sort_stats('cumulative').print_stats(limit)
+    return [(f"cprofile_{_stamp()}.txt", stream.getvalue().encode())]
+
+
+class MemorySnapshots:
+    """Снимки tracemalloc; каждый следующий сравнивается с предыдущим"""
+
+    def __init__(self, frames: int = 25):
+        self.frames = frames
+        self.previous: Optional[tracemalloc.Snapshot] = None
+        self.previous_time: Optional[float] = None
+
+    def take(self, limit: int = 40) -> List[Document]:
+        if not tracemalloc.is_tracing():
+            # Отслеживаются только выделения после запуска: первый снимок - точка отсчета
+            tracemalloc.start(self.frames)
+
+        snapshot = tracemalloc.take_snapshot().filter_traces((
+            tracemalloc.Filter(False, tracemalloc.__file__),
+            tracemalloc.Filter(False, '<frozen importlib._bootstrap>'),
+        ))
+        current, peak = tracemalloc.get_traced_memory()
+        lines = [f"Отслеживается: {current / 1048576:.1f} МБ, пик {peak / 1048576:.1f} МБ", "",
+                 "Крупнейшие места выделения памяти:"]
+        lines += [str(stat) for stat in snapshot.statistics('lineno')[:limit]]
+
+        if self.previous is not None:
+            lines += ["", f"Изменения за {time.monotonic() - self.previous_time:.0f} сек:"]
+            lines += [str(stat) for stat in snapshot.compare_to(self.previous, 'lineno')[:limit]]
+            lines += ["", "Изменения по стекам (крупнейшие):"]
+            for stat in snapshot.compare_to(self.previous, 'traceback')[:5]:
+                lines.append(str(stat))
+                lines.extend(f"    {line}" for line in stat.traceback.format())
+
+        self.previous = snapshot
+        self.previous_time = time.monotonic()
+        return [(f"memory_{_stamp()}.txt", ('\n'.join(lines) + '\n').encode())]
+
+    def stop(self) -> None:
+        self.previous = None
+        if tracemalloc.is_tracing():
+            tracemalloc.stop()